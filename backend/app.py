@@ -6,22 +6,52 @@ from flask import Flask, request, redirect, session, jsonify, url_for, send_from
 from flask_cors import CORS
 from dotenv import load_dotenv
 import firebase_admin
-from firebase_admin import auth, credentials, firestore
-from google.cloud import storage
-import uuid, tempfile
+from firebase_admin import credentials, firestore
+import io
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
 import traceback
+from db import db_connection, pool
+from pagination import InvalidCursorError, MAX_PAGE_SIZE, parse_limit, encode_cursor
+from queries import (build_products_query, PRODUCT_DETAIL_SELECT, PRODUCT_DETAIL_QUERY, SELLER_SELECT,
+                     SELLER_QUERY, batch_query, format_product_detail, CART_QUERY, CHECKOUT_CART_QUERY,
+                     CART_SET_QUANTITY_QUERY, cart_removal_query, wishlist_status_query, USER_ORDER_ROWS_QUERY,
+                     iter_orders, group_order_rows, build_user_orders_query, load_order_details, PROFILE_QUERY,
+                     CART_REMOVE_QUERY, WISHLIST_QUERY, WISHLIST_REMOVE_QUERY, WISHLIST_PRODUCT_STATUS_QUERY)
+from cache import catalogue_cache
+import token_cache
+import profiling
+from storage_service import storage_service
+from images import process_image, PRODUCT_RENDITIONS, AVATAR_RENDITIONS
+import jobs
+from jobs import job_handler, periodic_task, enqueue
+import inventory
+from inventory import OutOfStockError
+import idempotency
+from idempotency import idempotent
+from json_provider import install_json_provider
+from streaming import wants_ndjson, ndjson_response
+from conditional import (conditional_response, version_etag, last_modified,
+                         PRODUCT_CACHE_CONTROL, LISTING_CACHE_CONTROL, PRIVATE_CACHE_CONTROL)
+from google.api_core.exceptions import NotFound
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+install_json_provider(app)
+profiling.init_app(app)
 # Update CORS configuration to handle all routes and methods
+CORS_ORIGINS = ["http://localhost:5173"]
+CORS_EXPOSE_HEADERS = [idempotency.REPLAYED_HEADER, "ETag", "Last-Modified"]
 CORS(app, resources={
     r"/*": {
-        "origins": ["http://localhost:5173"],
+        "origins": CORS_ORIGINS,
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", idempotency.HEADER, "If-None-Match", "If-Modified-Since"],
+        "expose_headers": CORS_EXPOSE_HEADERS
     }
 })
 
@@ -74,18 +104,13 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tactile-rigging-451008-a0-f0a39b
 #         print(f"Error connecting to Cloud SQL: {err}")
 #         raise
 
-def get_db_connection():
-    try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="unisale"
-        )
-        return connection
-    except mysql.connector.Error as err:
-        print(f"Error connecting to MySQL: {err}")
-        raise
+# Connections come from the shared pool in db.py:
+#
+#     with db_connection() as conn:
+#         cursor = conn.cursor(dictionary=True)
+#         ...
+#
+# The connection is returned to the pool when the block exits, even on errors.
 
 # =================== FIREBASE AUTH SETUP =================== #
 
@@ -98,7 +123,7 @@ db = firestore.client()
 # Authentication middleware
 def authenticate_token(token):
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = token_cache.verify_token(token)
         return decoded_token['uid']
     except Exception as e:
         print(f"Auth error: {e}")
@@ -113,7 +138,7 @@ def get_current_user_id():
 
     try:
         token = auth_header.split(' ')[1]
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = token_cache.verify_token(token)  # cached until the token expires
         return decoded_token['uid']
     except Exception as e:
         print(f"Error authenticating token: {e}")
@@ -141,15 +166,41 @@ def home():
     return "Welcome to UniSale API!"
 
 
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters for the catalogue and verified-token caches."""
+    return jsonify({
+        "catalogue": catalogue_cache.stats(),
+        "auth_tokens": token_cache.stats()
+    })
+
+
+@app.route("/api/storage/stats", methods=["GET"])
+def storage_stats():
+    """Per-operation timings for Google Cloud Storage calls."""
+    return jsonify(storage_service.stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Per-endpoint request profiling totals in Prometheus text format (PROFILING_ENABLED=1)."""
+    return app.response_class(profiling.metrics.render(), content_type=profiling.METRICS_CONTENT_TYPE)
+
+
+@app.route("/api/db-pool/stats", methods=["GET"])
+def db_pool_stats():
+    """Connection pool usage, including how often callers hit an exhausted pool."""
+    return jsonify(pool.stats())
+
+
 @app.route("/users", methods=["GET"])
 def get_users():
     """Fetch all users from the database (test route)."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, email, verified FROM users")
-        users = cursor.fetchall()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT id, name, email, verified FROM users")
+            users = cursor.fetchall()
         return jsonify(users)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -162,20 +213,19 @@ def signup():
     name = data.get("name")
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        # Check if user already exists
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        existing_user = cursor.fetchone()
+            # Check if user already exists
+            cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+            existing_user = cursor.fetchone()
 
-        if existing_user:
-            return jsonify({"success": False, "message": "User already exists!"})
+            if existing_user:
+                return jsonify({"success": False, "message": "User already exists!"})
 
-        # Insert new user
-        cursor.execute("INSERT INTO users (name, email, verified) VALUES (%s, %s, 1)", (name, email))
-        conn.commit()
-        conn.close()
+            # Insert new user
+            cursor.execute("INSERT INTO users (name, email, verified) VALUES (%s, %s, 1)", (name, email))
+            conn.commit()
 
         return jsonify({"success": True, "message": "Signup successful!"})
 
@@ -185,56 +235,256 @@ def signup():
 
 # =================== Google Cloud Storage Setup =================== #
 
-BUCKET_NAME = "unisale-storage"
+# The client and bucket handle are shared process-wide, see storage_service.py.
+# Set STORAGE_EMULATOR_HOST (e.g. http://localhost:4443 for fake-gcs-server)
+# to run uploads against a local fake GCS instead of the real bucket.
+
+# Bounded pool shared by all requests for concurrent image uploads/deletes
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "6"))
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="gcs-upload")
 
 
-def gcs_upload_image(file, folder):
-    """Uploads an image to Google Cloud Storage under the specified folder and returns the public URL."""
+def gcs_upload_image(file, folder, renditions=PRODUCT_RENDITIONS):
+    """Resizes an image into the given renditions (see images.py), uploads them to
+    Google Cloud Storage under the specified folder and returns {rendition: public URL}.
+    """
+    uploaded = []
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(BUCKET_NAME)
+        # Resize and strip metadata on the image process pool
+        rendered = process_image(file.read(), renditions)
+
+        # Generate a unique base filename inside the folder
+        base_name = f"{folder}/{uuid.uuid4()}_{secure_filename(file.filename).rsplit('.', 1)[0]}"
+
+        # Upload from memory (no temp file copy); each object is made public by
+        # the upload itself instead of a separate make_public() call
+        urls = {}
+        for rendition, (data, extension, content_type) in rendered.items():
+            public_url = storage_service.upload(
+                io.BytesIO(data), f"{base_name}_{rendition}.{extension}", content_type
+            )
+            uploaded.append(public_url)
+            urls[rendition] = public_url
+        print(f"Image uploaded to {urls['full']}")
+
+        return urls
+    except Exception as e:
+        print(f"Error uploading file to GCS: {str(e)}")
+        delete_many_from_gcs(uploaded)
+        return None
+
+
+def gcs_upload_images(files, folder):
+    """Uploads several images concurrently.
 
-        # Generate a unique filename inside the folder
-        unique_filename = f"{folder}/{uuid.uuid4()}_{secure_filename(file.filename)}"
-        blob = bucket.blob(unique_filename)
+    Returns the rendition URLs in the same order as files. If any upload fails,
+    the ones that succeeded are deleted again and None is returned.
+    """
+    # Each upload thread runs in a copy of the caller's context, so its GCS calls
+    # count towards the caller's request or job profile (see profiling.py)
+    futures = [
+        upload_executor.submit(contextvars.copy_context().run, gcs_upload_image, file, folder)
+        for file in files
+    ]
+    results = [future.result() for future in futures]
+    if all(results):
+        return results
 
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            file.save(temp_file.name)
-            temp_file_path = temp_file.name
+    uploaded = [url for urls in results if urls for url in urls.values()]
+    print(f"Upload failed, rolling back {len(uploaded)} uploaded images")
+    delete_many_from_gcs(uploaded)
+    return None
 
-        # Upload the file to GCS
-        blob.upload_from_filename(temp_file_path)
-        blob.make_public()
-        public_url = blob.public_url
-        print(f"Image uploaded to {public_url}")
 
-        # Remove the temporary file
-        os.unlink(temp_file_path)
+def delete_from_gcs(public_url):
+    """Queues deletion of an image from Google Cloud Storage using its public URL."""
+    delete_many_from_gcs([public_url])
+
 
-        return public_url
+def delete_many_from_gcs(public_urls):
+    """Queues deletion of several images from Google Cloud Storage (done by a background job)."""
+    if not public_urls:
+        return
+    try:
+        enqueue("delete_images", {"urls": list(public_urls)})
     except Exception as e:
-        print(f"Error uploading file to GCS: {str(e)}")
-        # Ensure temporary file is removed even if an error occurs
-        if 'temp_file_path' in locals():
-            try:
-                os.unlink(temp_file_path)
-            except Exception as del_error:
-                print(f"Error deleting temporary file: {str(del_error)}")
+        print(f"Error queueing image deletes: {str(e)}")
+
+# =================== BACKGROUND JOBS =================== #
+#
+# Image uploads and deletes run on the job workers (see jobs.py) so upload
+# routes return straight away with a job id; clients poll /api/jobs/<id>.
+
+def job_accepted(job_id, message):
+    """202 response for work handed to a background job."""
+    return jsonify({
+        "message": message,
+        "job_id": job_id,
+        "status": "pending",
+        "status_url": f"/api/jobs/{job_id}"
+    }), 202
+
+
+def insert_product(fields, renditions):
+    """Inserts a product with its images (first image is the main one) and returns its id."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+
+        # Insert product into database with first image as main image
+        cursor.execute("""
+            INSERT INTO products 
+            (user_id, name, description, category, state, price, image_url, card_url, thumbnail_url,
+             original_price, months_used, upload_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            fields['user_id'],
+            fields['name'],
+            fields['description'],
+            fields['category'],
+            fields['state'],
+            fields['price'],
+            renditions[0]['full'],
+            renditions[0]['card'],
+            renditions[0]['thumbnail'],
+            fields['original_price'] or None,
+            fields['months_used'] or None,
+            fields.get('upload_id')
+        ))
+
+        # Get the inserted product ID
+        product_id = cursor.lastrowid
+
+        # Add all images to product_images table
+        for urls in renditions:
+            cursor.execute("""
+                INSERT INTO product_images (product_id, image_url, card_url, thumbnail_url)
+                VALUES (%s, %s, %s, %s)
+            """, (product_id, urls['full'], urls['card'], urls['thumbnail']))
+
+        conn.commit()
+        cursor.close()
+
+    catalogue_cache.invalidate_product()
+    return product_id
+
+
+def find_uploaded_product(upload_id):
+    """Result of an upload job whose product is already saved, or None."""
+    if not upload_id:
+        return None
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT p.id, pi.image_url
+            FROM products p
+            LEFT JOIN product_images pi ON pi.product_id = p.id
+            WHERE p.upload_id = %s
+            ORDER BY pi.id
+        """, (upload_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+    if not rows:
         return None
+    return {"product_id": rows[0]['id'], "image_urls": [row['image_url'] for row in rows if row['image_url']]}
 
 
-def delete_from_gcs(public_url):
-    """Deletes an image from Google Cloud Storage using its public URL."""
+@job_handler("upload_product")
+def run_upload_product(payload, files):
+    # A re-run job (lease expired, or the worker died before marking it done)
+    # must not create the product twice
+    existing = find_uploaded_product(payload.get('upload_id'))
+    if existing:
+        return existing
+
+    renditions = gcs_upload_images(files, "product-image")
+    if not renditions:
+        raise RuntimeError("Failed to upload image to Google Cloud Storage")
+
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(BUCKET_NAME)
-        # Extract blob name from public URL
-        blob_name = public_url.split(f'{BUCKET_NAME}/')[1]
-        blob = bucket.blob(blob_name)
-        blob.delete()
+        product_id = insert_product(payload, renditions)
     except Exception as e:
-        print(f"Error deleting image from GCS: {str(e)}")
+        # Don't leave orphaned images behind; the retry uploads them again
+        delete_many_from_gcs([url for urls in renditions for url in urls.values()])
+        if isinstance(e, mysql.connector.IntegrityError):
+            # Another run of this job saved the product first
+            existing = find_uploaded_product(payload.get('upload_id'))
+            if existing:
+                return existing
+        raise
+
+    print(f"Product {product_id} created with {len(renditions)} images")
+    return {"product_id": product_id, "image_urls": [urls['full'] for urls in renditions]}
+
+
+@job_handler("update_profile_picture")
+def run_update_profile_picture(payload, files):
+    renditions = gcs_upload_image(files[0], "profile-picture", AVATAR_RENDITIONS)  # Upload to 'profile-picture' folder
+    if not renditions:
+        raise RuntimeError("Image upload failed")
+    image_url = renditions['full']
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET profile_picture = %s WHERE id = %s", (image_url, payload['user_id']))
+        conn.commit()
+        cursor.close()
+    catalogue_cache.invalidate_seller(payload['user_id'])
+    return {"image_url": image_url}
+
+
+@job_handler("delete_images")
+def run_delete_images(payload, files):
+    blob_names = [storage_service.blob_name_from_url(url) for url in payload['urls']]
+    try:
+        storage_service.delete_many(blob_names)
+    except Exception:
+        # One missing blob fails the whole batch (e.g. on a retry); fall back to
+        # deleting one by one and treat already-deleted blobs as done
+        for name in blob_names:
+            try:
+                storage_service.delete(name)
+            except NotFound:
+                pass
+    return {"deleted": len(blob_names)}
+
+
+@periodic_task("purge_cart_reservations", 300)
+def run_purge_cart_reservations():
+    with db_connection() as conn:
+        deleted = inventory.purge_expired_reservations(conn)
+    if deleted:
+        print(f"Purged {deleted} expired cart reservations")
+
+
+@periodic_task("purge_idempotency_keys", 3600)
+def run_purge_idempotency_keys():
+    with db_connection() as conn:
+        deleted = idempotency.purge_expired_keys(conn)
+    if deleted:
+        print(f"Purged {deleted} expired idempotency keys")
+
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status (pending/running/succeeded/failed) and result of a background job."""
+    try:
+        job = jobs.get_job(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        print(f"Error fetching job {job_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def get_job_stats():
+    """Number of jobs in each status."""
+    try:
+        return jsonify(jobs.job_counts())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 # File extension validation helper
 def allowed_file(filename):
@@ -243,18 +493,9 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-# db = mysql.connector.connect(
-#     host="34.131.110.57", user="root", password="parth@123", database="unisale"
-# )
-# cursor = db.cursor()
-
-db = mysql.connector.connect(
-    host="localhost", user="root", password="", database="unisale"
-)
-cursor = db.cursor()
-
 @app.route('/api/upload', methods=['POST'])
 @app.route('/api/upload', methods=['POST', 'OPTIONS'])
+@idempotent("upload")
 def upload_product():
     """Handle single image product upload"""
     # Handle preflight CORS requests
@@ -289,54 +530,21 @@ def upload_product():
         if file.filename == '':
             return jsonify({"error": "No selected file"}), 400
         
-        # Upload image to Google Cloud Storage
-        image_url = gcs_upload_image(file, "product-image")
-        if not image_url:
-            return jsonify({"error": "Failed to upload image"}), 500
-        
-        print(f"Image uploaded to GCS: {image_url}")
-        
-        # Create database connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Insert product into database
-        cursor.execute("""
-            INSERT INTO products 
-            (user_id, name, description, category, state, price, image_url, original_price, months_used)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            user_id, 
-            name, 
-            description, 
-            category, 
-            state, 
-            price, 
-            image_url,
-            original_price if original_price else None,
-            months_used if months_used else None
-        ))
-        
-        # Get the inserted product ID
-        product_id = cursor.lastrowid
-        
-        # Also add the image to product_images table
-        cursor.execute("""
-            INSERT INTO product_images (product_id, image_url)
-            VALUES (%s, %s)
-        """, (product_id, image_url))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        print(f"Product {product_id} created successfully")
-        
-        return jsonify({
-            "message": "Product uploaded successfully",
-            "product_id": product_id,
-            "image_url": image_url
-        })
+        # Resizing, uploading and saving the product happen in a background job
+        job_id = enqueue("upload_product", {
+            "user_id": user_id,
+            "name": name,
+            "description": description,
+            "category": category,
+            "state": state,
+            "price": price,
+            "original_price": original_price,
+            "months_used": months_used,
+            "upload_id": uuid.uuid4().hex
+        }, files=[file], executor=upload_executor)
+        print(f"Queued upload job {job_id}")
+
+        return job_accepted(job_id, "Product upload queued")
             
     except Exception as e:
         print(f"Error in upload_product: {str(e)}")
@@ -352,14 +560,11 @@ def update_profile_picture():
         return jsonify({"error": "Missing image or user_id"}), 400
 
     file = request.files["image"]
-    image_url = gcs_upload_image(file, "profile-picture")  # Upload to 'profile-picture' folder
-    if not image_url:
-        return jsonify({"error": "Image upload failed"}), 500
 
     try:
-        cursor.execute("UPDATE users SET profile_picture = %s WHERE id = %s", (image_url, user_id))
-        db.commit()
-        return jsonify({"message": "Profile picture updated", "image_url": image_url}), 200
+        # Upload and profile update finish in a background job
+        job_id = enqueue("update_profile_picture", {"user_id": user_id}, files=[file], executor=upload_executor)
+        return job_accepted(job_id, "Profile picture update queued")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -379,19 +584,22 @@ def get_profile():
         return jsonify({"error": "Email is required"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, profile_picture, phone FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(PROFILE_QUERY, (email,))
+            user = cursor.fetchone()
 
         if user:
-            return jsonify({
+            response = jsonify({
                 "id": user["id"],
                 "name": user["name"],
                 "profilePic": user["profile_picture"] or "https://via.placeholder.com/150",
                 "phoneNumber": user["phone"] or ""
             })
+            return conditional_response(
+                request, response, PRIVATE_CACHE_CONTROL,
+                version_etag("profile", user["id"], user["updated_at"]), last_modified(user["updated_at"])
+            )
         else:
             return jsonify({"error": "User not found"}), 404
 
@@ -411,8 +619,12 @@ def update_name():
         return jsonify({"error": "Missing user_id or name"}), 400
 
     try:
-        cursor.execute("UPDATE users SET name = %s WHERE id = %s", (name, user_id))
-        db.commit()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE users SET name = %s WHERE id = %s", (name, user_id))
+            conn.commit()
+            cursor.close()
+        catalogue_cache.invalidate_seller(user_id)
         return jsonify({"message": "Name updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -429,69 +641,94 @@ def update_phone_number():
         return jsonify({"error": "Invalid phone number. Must be exactly 10 digits."}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET phone = %s WHERE id = %s", (phone_number, user_id))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE users SET phone = %s WHERE id = %s", (phone_number, user_id))
+            conn.commit()
+            cursor.close()
+        catalogue_cache.invalidate_seller(user_id)
 
         return jsonify({"message": "Phone number updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def shape_products(products, listing):
+    """Builds the /get-products response from the rows fetched for build_products_query()."""
+    next_cursor = None
+    if listing['paginate'] and len(products) > listing['limit']:
+        products = products[:listing['limit']]
+        last = products[-1]
+        next_cursor = encode_cursor(listing['sort'], last['sort_key'], last['id'])
+
+    for product in products:
+        del product['sort_key']
+
+    if listing['paginate']:
+        return {"products": products, "next_cursor": next_cursor}
+    return products
+
+
+def export_products(rows):
+    """Product rows for the NDJSON export, shaped like /get-products items."""
+    for row in rows:
+        del row['sort_key']
+        yield row
+
+
+def listed_products(result):
+    """The product list inside a /get-products response (paginated or not)."""
+    return result['products'] if isinstance(result, dict) else result
+
+
+def flag_wishlisted(result, wishlisted_ids):
+    """Copy of a /get-products response with an `in_wishlist` flag on every product.
+
+    Copies rather than mutates: the response may be shared through the catalogue cache.
+    """
+    products = [
+        {**product, 'in_wishlist': product['id'] in wishlisted_ids}
+        for product in listed_products(result)
+    ]
+    if isinstance(result, dict):
+        return {**result, 'products': products}
+    return products
+
+
 @app.route("/get-products", methods=["GET"])
 def get_products():
     try:
-        search = request.args.get('search', '')
-        category = request.args.get('category', '')
-        condition = request.args.get('condition', '')
-        sort_order = request.args.get('sort', 'newest')
-
-        query = """
-            SELECT p.id, p.user_id, p.name, p.description, p.category, p.state, p.price, p.image_url 
-            FROM products p 
-            WHERE 1=1
-        """
-        params = []
-
-        # Add search condition
-        if search:
-            query += " AND (p.name LIKE %s OR p.description LIKE %s)"
-            params.extend([f'%{search}%', f'%{search}%'])
-
-        # Add category filter
-        if category and category != 'All':
-            query += " AND p.category = %s"
-            params.append(category)
-
-        # Add condition filter
-        if condition:
-            query += " AND p.state = %s"
-            params.append(condition)
-
-        # Add sorting
-        if sort_order == 'low-to-high':
-            query += " ORDER BY p.price ASC"
-        elif sort_order == 'high-to-low':
-            query += " ORDER BY p.price DESC"
-        else:  # newest
-            query += " ORDER BY p.created_at DESC"
-
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, params)
-        products = cursor.fetchall()
+        if wants_ndjson(request.args, request.headers.get('Accept', '')):
+            # Export mode streams every matching row: no pages, no cache
+            listing = build_products_query({
+                name: value for name, value in request.args.items() if name not in ('limit', 'cursor')
+            })
+            return ndjson_response(listing['query'], listing['params'], export_products)
+
+        listing = build_products_query(request.args)
+
+        def load_products():
+            with db_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(listing['query'], listing['params'])
+                return shape_products(cursor.fetchall(), listing)
+
+        if listing['cache_key'] is None:
+            result = load_products()
+        else:
+            result = catalogue_cache.get_or_load(listing['cache_key'], load_products)
 
-        # Convert decimal values to float for JSON serialization
-        for product in products:
-            if 'price' in product and product['price'] is not None:
-                product['price'] = float(product['price'])
+        # Optional per-user wishlist flags, added after the (shared) cache lookup
+        wishlist_user_id = request.args.get('wishlist_user_id')
+        if wishlist_user_id:
+            product_ids = [product['id'] for product in listed_products(result)]
+            result = flag_wishlisted(result, load_wishlisted_ids(wishlist_user_id, product_ids))
 
-        conn.close()
-        return jsonify(products)
+        cache_control = PRIVATE_CACHE_CONTROL if wishlist_user_id else LISTING_CACHE_CONTROL
+        return conditional_response(request, jsonify(result), cache_control)
 
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error fetching products: {e}")
         traceback.print_exc()  # Print full stack trace for debugging
@@ -515,17 +752,17 @@ def update_product(product_id):
         return jsonify({"error": "All fields are required to update the product"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        update_query = """
-            UPDATE products
-            SET name = %s, description = %s, category = %s, state = %s, price = %s
-            WHERE id = %s
-        """
-        cursor.execute(update_query, (name, description, category, state, price, product_id))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            update_query = """
+                UPDATE products
+                SET name = %s, description = %s, category = %s, state = %s, price = %s
+                WHERE id = %s
+            """
+            cursor.execute(update_query, (name, description, category, state, price, product_id))
+            conn.commit()
+            cursor.close()
+        catalogue_cache.invalidate_product(product_id)
 
         return jsonify({"message": "Product updated successfully"}), 200
     except Exception as e:
@@ -543,44 +780,41 @@ def get_user_id():
 @app.route('/toggle-wishlist', methods=['POST'])
 def toggle_wishlist():
     data = request.json
-    print(f"Received wishlist toggle request: {data}")  # Add debug logging
 
     user_id = data.get("users_id")
-    image_url = data.get("image_url")
+    product_id = data.get("product_id")
+    image_url = data.get("image_url")  # older clients identify the product by its image
 
-    if not user_id or not image_url:
-        print(f"Missing fields - user_id: {user_id}, image_url: {image_url}")
+    if not user_id or not (product_id or image_url):
+        print(f"Missing fields - user_id: {user_id}, product_id: {product_id}, image_url: {image_url}")
         return jsonify({"error": "Missing fields"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Check if item exists in wishlist
-        cursor.execute(
-            "SELECT * FROM wishlist WHERE users_id = %s AND image_url = %s",
-            (user_id, image_url)
-        )
-        existing = cursor.fetchone()
-        print(f"Existing wishlist item: {existing}")  # Add debug logging
-
-        if existing:
-            cursor.execute(
-                "DELETE FROM wishlist WHERE users_id = %s AND image_url = %s",
-                (user_id, image_url)
-            )
-            result = {"message": "Removed from wishlist", "status": "removed"}
-        else:
-            cursor.execute(
-                "INSERT INTO wishlist (users_id, image_url) VALUES (%s, %s)",
-                (user_id, image_url)
-            )
-            result = {"message": "Added to wishlist", "status": "added"}
+        with db_connection() as conn:
+            cursor = conn.cursor()
+
+            if not product_id:
+                cursor.execute("SELECT id FROM products WHERE image_url = %s LIMIT 1", (image_url,))
+                row = cursor.fetchone()
+                if not row:
+                    cursor.close()
+                    return jsonify({"error": "Product not found"}), 404
+                product_id = row[0]
+
+            # Each statement is atomic on the (users_id, product_id) unique key,
+            # so concurrent toggles can't create duplicates
+            cursor.execute(WISHLIST_REMOVE_QUERY, (user_id, product_id))
+            if cursor.rowcount:
+                result = {"message": "Removed from wishlist", "status": "removed"}
+            else:
+                cursor.execute("""
+                    INSERT INTO wishlist (users_id, product_id) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE product_id = product_id
+                """, (user_id, product_id))
+                result = {"message": "Added to wishlist", "status": "added"}
 
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print(f"Operation result: {result}")  # Add debug logging
+            conn.commit()
+            cursor.close()
         return jsonify(result), 200
 
     except Exception as e:
@@ -593,46 +827,18 @@ def toggle_wishlist():
 @app.route('/get-wishlist', methods=['GET'])
 def get_wishlist():
     user_id = request.args.get('user_id')
-    print(f"Received request for user_id: {user_id}")  # Add debug logging
 
     if not user_id:
         return jsonify({"error": "User ID is required"}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        cursor.execute(
-            "SELECT image_url FROM wishlist WHERE users_id = %s",
-            (user_id,)
-        )
-        wishlist_items = cursor.fetchall()
-        print(f"Found wishlist items: {wishlist_items}")  # Add debug logging
+            cursor.execute(WISHLIST_QUERY, (user_id,))
+            products = cursor.fetchall()
 
-        # If the wishlist is empty, clean up and return an empty list
-        if not wishlist_items:
             cursor.close()
-            conn.close()
-            return jsonify([])
-
-        image_urls = [item[0] for item in wishlist_items]
-        print(f"Image URLs: {image_urls}")  # Add debug logging
-
-        # Use dictionary cursor for better data handling
-        cursor = conn.cursor(dictionary=True)
-        placeholders = ', '.join(['%s'] * len(image_urls))
-        
-        query = f"""
-            SELECT id, name, description, price, state, category, image_url, user_id 
-            FROM products 
-            WHERE image_url IN ({placeholders})
-        """
-        cursor.execute(query, tuple(image_urls))
-        products = cursor.fetchall()
-        print(f"Found products: {products}")  # Add debug logging
-
-        cursor.close()
-        conn.close()
         return jsonify(products)  # Return products directly since we're using dictionary cursor
 
     except Exception as e:
@@ -641,55 +847,124 @@ def get_wishlist():
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/product/<int:product_id>', methods=['GET'])
-def get_product_detail(product_id):
-    try:
-        conn = get_db_connection()
+def product_validators(product, seller):
+    """(etag, last_modified) for a product detail response: changes with the product or its seller."""
+    seller_version = seller.get('updated_at') if seller else None
+    return (
+        version_etag("product", product['id'], product.get('updated_at'), seller_version),
+        last_modified(product.get('updated_at'), seller_version),
+    )
+
+
+def load_product_detail(product_id):
+    """Product row with all of its images, or None if it doesn't exist."""
+    with db_connection() as conn:
         cursor = conn.cursor(dictionary=True)
 
         # Get product details
-        cursor.execute("""
-            SELECT p.id, p.user_id, p.name, p.description, p.category, p.state, 
-                   p.price, p.image_url as main_image, p.created_at,
-                   GROUP_CONCAT(pi.image_url) as additional_images
-            FROM products p
-            LEFT JOIN product_images pi ON p.id = pi.product_id
-            WHERE p.id = %s
-            GROUP BY p.id
-        """, (product_id,))
+        cursor.execute(PRODUCT_DETAIL_QUERY, (product_id,))
         product = cursor.fetchone()
+        cursor.close()
 
-        if not product:
-            return jsonify({"error": "Product not found"}), 404
+    return format_product_detail(product)
 
-        # Get seller details
-        cursor.execute("""
-            SELECT id, name, email, profile_picture as profilePic, phone as phoneNumber
-            FROM users
-            WHERE id = %s
-        """, (product.get('user_id'),))
+
+def load_seller(user_id):
+    """Public seller details shown alongside a product."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(SELLER_QUERY, (user_id,))
         seller = cursor.fetchone()
+        cursor.close()
+    return seller
+
+
+def load_by_cache_keys(keys, select, where_column, group_by=""):
+    """Cache loader for "<kind>:<id>" keys: one IN query for all the missing ids."""
+    ids = {int(key.split(":", 1)[1]): key for key in keys}
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(batch_query(select, where_column, len(ids), group_by), list(ids))
+        rows = cursor.fetchall()
+        cursor.close()
+    return {ids[row['id']]: row for row in rows}
+
+
+def load_product_summaries(product_ids):
+    """Compact product + seller cards for many products, read through the catalogue cache.
 
-        # Process the additional images
-        all_images = [product['main_image']]  # Start with main image
-        if product['additional_images']:
-            additional_images = product['additional_images'].split(',')
-            all_images.extend(additional_images)
-
-        # Format the product data
-        formatted_product = {
-            **product,
-            'images': all_images,  # Add all images array
-            'created_at': product['created_at'].isoformat() if product['created_at'] else None
+    Uses the same product:<id> and seller:<user_id> entries as /product/<id>,
+    so writes that invalidate a product page invalidate its summary too.
+    Missing products are left out.
+    """
+    products = catalogue_cache.get_many_or_load(
+        [f"product:{product_id}" for product_id in product_ids],
+        lambda keys: {
+            key: format_product_detail(row)
+            for key, row in load_by_cache_keys(keys, PRODUCT_DETAIL_SELECT, "p.id", "GROUP BY p.id").items()
         }
-        del formatted_product['additional_images']  # Remove the concatenated string
+    )
+    sellers = catalogue_cache.get_many_or_load(
+        [f"seller:{product['user_id']}" for product in products.values()],
+        lambda keys: load_by_cache_keys(keys, SELLER_SELECT, "id")
+    )
+
+    summaries = []
+    for product_id in product_ids:
+        product = products.get(f"product:{product_id}")
+        if not product:
+            continue
+        seller = sellers.get(f"seller:{product['user_id']}")
+        summaries.append({
+            "id": product['id'],
+            "name": product['name'],
+            "price": product['price'],
+            "stock": product['stock'],
+            "image_url": product['main_image'],
+            "thumbnail_url": product.get('thumbnail_url'),
+            "seller": {
+                "id": seller['id'],
+                "name": seller['name'],
+                "profilePic": seller['profilePic'],
+            } if seller else None,
+        })
+    return summaries
 
-        conn.close()
 
-        return jsonify({
-            "product": formatted_product,
+@app.route('/api/products/summaries', methods=['GET'])
+def get_product_summaries():
+    """Product cards for a list of ids (Messages inbox): ?ids=1,2,3 -> {"products": [...]}."""
+    try:
+        product_ids = list(dict.fromkeys(
+            int(product_id) for product_id in request.args.get('ids', '').split(',') if product_id.strip()
+        ))
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+    if len(product_ids) > MAX_PAGE_SIZE:
+        return jsonify({"error": f"At most {MAX_PAGE_SIZE} product IDs per request"}), 400
+
+    try:
+        response = jsonify({"products": load_product_summaries(product_ids) if product_ids else []})
+        return conditional_response(request, response, PRODUCT_CACHE_CONTROL)
+    except Exception as e:
+        print(f"Error fetching product summaries: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/product/<int:product_id>', methods=['GET'])
+def get_product_detail(product_id):
+    try:
+        product = catalogue_cache.get_or_load(f"product:{product_id}", lambda: load_product_detail(product_id))
+        if not product:
+            return jsonify({"error": "Product not found"}), 404
+
+        seller = catalogue_cache.get_or_load(f"seller:{product['user_id']}", lambda: load_seller(product['user_id']))
+
+        response = jsonify({
+            "product": product,
             "seller": seller
         })
+        return conditional_response(request, response, PRODUCT_CACHE_CONTROL, *product_validators(product, seller))
 
     except Exception as e:
         print("Error fetching product details:", e)
@@ -700,15 +975,14 @@ def get_product_detail(product_id):
 def get_user_by_id(users_id):
     """Fetch user information by ID."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT id, name, email, phone, profile_picture FROM users WHERE id = %s",
-            (users_id,)
-        )
-        users = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT id, name, email, phone, profile_picture FROM users WHERE id = %s",
+                (users_id,)
+            )
+            users = cursor.fetchone()
+            cursor.close()
 
         if not users:
             return jsonify({"error": "User not found"}), 404
@@ -727,6 +1001,7 @@ def get_user_by_id(users_id):
 
 
 @app.route('/api/upload-multiple', methods=['POST', 'OPTIONS'])
+@idempotent("upload-multiple")
 def upload_multiple():
     # Handle preflight CORS requests
     if request.method == 'OPTIONS':
@@ -758,66 +1033,25 @@ def upload_multiple():
         if len(files) == 0 or files[0].filename == '':
             return jsonify({"error": "No images selected"}), 400
         
-        # Upload to Google Cloud Storage and get URLs
-        image_urls = []
-        for file in files:
-            if file and allowed_file(file.filename):
-                # Upload to Google Cloud Storage instead of local storage
-                image_url = gcs_upload_image(file, "product-image")
-                if image_url:
-                    image_urls.append(image_url)
-                else:
-                    # If GCS upload fails, clean up any uploaded images
-                    for url in image_urls:
-                        delete_from_gcs(url)
-                    return jsonify({"error": "Failed to upload image to Google Cloud Storage"}), 500
-        
-        if not image_urls:
+        valid_files = [file for file in files if file and allowed_file(file.filename)]
+        if not valid_files:
             return jsonify({"error": "No valid images uploaded"}), 400
-            
-        print(f"Uploaded {len(image_urls)} images to GCS")
-        
-        # Create database connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Insert product into database with first image as main image
-        cursor.execute("""
-            INSERT INTO products 
-            (user_id, name, description, category, state, price, image_url, original_price, months_used)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            user_id, 
-            name, 
-            description, 
-            category, 
-            state, 
-            price, 
-            image_urls[0],  # Use first image as main product image
-            original_price if original_price else None,
-            months_used if months_used else None
-        ))
-        
-        # Get the inserted product ID
-        product_id = cursor.lastrowid
-        print(f"Created product with ID: {product_id}")
-        
-        # Add all images to product_images table
-        for image_url in image_urls:
-            cursor.execute("""
-                INSERT INTO product_images (product_id, image_url)
-                VALUES (%s, %s)
-            """, (product_id, image_url))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return jsonify({
-            "message": f"Product uploaded successfully with {len(image_urls)} images",
-            "product_id": product_id,
-            "image_urls": image_urls
-        })
+
+        # Uploading (in parallel) and saving the product happen in a background job
+        job_id = enqueue("upload_product", {
+            "user_id": user_id,
+            "name": name,
+            "description": description,
+            "category": category,
+            "state": state,
+            "price": price,
+            "original_price": original_price,
+            "months_used": months_used,
+            "upload_id": uuid.uuid4().hex
+        }, files=valid_files, executor=upload_executor)
+        print(f"Queued upload job {job_id} with {len(valid_files)} images")
+
+        return job_accepted(job_id, f"Product upload queued with {len(valid_files)} images")
             
     except Exception as e:
         print(f"Error in upload_multiple: {str(e)}")
@@ -831,28 +1065,17 @@ def upload_multiple():
 def get_cart():
     try:
         user_id = get_current_user_id()
-        print(f"User ID from token: {user_id}")  # Debug log
-        
+
         if not user_id:
             return jsonify({"error": "Unauthorized"}), 401
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT c.id as cart_id, c.quantity, 
-                   p.id as product_id, p.name, p.description, p.price, p.image_url,
-                   u.name as seller_name
-            FROM cart c
-            JOIN products p ON c.product_id = p.id
-            JOIN users u ON p.user_id = u.id
-            WHERE c.user_id = %s
-        """, (user_id,))
-        
-        cart_items = cursor.fetchall()
-        print(f"Found cart items: {cart_items}")  # Debug log
-        
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            cursor.execute(CART_QUERY, (user_id,))
+
+            cart_items = cursor.fetchall()
+
         return jsonify(cart_items)
         
     except Exception as e:
@@ -862,18 +1085,17 @@ def get_cart():
 @app.route('/api/cart/<int:user_id>', methods=['GET'])
 def get_cart_items(user_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT c.*, p.name, p.price, p.image_url, p.description 
-            FROM cart c 
-            JOIN products p ON c.product_id = p.id 
-            WHERE c.user_id = %s
-        """, (user_id,))
-        
-        cart_items = cursor.fetchall()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            cursor.execute("""
+                SELECT c.*, p.name, p.price, p.image_url, p.thumbnail_url, p.description 
+                FROM cart c 
+                JOIN products p ON c.product_id = p.id 
+                WHERE c.user_id = %s
+            """, (user_id,))
+
+            cart_items = cursor.fetchall()
         
         return jsonify(cart_items)
     except Exception as e:
@@ -882,35 +1104,46 @@ def get_cart_items(user_id):
 
 @app.route('/api/cart/add', methods=['POST'])
 def add_to_cart():
-    data = request.get_json()
-    user_id = int(data.get('userId'))  # Convert to int
-    product_id = int(data.get('productId'))  # Convert to int
-    quantity = int(data.get('quantity', 1))  # Convert to int
-    
+    data = request.get_json() or {}
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check if item exists in cart
-        cursor.execute(
-            "SELECT * FROM cart WHERE user_id = %s AND product_id = %s",
-            (user_id, product_id)
-        )
-        existing_item = cursor.fetchone()
-        
-        if existing_item:
-            cursor.execute(
-                "UPDATE cart SET quantity = quantity + %s WHERE user_id = %s AND product_id = %s",
-                (quantity, user_id, product_id)
-            )
-        else:
+        user_id = int(data.get('userId'))  # Convert to int
+        product_id = int(data.get('productId'))  # Convert to int
+        quantity = int(data.get('quantity', 1))  # Convert to int
+        if quantity < 1:
+            raise ValueError("quantity must be at least 1")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid cart item: {e}"}), 400
+
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            conn.start_transaction(isolation_level=inventory.TRANSACTION_ISOLATION)
+
+            # Insert or bump the quantity in one statement (unique key on user_id, product_id)
+            cursor.execute("""
+                INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+            """, (user_id, product_id, quantity))
             cursor.execute(
-                "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)",
-                (user_id, product_id, quantity)
+                "SELECT quantity FROM cart WHERE user_id = %s AND product_id = %s",
+                (user_id, product_id)
             )
-            
-        conn.commit()
-        conn.close()
+            cart_quantity = cursor.fetchone()[0]
+            cursor.close()
+
+            # Hold the units while they sit in the cart
+            if not inventory.reserve(conn, user_id, product_id, cart_quantity):
+                conn.rollback()
+                units = inventory.available(conn, user_id, product_id)
+                if units:
+                    # e.g. a second click on a single item: the cart keeps what it had
+                    return jsonify({
+                        "error": f"Only {units} available; your cart can't hold more than that",
+                        "available": units
+                    }), 409
+                return jsonify({"error": "This item is no longer available"}), 409
+
+            conn.commit()
         return jsonify({"message": "Added to cart successfully"})
         
     except Exception as e:
@@ -927,67 +1160,104 @@ def remove_from_cart():
         if not user_id or not product_id:
             return jsonify({"error": "User ID and Product ID are required"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # First check if the item exists in the cart
-        cursor.execute(
-            "SELECT * FROM cart WHERE user_id = %s AND product_id = %s",
-            (user_id, product_id)
-        )
-        if not cursor.fetchone():
-            conn.close()
-            return jsonify({"error": "Item not found in cart"}), 404
+        with db_connection() as conn:
+            cursor = conn.cursor()
 
-        # Delete the item from cart
-        cursor.execute(
-            "DELETE FROM cart WHERE user_id = %s AND product_id = %s",
-            (user_id, product_id)
-        )
+            # Delete the item from cart; no row deleted means it wasn't there
+            cursor.execute(CART_REMOVE_QUERY, (user_id, product_id))
+            removed = cursor.rowcount
+            inventory.release(conn, user_id, [product_id])
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
+        if not removed:
+            return jsonify({"error": "Item not found in cart"}), 404
         return jsonify({"message": "Item removed successfully"})
 
     except Exception as e:
         print(f"Error removing item from cart: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/cart/update', methods=['POST'])
+def update_cart():
+    """Apply many quantity changes in one transaction.
+
+    Body: {"userId": 1, "items": [{"productId": 7, "quantity": 2}, ...]}.
+    A quantity of 0 or less removes the product from the cart.
+    """
+    data = request.get_json() or {}
+    items = data.get('items')
+
+    try:
+        user_id = int(data.get('userId'))
+        if not isinstance(items, list) or not items:
+            raise ValueError("items must be a non-empty list")
+        if len(items) > MAX_PAGE_SIZE:
+            raise ValueError(f"At most {MAX_PAGE_SIZE} items per request")
+        # Later entries for the same product win
+        changes = {int(item['productId']): int(item['quantity']) for item in items}
+    except (TypeError, ValueError, KeyError) as e:
+        return jsonify({"error": f"Invalid cart update: {e}"}), 400
+
+    # Product id order keeps row locks in the same order as checkout
+    upserts = sorted((user_id, product_id, quantity) for product_id, quantity in changes.items() if quantity > 0)
+    removals = [product_id for product_id, quantity in changes.items() if quantity <= 0]
+
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            conn.start_transaction(isolation_level=inventory.TRANSACTION_ISOLATION)
+
+            if upserts:
+                cursor.executemany(CART_SET_QUANTITY_QUERY, upserts)
+
+                unavailable = [
+                    product_id for _, product_id, quantity in upserts
+                    if not inventory.reserve(conn, user_id, product_id, quantity)
+                ]
+                if unavailable:
+                    conn.rollback()
+                    return jsonify({
+                        "error": "Some items are no longer available",
+                        "unavailable": unavailable
+                    }), 409
+
+            if removals:
+                cursor.execute(*cart_removal_query(user_id, removals))
+                inventory.release(conn, user_id, removals)
+
+            conn.commit()
+            cursor.close()
+
+        return jsonify({
+            "message": "Cart updated successfully",
+            "updated": len(upserts),
+            "removed": len(removals)
+        })
+
+    except Exception as e:
+        print(f"Error updating cart: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/wishlist/check/<int:product_id>', methods=['POST'])
 def check_wishlist_status(product_id):
     data = request.get_json()
     user_id = data.get('userId')
     
     try:
-        # First, get the image_url for this product
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            # One lookup tells us both whether the product exists and whether it's wishlisted
+            cursor.execute(WISHLIST_PRODUCT_STATUS_QUERY, (user_id, product_id))
+            product = cursor.fetchone()
+            cursor.close()
 
-        # Get the product's image_url
-        cursor.execute(
-            "SELECT image_url FROM products WHERE id = %s",
-            (product_id,)
-        )
-        product = cursor.fetchone()
-        
         if not product:
-            conn.close()
             return jsonify({"status": "not_exists", "error": "Product not found"}), 404
-            
-        image_url = product['image_url']
-        
-        # Check if this image_url is in the user's wishlist
-        cursor.execute(
-            "SELECT * FROM wishlist WHERE users_id = %s AND image_url = %s",
-            (user_id, image_url)
-        )
-        wishlist_item = cursor.fetchone()
 
-        conn.close()
-
-        if wishlist_item:
+        if product['wishlist_id']:
             return jsonify({"status": "exists"})
         else:
             return jsonify({"status": "not_exists"})
@@ -997,8 +1267,47 @@ def check_wishlist_status(product_id):
         return jsonify({"error": str(e)}), 500
 
 
+def load_wishlisted_ids(user_id, product_ids):
+    """Set of the given product ids that the user has wishlisted (one query on the unique key)."""
+    if not product_ids:
+        return set()
+    sql, params = wishlist_status_query(user_id, product_ids)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        wishlisted = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+    return wishlisted
+
+
+@app.route('/api/wishlist/check', methods=['POST'])
+def check_wishlist_status_bulk():
+    """Wishlist state for a grid of products: {"userId", "productIds": [...]} -> {"wishlisted": [...]}."""
+    data = request.get_json() or {}
+    user_id = data.get('userId')
+    product_ids = data.get('productIds')
+
+    if not user_id or not isinstance(product_ids, list):
+        return jsonify({"error": "userId and a productIds list are required"}), 400
+    if len(product_ids) > MAX_PAGE_SIZE:
+        return jsonify({"error": f"At most {MAX_PAGE_SIZE} product IDs per request"}), 400
+
+    try:
+        product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "productIds must be integers"}), 400
+
+    try:
+        wishlisted = load_wishlisted_ids(user_id, product_ids)
+        return jsonify({"wishlisted": [product_id for product_id in product_ids if product_id in wishlisted]})
+    except Exception as e:
+        print(f"Error checking wishlist status: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 # Checkout Routes
 @app.route('/api/checkout', methods=['POST'])
+@idempotent("checkout")
 def create_order():
     try:
         data = request.json
@@ -1006,44 +1315,10 @@ def create_order():
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
+        # Build everything that doesn't need the database before the
+        # transaction starts, so row locks are held as briefly as possible
         try:
-            # Start transaction
-            conn.start_transaction()
-
-            # Get cart items first
-            cursor.execute("""
-                SELECT c.product_id, c.quantity, p.price, p.name
-                FROM cart c
-                JOIN products p ON c.product_id = p.id
-                WHERE c.user_id = %s
-            """, (user_id,))
-            
-            cart_items = cursor.fetchall()
-            if not cart_items:
-                return jsonify({"error": "Cart is empty"}), 400
-
-            # Calculate total amount
-            total_amount = sum(item['price'] * item['quantity'] for item in cart_items)
-
-            # Create order - Make sure user_id is cast to INTEGER
-            cursor.execute("""
-                INSERT INTO orders (user_id, total_amount, status) 
-                VALUES (CAST(%s AS UNSIGNED), %s, 'pending')
-            """, (user_id, total_amount))
-            
-            order_id = cursor.lastrowid
-
-            # Create delivery address - Make sure user_id is cast to INTEGER
-            cursor.execute("""
-                INSERT INTO delivery_addresses 
-                (order_id, user_id, full_name, phone, address, city, state, pincode, hostel_room)
-                VALUES (%s, CAST(%s AS UNSIGNED), %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                order_id,
-                user_id,
+            address = (
                 data['fullName'],
                 data['phone'],
                 data['address'],
@@ -1051,33 +1326,85 @@ def create_order():
                 data['state'],
                 data['pincode'],
                 data.get('hostelRoom', '')
-            ))
+            )
+        except KeyError as e:
+            return jsonify({"error": f"Missing field: {e.args[0]}"}), 400
 
-            # Create order items
-            for item in cart_items:
-                cursor.execute("""
-                    INSERT INTO order_items (order_id, product_id, quantity, price)
-                    VALUES (%s, %s, %s, %s)
-                """, (order_id, item['product_id'], item['quantity'], item['price']))
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-            # Clear cart
-            cursor.execute("DELETE FROM cart WHERE user_id = CAST(%s AS UNSIGNED)", (user_id,))
+            try:
+                # Start transaction
+                conn.start_transaction(isolation_level=inventory.TRANSACTION_ISOLATION)
 
-            # Commit transaction
-            conn.commit()
+                # Lock the cart rows (and their products) so the total can't
+                # change underneath us; product order keeps lock order consistent
+                cursor.execute(CHECKOUT_CART_QUERY, (user_id,))
 
-            return jsonify({
-                "message": "Order placed successfully",
-                "orderId": order_id
-            })
+                cart_items = cursor.fetchall()
+                if not cart_items:
+                    conn.rollback()
+                    return jsonify({"error": "Cart is empty"}), 400
 
-        except Exception as e:
-            conn.rollback()
-            print(f"Error in transaction: {str(e)}")
-            raise e
+                # Conditional stock decrements; other buyers' live reservations count
+                # against what's left (raises OutOfStockError, handled below)
+                inventory.take_stock(conn, user_id, cart_items)
 
-        finally:
-            conn.close()
+                # Calculate total amount
+                total_amount = sum(item['price'] * item['quantity'] for item in cart_items)
+
+                # Create order - Make sure user_id is cast to INTEGER
+                cursor.execute("""
+                    INSERT INTO orders (user_id, total_amount, status) 
+                    VALUES (CAST(%s AS UNSIGNED), %s, 'pending')
+                """, (user_id, total_amount))
+
+                order_id = cursor.lastrowid
+
+                # Create delivery address - Make sure user_id is cast to INTEGER
+                cursor.execute("""
+                    INSERT INTO delivery_addresses 
+                    (order_id, user_id, full_name, phone, address, city, state, pincode, hostel_room)
+                    VALUES (%s, CAST(%s AS UNSIGNED), %s, %s, %s, %s, %s, %s, %s)
+                """, (order_id, user_id) + address)
+
+                # Create order items; mysql.connector sends an INSERT executemany
+                # as a single multi-row INSERT statement
+                cursor.executemany("""
+                    INSERT INTO order_items (order_id, product_id, quantity, price)
+                    VALUES (%s, %s, %s, %s)
+                """, [
+                    (order_id, item['product_id'], item['quantity'], item['price'])
+                    for item in cart_items
+                ])
+
+                # Clear cart and its reservations
+                cursor.execute("DELETE FROM cart WHERE user_id = CAST(%s AS UNSIGNED)", (user_id,))
+                inventory.release(conn, user_id)
+
+                # Commit transaction
+                conn.commit()
+
+                # Stock changed: sold-out products drop out of the listings
+                for item in cart_items:
+                    catalogue_cache.invalidate_product(item['product_id'])
+
+                return jsonify({
+                    "message": "Order placed successfully",
+                    "orderId": order_id
+                })
+
+            except OutOfStockError as e:
+                conn.rollback()
+                return jsonify({
+                    "error": "Some items are no longer available",
+                    "unavailable": e.product_ids
+                }), 409
+
+            except Exception as e:
+                conn.rollback()
+                print(f"Error in transaction: {str(e)}")
+                raise e
 
     except Exception as e:
         print(f"Error creating order: {str(e)}")
@@ -1090,69 +1417,15 @@ def get_orders():
         if not user_id:
             return jsonify({"error": "Unauthorized"}), 401
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Updated query with correct JOIN condition
-        cursor.execute("""
-            SELECT 
-                o.id, o.user_id, o.total_amount, o.status, o.created_at,
-                da.full_name, da.phone, da.address, da.city, da.state, da.pincode,
-                GROUP_CONCAT(oi.product_id) as product_ids,
-                GROUP_CONCAT(oi.quantity) as quantities,
-                GROUP_CONCAT(oi.price) as prices,
-                GROUP_CONCAT(p.name) as product_names,
-                GROUP_CONCAT(p.image_url) as image_urls
-            FROM orders o
-            LEFT JOIN delivery_addresses da ON o.id = da.order_id
-            LEFT JOIN order_items oi ON o.id = oi.order_id
-            LEFT JOIN products p ON oi.product_id = p.id
-            WHERE o.user_id = %s
-            GROUP BY o.id, da.id
-            ORDER BY o.created_at DESC
-        """, (user_id,))
-        
-        orders_data = cursor.fetchall()
-        print(f"Orders data: {orders_data}")  # Debug log
-        
-        orders = []
-        for order in orders_data:
-            # Format items data
-            product_ids = str(order['product_ids']).split(',') if order['product_ids'] else []
-            quantities = str(order['quantities']).split(',') if order['quantities'] else []
-            prices = str(order['prices']).split(',') if order['prices'] else []
-            names = str(order['product_names']).split(',') if order['product_names'] else []
-            images = str(order['image_urls']).split(',') if order['image_urls'] else []
-            
-            items = [
-                {
-                    'id': pid,
-                    'quantity': int(qty),
-                    'price': float(price),
-                    'name': name,
-                    'image_url': img
-                }
-                for pid, qty, price, name, img in zip(product_ids, quantities, prices, names, images)
-                if pid and qty and price and name
-            ]
-            
-            orders.append({
-                'id': order['id'],
-                'total_amount': float(order['total_amount']),
-                'status': order['status'],
-                'created_at': order['created_at'].isoformat() if order['created_at'] else None,
-                'delivery_address': {
-                    'full_name': order['full_name'],
-                    'phone': order['phone'],
-                    'address': order['address'],
-                    'city': order['city'],
-                    'state': order['state'],
-                    'pincode': order['pincode']
-                },
-                'items': items
-            })
-        
-        print(f"Formatted orders: {orders}")  # Debug log
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            cursor.execute(USER_ORDER_ROWS_QUERY, (user_id,))
+
+            # Group rows as they are read instead of materialising the result set first
+            orders = group_order_rows(cursor)
+            cursor.close()
+
         return jsonify(orders)
         
     except Exception as e:
@@ -1163,59 +1436,58 @@ def get_orders():
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
 def get_order_details(order_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
 
-        # Get order details
-        cursor.execute("""
-            SELECT o.*, 
-                   d.full_name, d.phone, d.address, d.city, d.state, d.pincode, d.hostel_room
-            FROM orders o
-            LEFT JOIN delivery_addresses d ON o.id = d.order_id
-            WHERE o.id = %s
-        """, (order_id,))
-        order = cursor.fetchone()
-
-        if not order:
-            return jsonify({"error": "Order not found"}), 404
-
-        # Get order items
-        cursor.execute("""
-            SELECT oi.*, p.name, p.image_url
-            FROM order_items oi
-            JOIN products p ON oi.product_id = p.id
-            WHERE oi.order_id = %s
-        """, (order_id,))
-        items = cursor.fetchall()
-
-        # Construct response
-        response = {
-            "id": order['id'],
-            "user_id": order['user_id'],
-            "status": order['status'],
-            "total_amount": float(order['total_amount']),
-            "created_at": order['created_at'].isoformat(),
-            "delivery_address": {
-                "full_name": order['full_name'],
-                "phone": order['phone'],
-                "address": order['address'],
-                "city": order['city'],
-                "state": order['state'],
-                "pincode": order['pincode'],
-                "hostel_room": order['hostel_room']
-            },
-            "items": [{
-                "id": item['id'],
-                "product_id": item['product_id'],
-                "quantity": item['quantity'],
-                "price": float(item['price']),
-                "name": item['name'],
-                "image_url": item['image_url']
-            } for item in items]
-        }
+            # Get order details
+            cursor.execute("""
+                SELECT o.*, 
+                       d.full_name, d.phone, d.address, d.city, d.state, d.pincode, d.hostel_room
+                FROM orders o
+                LEFT JOIN delivery_addresses d ON o.id = d.order_id
+                WHERE o.id = %s
+            """, (order_id,))
+            order = cursor.fetchone()
+
+            if not order:
+                return jsonify({"error": "Order not found"}), 404
+
+            # Get order items
+            cursor.execute("""
+                SELECT oi.*, p.name, p.image_url
+                FROM order_items oi
+                JOIN products p ON oi.product_id = p.id
+                WHERE oi.order_id = %s
+            """, (order_id,))
+            items = cursor.fetchall()
+
+            # Construct response
+            response = {
+                "id": order['id'],
+                "user_id": order['user_id'],
+                "status": order['status'],
+                "total_amount": order['total_amount'],
+                "created_at": order['created_at'],
+                "delivery_address": {
+                    "full_name": order['full_name'],
+                    "phone": order['phone'],
+                    "address": order['address'],
+                    "city": order['city'],
+                    "state": order['state'],
+                    "pincode": order['pincode'],
+                    "hostel_room": order['hostel_room']
+                },
+                "items": [{
+                    "id": item['id'],
+                    "product_id": item['product_id'],
+                    "quantity": item['quantity'],
+                    "price": item['price'],
+                    "name": item['name'],
+                    "image_url": item['image_url']
+                } for item in items]
+            }
 
-        cursor.close()
-        conn.close()
+            cursor.close()
 
         return jsonify(response)
 
@@ -1227,46 +1499,43 @@ def get_order_details(order_id):
 @app.route('/api/orders/user/<int:user_id>', methods=['GET'])
 def get_user_orders(user_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # First, get all orders for the user
-        cursor.execute("""
-            SELECT o.id, o.total_amount, o.status, o.created_at
-            FROM orders o
-            WHERE o.user_id = %s
-        """, (user_id,))
-        
-        orders_data = cursor.fetchall()
-        
+        if wants_ndjson(request.args, request.headers.get('Accept', '')):
+            # Export mode: every order, one per line, read as a single streamed join
+            return ndjson_response(USER_ORDER_ROWS_QUERY, (user_id,), iter_orders)
+
+        # Pagination is opt-in: send `limit` and/or `cursor` to get pages
+        # back as {"orders": [...], "next_cursor": ...}
+        cursor_token = request.args.get('cursor')
+        paginate = cursor_token is not None or 'limit' in request.args
+        limit = parse_limit(request.args.get('limit')) if paginate else None
+        query, params = build_user_orders_query(user_id, cursor_token, limit)
+
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            # First, get the orders for the user
+            cursor.execute(query, params)
+            orders_data = cursor.fetchall()
+
+            next_cursor = None
+            if paginate and len(orders_data) > limit:
+                orders_data = orders_data[:limit]
+                last = orders_data[-1]
+                next_cursor = encode_cursor('orders', last['created_at'], last['id'])
+
+            # Then addresses and items for all of them at once
+            addresses, items = load_order_details(cursor, [order['id'] for order in orders_data])
+            cursor.close()
+
         # Format the orders data
         orders = []
         for order in orders_data:
-            # Get delivery address for this order
-            cursor.execute("""
-                SELECT full_name, phone, address, city, state, pincode, hostel_room
-                FROM delivery_addresses
-                WHERE order_id = %s
-            """, (order['id'],))
-            
-            address_data = cursor.fetchone() or {}
-            
-            # Get order items for this order
-            cursor.execute("""
-                SELECT oi.product_id, oi.quantity, oi.price, p.name, p.image_url
-                FROM order_items oi
-                JOIN products p ON oi.product_id = p.id
-                WHERE oi.order_id = %s
-            """, (order['id'],))
-            
-            items_data = cursor.fetchall() or []
-            
-            # Format order data
+            address_data = addresses.get(order['id'], {})
             orders.append({
                 'id': order['id'],
-                'total_amount': float(order['total_amount']),
+                'total_amount': order['total_amount'],
                 'status': order['status'],
-                'created_at': order['created_at'].isoformat() if order['created_at'] else None,
+                'created_at': order['created_at'],
                 'delivery_address': {
                     'full_name': address_data.get('full_name', ''),
                     'phone': address_data.get('phone', ''),
@@ -1279,24 +1548,31 @@ def get_user_orders(user_id):
                     {
                         'id': item['product_id'],
                         'quantity': item['quantity'],
-                        'price': float(item['price']),
+                        'price': item['price'],
                         'name': item['name'],
                         'image_url': item['image_url']
                     }
-                    for item in items_data
+                    for item in items.get(order['id'], [])
                 ]
             })
-        
-        cursor.close()
-        conn.close()
+
+        if paginate:
+            return jsonify({"orders": orders, "next_cursor": next_cursor})
         return jsonify(orders)
-        
+
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error fetching user orders: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
 if __name__ == "__main__":
+    # Job workers start here, under gunicorn (gunicorn.conf.py) or in the ASGI
+    # lifespan, never at import: image pool processes re-import this module.
+    # The debug reloader runs this block twice; only its child serves requests.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        jobs.start_workers()
     app.run(debug=True)
 
 # curl -X POST -F "image=@Zoro-Wallpaper-4k.jpg" http://127.0.0.1:5000/upload-image
\ No newline at end of file
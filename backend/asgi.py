@@ -0,0 +1,228 @@
+import os
+import re
+import traceback
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.datastructures import MultiDict
+
+import async_db
+import jobs
+import profiling
+import token_cache
+from app import (app, CORS_ORIGINS, CORS_EXPOSE_HEADERS, shape_products, listed_products, flag_wishlisted,
+                 product_validators)
+from queries import (build_products_query, wishlist_status_query, PRODUCT_DETAIL_QUERY, SELLER_QUERY, CART_QUERY,
+                     format_product_detail)
+from cache import catalogue_cache
+from conditional import (body_etag, is_not_modified, validator_headers,
+                         PRODUCT_CACHE_CONTROL, LISTING_CACHE_CONTROL, PRIVATE_CACHE_CONTROL)
+from pagination import InvalidCursorError
+from streaming import wants_ndjson
+
+# =================== ASGI SERVER =================== #
+#
+# Async serving mode:
+#
+#     gunicorn --workers 1 -k uvicorn.workers.UvicornWorker asgi:application
+#
+# The hot read routes (/get-products, /product/<id>, /api/cart) are served
+# natively on the event loop with aiomysql (async_db.py), so thousands of
+# in-flight requests cost a coroutine each instead of a thread. Every other
+# route is the unchanged Flask app from app.py, run on a thread pool of
+# WSGI_THREADS threads; a slow upload or Firebase call there no longer holds
+# up the hot routes.
+#
+# Responses match the Flask routes byte for byte (same JSON provider, same
+# CORS origins), so clients can't tell which mode is serving them.
+
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "32"))
+
+flask_app = WSGIMiddleware(app, workers=WSGI_THREADS)
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the async routes need."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.headers = {
+            name.decode("latin1").lower(): value.decode("latin1")
+            for name, value in scope.get("headers", [])
+        }
+        query_string = scope.get("query_string", b"").decode("latin1")
+        self.args = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+
+
+async def get_current_user_id(request):
+    """Firebase UID from the Authorization header, or None (same rules as app.get_current_user_id)."""
+    auth_header = request.headers.get("authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+
+    try:
+        decoded_token = await token_cache.verify_token_async(auth_header.split(" ")[1])
+        return decoded_token["uid"]
+    except Exception as e:
+        print(f"Error authenticating token: {e}")
+        return None
+
+
+# =================== ASYNC ROUTES =================== #
+#
+# Handlers return (status, data), or (status, data, caching) for responses
+# that carry validators: caching holds cache_control and optionally etag and
+# modified (the body is hashed when there is no etag).
+
+async def get_products(request):
+    listing = build_products_query(request.args)
+
+    async def load_products():
+        rows = await async_db.fetch_all(listing['query'], listing['params'])
+        return shape_products(rows, listing)
+
+    if listing['cache_key'] is None:
+        result = await load_products()
+    else:
+        result = await catalogue_cache.get_or_load_async(listing['cache_key'], load_products)
+
+    wishlist_user_id = request.args.get('wishlist_user_id')
+    if wishlist_user_id:
+        product_ids = [product['id'] for product in listed_products(result)]
+        wishlisted = set()
+        if product_ids:
+            rows = await async_db.fetch_all(*wishlist_status_query(wishlist_user_id, product_ids))
+            wishlisted = {row['product_id'] for row in rows}
+        result = flag_wishlisted(result, wishlisted)
+
+    cache_control = PRIVATE_CACHE_CONTROL if wishlist_user_id else LISTING_CACHE_CONTROL
+    return 200, result, {"cache_control": cache_control}
+
+
+async def get_product_detail(request, product_id):
+    async def load_product():
+        return format_product_detail(await async_db.fetch_one(PRODUCT_DETAIL_QUERY, (product_id,)))
+
+    product = await catalogue_cache.get_or_load_async(f"product:{product_id}", load_product)
+    if not product:
+        return 404, {"error": "Product not found"}
+
+    seller = await catalogue_cache.get_or_load_async(
+        f"seller:{product['user_id']}",
+        lambda: async_db.fetch_one(SELLER_QUERY, (product['user_id'],))
+    )
+    etag, modified = product_validators(product, seller)
+    caching = {"cache_control": PRODUCT_CACHE_CONTROL, "etag": etag, "modified": modified}
+    return 200, {"product": product, "seller": seller}, caching
+
+
+async def get_cart(request):
+    user_id = await get_current_user_id(request)
+    if not user_id:
+        return 401, {"error": "Unauthorized"}
+    return 200, await async_db.fetch_all(CART_QUERY, (user_id,))
+
+
+ASYNC_ROUTES = [
+    (re.compile(r"^/get-products$"), get_products),
+    (re.compile(r"^/product/(?P<product_id>\d+)$"), get_product_detail),
+    (re.compile(r"^/api/cart$"), get_cart),
+]
+
+
+def match_async_route(scope):
+    if scope["method"] != "GET":
+        return None, None
+    # NDJSON exports stream from the Flask routes, on a worker thread
+    request = Request(scope)
+    if wants_ndjson(request.args, request.headers.get("accept", "")):
+        return None, None
+    for pattern, handler in ASYNC_ROUTES:
+        match = pattern.match(scope["path"])
+        if match:
+            return handler, {name: int(value) for name, value in match.groupdict().items()}
+    return None, None
+
+
+# =================== ASGI APPLICATION =================== #
+
+async def send_json(send, request, status, data, caching=None):
+    # Same serialisation as flask.jsonify (compact, trailing newline)
+    body = f"{app.json.dumps(data, separators=(',', ':'))}\n".encode()
+    headers = []
+
+    # Same validators and 304 handling as conditional_response() in the Flask routes
+    if caching and status == 200:
+        etag = caching.get("etag") or body_etag(body)
+        modified = caching.get("modified")
+        if is_not_modified(request.headers, etag, modified):
+            # Werkzeug drops Last-Modified from 304s too
+            status, body, modified = 304, b"", None
+        headers.extend(
+            (name.lower().encode(), value.encode("latin1"))
+            for name, value in validator_headers(etag, caching["cache_control"], modified)
+        )
+
+    if status != 304:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+    origin = request.headers.get("origin")
+    if origin in CORS_ORIGINS:
+        headers.append((b"access-control-allow-origin", origin.encode("latin1")))
+        headers.append((b"access-control-expose-headers", ", ".join(sorted(CORS_EXPOSE_HEADERS)).encode()))
+        headers.append((b"vary", b"Origin"))
+
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+    return len(body)
+
+
+async def handle_async_route(handler, kwargs, scope, send):
+    request = Request(scope)
+    profile_token = profiling.start_request() if profiling.ENABLED else None
+    caching = None
+    try:
+        reply = await handler(request, **kwargs)
+        status, data = reply[:2]
+        if len(reply) > 2:
+            caching = reply[2]
+    except InvalidCursorError as e:
+        status, data = 400, {"error": str(e)}
+    except Exception as e:
+        print(f"Error in {handler.__name__}: {e}")
+        traceback.print_exc()
+        status, data = 500, {"error": str(e)}
+    size = await send_json(send, request, status, data, caching)
+    if profile_token is not None:
+        # Same endpoint names as the Flask views, so both modes share metric labels
+        profiling.finish_request(profile_token, scope["method"], handler.__name__, scope["path"], status, size)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await async_db.open_pool()
+            except Exception as e:
+                # Database not reachable yet; routes open the pool on first use
+                print(f"Async MySQL pool not opened at startup: {e}")
+            # No-op when gunicorn.conf.py already started them in this process
+            jobs.start_workers()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_db.close_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] == "http":
+        handler, kwargs = match_async_route(scope)
+        if handler:
+            return await handle_async_route(handler, kwargs, scope, send)
+
+    return await flask_app(scope, receive, send)
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+
+import aiomysql
+
+import profiling
+from db import DB_CONFIG, POOL_RECYCLE
+
+# =================== ASYNC MYSQL POOL =================== #
+#
+# aiomysql pool used by the native async routes in asgi.py. It is bound to the
+# event loop it was created on: asgi.py opens it at startup and closes it at
+# shutdown. The blocking routes in app.py keep using the pool in db.py.
+#
+#     rows = await fetch_all("SELECT ... WHERE id = %s", (product_id,))
+
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "20"))
+
+_pool = None
+_pool_lock = None
+
+
+async def open_pool():
+    """Create the pool (once). Safe to call from concurrent coroutines."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=DB_CONFIG["host"],
+                user=DB_CONFIG["user"],
+                password=DB_CONFIG["password"],
+                db=DB_CONFIG["database"],
+                minsize=1,
+                maxsize=ASYNC_POOL_SIZE,
+                pool_recycle=POOL_RECYCLE,
+                autocommit=True,
+            )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+async def fetch_all(query, params=()):
+    """Run a read query and return every row as a dict."""
+    pool = await open_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params)
+            rows = list(await cursor.fetchall())
+            profiling.record_sql(time.perf_counter() - started)
+            return rows
+
+
+async def fetch_one(query, params=()):
+    """Run a read query and return the first row as a dict, or None."""
+    pool = await open_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params)
+            row = await cursor.fetchone()
+            profiling.record_sql(time.perf_counter() - started)
+            return row
+
+
+def stats():
+    if _pool is None:
+        return {"open": False}
+    return {
+        "open": True,
+        "size": _pool.size,
+        "free": _pool.freesize,
+        "max_size": _pool.maxsize,
+    }
@@ -0,0 +1,141 @@
+"""Checkout throughput and transaction time with concurrent buyers (needs MySQL).
+
+Each buyer adds one unit to the cart and checks out, over and over, through
+the Flask routes (POST /api/cart/add, POST /api/checkout). Two stock layouts
+are measured for each buyer count:
+
+    distinct  every buyer buys their own product (no row contention)
+    hot       every buyer buys the same product (all checkouts lock one row)
+
+Run it against a scratch database with migrations applied; it creates its
+own users and products and deletes them afterwards:
+
+    DB_NAME=unisale_check python benchmarks/checkout.py
+    DB_NAME=unisale_check python benchmarks/checkout.py --buyers 1 16 64 --orders 50
+
+Concurrency past DB_POOL_SIZE only queues for connections.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ADDRESS = {"fullName": "Bench Buyer", "phone": "9999999999", "address": "Bidholi Campus",
+           "city": "Dehradun", "state": "Uttarakhand", "pincode": "248007"}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def create_fixtures(tag, buyer_count, product_stocks):
+    """Insert buyers, a seller and products; returns (buyer ids, product ids)."""
+    from db import db_connection
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO users (name, email, verified) VALUES (%s, %s, 1)", [
+            (f"Bench {i}", f"bench-{tag}-{i}@stu.upes.ac.in") for i in range(buyer_count + 1)
+        ])
+        cursor.execute("SELECT id FROM users WHERE email LIKE %s ORDER BY id", (f"bench-{tag}-%",))
+        user_ids = [row[0] for row in cursor.fetchall()]
+        seller_id, buyer_ids = user_ids[0], user_ids[1:]
+
+        product_ids = []
+        for i, stock in enumerate(product_stocks):
+            cursor.execute("""
+                INSERT INTO products (user_id, name, description, category, state, price, image_url, stock)
+                VALUES (%s, %s, 'Checkout benchmark', 'Books', 'Used', 500, %s, %s)
+            """, (seller_id, f"bench-{tag}-{i}", f"https://example.com/bench-{tag}-{i}.jpg", stock))
+            product_ids.append(cursor.lastrowid)
+        conn.commit()
+        cursor.close()
+    return buyer_ids, product_ids
+
+
+def drop_fixtures(tag):
+    from db import db_connection
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE email LIKE %s", (f"bench-{tag}-%",))
+        user_ids = [row[0] for row in cursor.fetchall()]
+        if user_ids:
+            users = ", ".join(["%s"] * len(user_ids))
+            cursor.execute(f"DELETE oi FROM order_items oi JOIN orders o ON o.id = oi.order_id "
+                           f"WHERE o.user_id IN ({users})", user_ids)
+            for table, column in (("delivery_addresses", "user_id"), ("orders", "user_id"), ("cart", "user_id"),
+                                  ("cart_reservations", "user_id"), ("products", "user_id"), ("users", "id")):
+                cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({users})", user_ids)
+        conn.commit()
+        cursor.close()
+
+
+def buyer(app, buyer_id, product_id, orders):
+    """Buy `orders` single units; returns (checkout latencies, completed, rejected, errors)."""
+    client = app.test_client()
+    latencies, completed, rejected, errors = [], 0, 0, 0
+    for _ in range(orders):
+        added = client.post("/api/cart/add", json={"userId": buyer_id, "productId": product_id, "quantity": 1})
+        if added.status_code != 200:
+            rejected += added.status_code == 409
+            errors += added.status_code != 409
+            continue
+        started = time.perf_counter()
+        response = client.post("/api/checkout", json={"userId": buyer_id, **ADDRESS})
+        latencies.append(time.perf_counter() - started)
+        completed += response.status_code == 200
+        rejected += response.status_code == 409
+        errors += response.status_code not in (200, 409)
+    return latencies, completed, rejected, errors
+
+
+def run(app, layout, buyer_count, orders):
+    tag = uuid.uuid4().hex[:10]
+    stocks = [orders] * buyer_count if layout == "distinct" else [orders * buyer_count]
+    buyer_ids, product_ids = create_fixtures(tag, buyer_count, stocks)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=buyer_count) as executor:
+            results = list(executor.map(
+                lambda i: buyer(app, buyer_ids[i], product_ids[i % len(product_ids)], orders), range(buyer_count)
+            ))
+        elapsed = time.perf_counter() - started
+    finally:
+        drop_fixtures(tag)
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    completed, rejected, errors = (sum(result[i] for result in results) for i in (1, 2, 3))
+    print(f"  {layout:<9} {buyer_count:>6} {completed / elapsed:>9.1f} {percentile(latencies, 0.5) * 1000:>8.1f} "
+          f"{percentile(latencies, 0.95) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} "
+          f"{rejected:>8} {errors:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--orders", type=int, default=20, help="checkouts per buyer")
+    args = parser.parse_args()
+
+    if not os.getenv("DB_NAME"):
+        sys.exit("Set DB_* env vars to a scratch MySQL database with migrations applied")
+
+    from app import app
+
+    print(f"{args.orders} checkouts per buyer; latency is the POST /api/checkout request (one transaction)")
+    print(f"  {'layout':<9} {'buyers':>6} {'orders/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'409s':>8} {'errors':>6}")
+    for layout in ("distinct", "hot"):
+        for buyer_count in args.buyers:
+            run(app, layout, buyer_count, args.orders)
+
+
+if __name__ == "__main__":
+    main()
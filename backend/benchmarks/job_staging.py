@@ -0,0 +1,92 @@
+"""Latency of POST /api/upload-multiple: staging the images serially vs on the upload pool.
+
+GCS is replaced by a fake whose uploads sleep for --gcs-ms and the job
+insert by an in-memory connection, so only the request path is timed; no
+bucket or database is needed:
+
+    python benchmarks/job_staging.py                  # 4 images, 80 ms per upload
+    python benchmarks/job_staging.py --images 8 --gcs-ms 150
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+import jobs  # noqa: E402
+
+FORM = {'user_id': "1", 'name': "Desk lamp", 'description': "Barely used", 'category': "Furniture",
+        'price': "400"}
+
+
+class FakeCursor:
+    lastrowid = 1
+
+    def execute(self, sql, params=None):
+        pass
+
+    def executemany(self, sql, rows):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def cursor(self, **kwargs):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+
+@contextmanager
+def fake_db_connection():
+    yield FakeConnection()
+
+
+def measure(client, image_count, repeat):
+    timings = []
+    for _ in range(repeat):
+        data = dict(FORM, **{'images[]': [(io.BytesIO(b"\xff" * 200_000), f"{n}.jpg") for n in range(image_count)]})
+        started = time.perf_counter()
+        response = client.post("/api/upload-multiple", data=data, content_type="multipart/form-data")
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 202, response.get_data(as_text=True)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--gcs-ms", type=float, default=80, help="simulated latency of one GCS upload")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    def slow_upload(file_obj, blob_name, content_type=None, public=True):
+        file_obj.read()
+        time.sleep(args.gcs_ms / 1000)
+        return f"https://storage.googleapis.com/bucket/{blob_name}"
+
+    backend.storage_service.upload = slow_upload
+    jobs.db_connection = fake_db_connection
+    client = backend.app.test_client()
+
+    concurrent = measure(client, args.images, args.repeat)
+    serial_enqueue = jobs.enqueue
+    backend.enqueue = lambda *a, executor=None, **kw: serial_enqueue(*a, **kw)
+    serial = measure(client, args.images, args.repeat)
+
+    print(f"{args.images} images, {args.gcs_ms:.0f} ms per GCS upload, median of {args.repeat}")
+    print(f"  staged serially          {serial * 1000:8.1f} ms")
+    print(f"  staged on upload pool    {concurrent * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
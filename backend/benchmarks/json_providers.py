@@ -0,0 +1,82 @@
+"""Encoding cost of the JSON providers (json_provider.py) on product and order payloads.
+
+Times provider.dumps() for Flask's default provider, msgspec and orjson (if
+installed) on payloads shaped like the real responses, with Decimal prices
+and datetimes as they come back from MySQL:
+
+    python benchmarks/json_providers.py
+    python benchmarks/json_providers.py --number 2000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_provider import PROVIDERS  # noqa: E402
+
+
+def make_products(count):
+    started = datetime(2024, 1, 1)
+    return [{
+        "id": i, "user_id": i % 50 + 1, "name": f"Study table {i}",
+        "description": "Wooden study table, lightly used, pick up from hostel block C",
+        "category": "Furniture", "state": "Used", "price": Decimal(f"{500 + i % 4000}.00"), "stock": 1,
+        "image_url": f"https://storage.googleapis.com/unisale-storage/product-image/{i}.webp",
+        "card_url": f"https://storage.googleapis.com/unisale-storage/product-image/{i}-card.webp",
+        "thumbnail_url": f"https://storage.googleapis.com/unisale-storage/product-image/{i}-thumb.webp",
+        "created_at": started + timedelta(minutes=i), "is_wishlisted": i % 7 == 0,
+    } for i in range(1, count + 1)]
+
+
+def make_orders(count, items_per_order=3):
+    started = datetime(2024, 1, 1)
+    return [{
+        "id": i, "total_amount": Decimal("1500.00"), "status": "pending",
+        "created_at": started + timedelta(hours=i),
+        "delivery_address": {"full_name": "Student", "phone": "9999999999", "address": "Block A",
+                             "city": "Dehradun", "state": "Uttarakhand", "pincode": "248007"},
+        "items": [{"id": i * 10 + n, "quantity": 1, "price": Decimal("500.00"), "name": f"Product {n}",
+                   "image_url": f"https://storage.googleapis.com/unisale-storage/product-image/{n}.webp"}
+                  for n in range(items_per_order)],
+    } for i in range(1, count + 1)]
+
+
+PAYLOADS = {
+    "products page (24)": lambda: {"products": make_products(24), "next_cursor": "eyJzIjoibmV3ZXN0In0"},
+    "products (1,000)": lambda: make_products(1000),
+    "orders (200)": lambda: make_orders(200),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=500, help="encodes per timing")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {}
+    for name, provider_class in PROVIDERS.items():
+        try:
+            providers[name] = provider_class(app)
+        except ImportError as e:
+            print(f"{name}: not installed ({e})")
+
+    print(f"  {'payload':<20} {'provider':<9} {'bytes':>9} {'us/encode':>10}")
+    for payload_name, make_payload in PAYLOADS.items():
+        payload = make_payload()
+        for name, provider in providers.items():
+            seconds = min(timeit.repeat(lambda: provider.dumps(payload), number=args.number, repeat=args.repeat))
+            size = len(provider.dumps(payload).encode())
+            print(f"  {payload_name:<20} {name:<9} {size:>9} {seconds / args.number * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
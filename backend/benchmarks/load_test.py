@@ -0,0 +1,121 @@
+"""Load test of the hot read routes: WSGI (threaded Flask) vs ASGI (asgi.py).
+
+N concurrent clients each loop over a mix of GET /get-products (one page),
+GET /product/<id> and, with --token, GET /api/cart, for a fixed duration.
+Reports throughput, latency percentiles and errors. Start the server in one
+mode, run the script, then repeat in the other mode against the same
+database:
+
+    # WSGI, as the Dockerfile runs it
+    gunicorn --bind :8080 --workers 1 --threads 8 --timeout 0 app:app
+    python benchmarks/load_test.py --url http://localhost:8080 --clients 500 --label wsgi
+
+    # ASGI
+    gunicorn --bind :8080 --workers 1 -k uvicorn.workers.UvicornWorker --timeout 0 asgi:application
+    python benchmarks/load_test.py --url http://localhost:8080 --clients 500 --label asgi
+
+Seed the database first (python migrations.py migrate seed) and run the
+client on a different machine from the server, or at least pin them to
+separate cores, so they don't compete for CPU. Needs httpx.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import httpx
+
+PAGE_SIZE = 24
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+
+    def record(self, route, seconds, error=None):
+        if error:
+            self.errors[f"{route}: {error}"] += 1
+        else:
+            self.latencies.setdefault(route, []).append(seconds)
+
+
+def pick_request(rng, args):
+    """(route label, path) for the next request in the mix."""
+    roll = rng.random()
+    if args.token and roll < 0.2:
+        return "cart", "/api/cart"
+    if roll < 0.6:
+        return "product", f"/product/{rng.randint(1, args.max_product_id)}"
+    sort = rng.choice(["newest", "low-to-high", "high-to-low"])
+    return "products", f"/get-products?limit={PAGE_SIZE}&sort={sort}"
+
+
+async def client_loop(client, results, deadline, seed, args):
+    rng = random.Random(seed)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    while time.monotonic() < deadline:
+        route, path = pick_request(rng, args)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            await response.aread()
+            error = None if response.status_code < 500 else f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        results.record(route, time.perf_counter() - started, error)
+
+
+async def run(args):
+    results = Results()
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        # Warm the pools and caches before measuring
+        await client.get(f"/get-products?limit={PAGE_SIZE}")
+
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, results, deadline, seed, args) for seed in range(args.clients)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def report(results, elapsed, args):
+    total = sum(len(values) for values in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f"[{args.label}] {args.clients} clients, {elapsed:.1f}s: "
+          f"{total} ok, {errors} errors, {total / elapsed:.1f} req/s")
+    print(f"  {'route':<10} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for route, values in sorted(results.latencies.items()):
+        values.sort()
+        print(f"  {route:<10} {len(values):>9} {percentile(values, 0.5) * 1000:>8.1f} "
+              f"{percentile(values, 0.95) * 1000:>8.1f} {percentile(values, 0.99) * 1000:>8.1f} "
+              f"{values[-1] * 1000:>8.1f}")
+    for error, count in results.errors.most_common(5):
+        print(f"  {count} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--max-product-id", type=int, default=1000, help="product ids are drawn from 1..N")
+    parser.add_argument("--token", help="Firebase ID token; adds /api/cart to the mix")
+    parser.add_argument("--label", default="server")
+    args = parser.parse_args()
+
+    results, elapsed = asyncio.run(run(args))
+    report(results, elapsed, args)
+
+
+if __name__ == "__main__":
+    main()
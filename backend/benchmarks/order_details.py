@@ -0,0 +1,130 @@
+"""Round trips and latency of /api/orders/user/<id>: batched vs per-order loading.
+
+Compares load_order_details() (one IN query for addresses, one for items)
+with the per-order code it replaced (two queries per order). Runs against a
+fake cursor that answers from memory and sleeps for each round trip, so it
+needs no database:
+
+    python benchmarks/order_details.py               # 1, 100 and 1,000 orders, 0.5 ms RTT
+    python benchmarks/order_details.py --rtt-ms 2    # a database in another zone
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queries import build_user_orders_query, load_order_details  # noqa: E402
+
+ITEMS_PER_ORDER = 3
+
+
+def make_tables(order_count):
+    """Synthetic orders, delivery addresses and items for one user."""
+    started = datetime(2024, 1, 1)
+    orders, addresses, items = [], {}, {}
+    for order_id in range(1, order_count + 1):
+        orders.append({'id': order_id, 'total_amount': Decimal("1500.00"), 'status': 'pending',
+                       'created_at': started + timedelta(minutes=order_id)})
+        addresses[order_id] = {'order_id': order_id, 'full_name': f"Student {order_id}", 'phone': "9999999999",
+                               'address': "Block A", 'city': "Dehradun", 'state': "Uttarakhand",
+                               'pincode': "248007", 'hostel_room': "A-101"}
+        items[order_id] = [
+            {'order_id': order_id, 'product_id': order_id * 10 + n, 'quantity': 1, 'price': Decimal("500.00"),
+             'name': f"Product {n}", 'image_url': f"https://example.com/{n}.jpg"}
+            for n in range(ITEMS_PER_ORDER)
+        ]
+    return orders, addresses, items
+
+
+class FakeCursor:
+    """Dictionary cursor answering the order queries from memory, one sleep per execute."""
+
+    def __init__(self, tables, rtt):
+        self.orders, self.addresses, self.items = tables
+        self.rtt = rtt
+        self.round_trips = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.round_trips += 1
+        time.sleep(self.rtt)
+        if "FROM orders" in sql:
+            self._rows = list(self.orders)
+        elif "FROM delivery_addresses" in sql:
+            self._rows = [self.addresses[order_id] for order_id in params if order_id in self.addresses]
+        elif "FROM order_items" in sql:
+            self._rows = [item for order_id in params for item in self.items.get(order_id, [])]
+        else:
+            raise ValueError(f"Unexpected query: {sql}")
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def per_order(cursor, user_id):
+    """The code load_order_details() replaced: two queries for every order."""
+    cursor.execute(*build_user_orders_query(user_id))
+    orders = []
+    for order in cursor.fetchall():
+        cursor.execute("""
+            SELECT full_name, phone, address, city, state, pincode, hostel_room
+            FROM delivery_addresses
+            WHERE order_id = %s
+        """, (order['id'],))
+        address = cursor.fetchone() or {}
+        cursor.execute("""
+            SELECT oi.product_id, oi.quantity, oi.price, p.name, p.image_url
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.id
+            WHERE oi.order_id = %s
+        """, (order['id'],))
+        orders.append((order, address, cursor.fetchall() or []))
+    return orders
+
+
+def batched(cursor, user_id):
+    """What get_user_orders does now: three queries whatever the order count."""
+    cursor.execute(*build_user_orders_query(user_id))
+    orders = cursor.fetchall()
+    addresses, items = load_order_details(cursor, [order['id'] for order in orders])
+    return [(order, addresses.get(order['id'], {}), items.get(order['id'], [])) for order in orders]
+
+
+def run(loader, tables, rtt):
+    cursor = FakeCursor(tables, rtt)
+    started = time.perf_counter()
+    orders = loader(cursor, 1)
+    return cursor.round_trips, time.perf_counter() - started, orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip")
+    args = parser.parse_args()
+    rtt = args.rtt_ms / 1000
+
+    print(f"{'orders':>7} {'code':>9} {'round trips':>12} {'latency ms':>11}")
+    for count in args.orders:
+        tables = make_tables(count)
+        results = {}
+        for name, loader in (("per-order", per_order), ("batched", batched)):
+            round_trips, seconds, orders = run(loader, tables, rtt)
+            results[name] = orders
+            print(f"{count:>7} {name:>9} {round_trips:>12} {seconds * 1000:>11.1f}")
+        # Both return the same orders, addresses and items
+        assert [(o['id'], a['full_name'], [i['product_id'] for i in items]) for o, a, items in results["per-order"]] \
+            == [(o['id'], a['full_name'], [i['product_id'] for i in items]) for o, a, items in results["batched"]]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Assembling /api/orders: iter_orders() over flat item rows vs the old GROUP_CONCAT split/zip.
+
+Both sides get synthetic rows shaped like their query's result (one row per
+item, or one row per order with comma-joined item columns), so only the
+Python assembly is timed; no database is needed:
+
+    python benchmarks/order_rows.py                   # 10,000 orders, 3 items each
+    python benchmarks/order_rows.py --orders 50000 --items 5
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queries import iter_orders  # noqa: E402
+
+ADDRESS = {'full_name': "Student", 'phone': "9999999999", 'address': "Block A", 'city': "Dehradun",
+           'state': "Uttarakhand", 'pincode': "248007"}
+
+
+def make_orders(order_count, items_per_order):
+    started = datetime(2024, 1, 1)
+    for order_id in range(order_count, 0, -1):
+        order = {'id': order_id, 'total_amount': Decimal("1500.00"), 'status': 'pending',
+                 'created_at': started + timedelta(minutes=order_id), **ADDRESS}
+        items = [(order_id * 10 + n, 1, Decimal("500.00"), f"Product {n}", f"https://example.com/{n}.jpg")
+                 for n in range(items_per_order)]
+        yield order, items
+
+
+def item_rows(orders):
+    """USER_ORDER_ROWS_QUERY result: one row per item."""
+    return [
+        {**order, 'product_id': pid, 'quantity': qty, 'price': price, 'name': name, 'image_url': img}
+        for order, items in orders
+        for pid, qty, price, name, img in items
+    ]
+
+
+def grouped_rows(orders):
+    """The old GROUP_CONCAT query's result: one row per order, item columns comma-joined."""
+    return [
+        {**order,
+         'product_ids': ",".join(str(item[0]) for item in items),
+         'quantities': ",".join(str(item[1]) for item in items),
+         'prices': ",".join(str(item[2]) for item in items),
+         'product_names': ",".join(item[3] for item in items),
+         'image_urls': ",".join(item[4] for item in items)}
+        for order, items in orders
+    ]
+
+
+def split_zip(rows):
+    """The assembly iter_orders() replaced."""
+    orders = []
+    for order in rows:
+        product_ids = str(order['product_ids']).split(',') if order['product_ids'] else []
+        quantities = str(order['quantities']).split(',') if order['quantities'] else []
+        prices = str(order['prices']).split(',') if order['prices'] else []
+        names = str(order['product_names']).split(',') if order['product_names'] else []
+        images = str(order['image_urls']).split(',') if order['image_urls'] else []
+        items = [
+            {'id': pid, 'quantity': int(qty), 'price': float(price), 'name': name, 'image_url': img}
+            for pid, qty, price, name, img in zip(product_ids, quantities, prices, names, images)
+            if pid and qty and price and name
+        ]
+        orders.append({
+            'id': order['id'],
+            'total_amount': float(order['total_amount']),
+            'status': order['status'],
+            'created_at': order['created_at'].isoformat() if order['created_at'] else None,
+            'delivery_address': {key: order[key] for key in ADDRESS},
+            'items': items
+        })
+    return orders
+
+
+def best_of(repeat, func, rows):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=3, help="items per order")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    orders = list(make_orders(args.orders, args.items))
+    rows, grouped = item_rows(orders), grouped_rows(orders)
+
+    old_seconds, old = best_of(args.repeat, split_zip, grouped)
+    new_seconds, new = best_of(args.repeat, lambda r: list(iter_orders(r)), rows)
+    assert [len(order['items']) for order in old] == [len(order['items']) for order in new]
+
+    print(f"{args.orders} orders x {args.items} items, best of {args.repeat}")
+    print(f"  GROUP_CONCAT split/zip  {len(grouped):>7} rows  {old_seconds * 1000:8.1f} ms")
+    print(f"  iter_orders             {len(rows):>7} rows  {new_seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Firebase ID token verification with and without token_cache, fully offline.
+
+Mints RS256 ID tokens with a locally generated key, serves the matching
+certificate in place of Google's public key set, and runs the real
+firebase_admin verification path on them. Compares calling
+auth.verify_id_token on every request with token_cache.verify_token:
+
+    python benchmarks/token_verification.py                      # 20,000 requests from 200 users
+    python benchmarks/token_verification.py --requests 100000 --users 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import firebase_admin
+import google.auth.credentials
+import google.oauth2.id_token
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import auth, credentials
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import token_cache  # noqa: E402
+
+PROJECT_ID = "unisale-bench"
+KEY_ID = "bench-key"
+
+
+def make_key_set():
+    """A private key and the {kid: certificate} set Google would publish for it."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.system.gserviceaccount.com")])
+    now = datetime.now(timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    return key, {KEY_ID: cert.public_bytes(serialization.Encoding.PEM).decode()}
+
+
+def mint_id_token(key, uid, lifetime=3600):
+    """An ID token shaped like the ones Firebase Auth issues."""
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "auth_time": now,
+        "user_id": uid,
+        "sub": uid,
+        "iat": now,
+        "exp": now + lifetime,
+        "email": f"{uid}@stu.upes.ac.in",
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": KEY_ID})
+
+
+class OfflineCredential(credentials.Base):
+    """Verifying ID tokens needs no service account; this keeps the SDK from looking for one."""
+
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+
+def use_local_key_set(certs):
+    """Verify against `certs` instead of fetching Google's public keys."""
+    google.oauth2.id_token._fetch_certs = lambda request, certs_url: certs
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(OfflineCredential(), options={"projectId": PROJECT_ID})
+
+
+def timed(verify, tokens):
+    started = time.perf_counter()
+    for token in tokens:
+        verify(token)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=200, help="distinct signed-in users (one token each)")
+    args = parser.parse_args()
+
+    key, certs = make_key_set()
+    use_local_key_set(certs)
+    tokens = [mint_id_token(key, f"user{n}") for n in range(args.users)]
+    requests = random.Random(0).choices(tokens, k=args.requests)
+
+    uncached = timed(lambda token: auth.verify_id_token(token), requests)
+    cached = timed(token_cache.verify_token, requests)
+    stats = token_cache.stats()
+
+    print(f"{args.requests} requests from {args.users} users")
+    print(f"  auth.verify_id_token     {uncached:7.2f} s  {uncached / args.requests * 1e6:8.1f} us/request")
+    print(f"  token_cache.verify_token {cached:7.2f} s  {cached / args.requests * 1e6:8.1f} us/request"
+          f"  ({stats['hits']} hits, {stats['misses']} misses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import os
+import threading
+
+from cachetools import TTLCache
+
+# =================== CATALOGUE CACHE =================== #
+#
+# Read-through cache for product listings and product detail responses.
+#
+# By default entries live in an in-process LRU with a TTL. Set
+# CATALOGUE_CACHE_REDIS_URL (or call set_backend() with any cachelib cache)
+# to share one cache between processes instead.
+#
+# Keys:
+#   product:<id>                   product detail (without the seller)
+#   seller:<user_id>               seller card shown on the product page
+#   products:<generation>:<query>  get_products result for one filter/sort/page
+#
+# Listing keys embed a generation number. Any product write bumps it, which
+# orphans every cached listing at once (a product can move in or out of any
+# filter combination); the orphans age out through the TTL/LRU.
+#
+# Every entry is stored as (version, value), where version is the counter
+# under version:<key> read *before* the loader ran. Invalidating a key bumps
+# its counter, so a loader that read the row before the write and stores it
+# afterwards leaves an entry with the old version, which reads as a miss.
+
+CACHE_TTL = int(os.getenv("CATALOGUE_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CATALOGUE_CACHE_MAX_ENTRIES", "1024"))
+
+LISTING_GENERATION_KEY = "products:generation"
+
+
+def _version_key(key):
+    return f"version:{key}"
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that counts LRU evictions."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+class LocalCache:
+    """In-process LRU/TTL store with the same get/set/delete/inc interface as cachelib caches."""
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self._data = _CountingTTLCache(maxsize=maxsize, ttl=ttl)
+        # Counters never expire or get evicted, or listing generations could roll back
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            return self._data.get(key)
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._data[key] = value
+        return True
+
+    def get_many(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping, timeout=None):
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = value
+        return list(mapping)
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def inc(self, key, delta=1):
+        with self._lock:
+            value = self._counters.get(key, 0) + delta
+            self._counters[key] = value
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            # Bump rather than reset generations so nothing cached before clear() is reachable
+            for key in self._counters:
+                self._counters[key] += 1
+        return True
+
+    @property
+    def evictions(self):
+        return self._data.evictions
+
+
+class CatalogueCache:
+    """Read-through cache with hit/miss counters in front of a local or shared backend."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or LocalCache()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _lookup(self, keys):
+        """{key: (value or None, current version)} in one backend round trip."""
+        stored = self.backend.get_many(*keys, *[_version_key(key) for key in keys])
+        result = {}
+        for key, entry, version in zip(keys, stored, stored[len(keys):]):
+            version = version or 0
+            # Entries written before the last invalidation carry an older version
+            value = entry[1] if entry is not None and entry[0] == version else None
+            result[key] = (value, version)
+        return result
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() and caching its result on a miss."""
+        value, version = self._lookup([key])[key]
+        if value is not None:
+            self._count("hits")
+            return value
+
+        self._count("misses")
+        value = loader()
+        if value is not None:
+            self.backend.set(key, (version, value), timeout=CACHE_TTL)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """get_or_load for async routes: loader is a coroutine function.
+
+        Backend calls stay synchronous; they're in-memory or a sub-millisecond
+        round trip to a shared cache.
+        """
+        value, version = self._lookup([key])[key]
+        if value is not None:
+            self._count("hits")
+            return value
+
+        self._count("misses")
+        value = await loader()
+        if value is not None:
+            self.backend.set(key, (version, value), timeout=CACHE_TTL)
+        return value
+
+    def get_many_or_load(self, keys, loader):
+        """get_or_load for many keys in one backend round trip.
+
+        loader(missing_keys) returns {key: value} for the misses it found; the
+        result maps every key that has a value.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = self._lookup(keys) if keys else {}
+        values = {key: value for key, (value, version) in found.items()}
+        missing = [key for key, value in values.items() if value is None]
+        self._count("hits", len(keys) - len(missing))
+        self._count("misses", len(missing))
+
+        if missing:
+            loaded = {key: value for key, value in loader(missing).items() if value is not None}
+            if loaded:
+                self.backend.set_many({key: (found[key][1], value) for key, value in loaded.items()},
+                                      timeout=CACHE_TTL)
+            values.update(loaded)
+        return {key: value for key, value in values.items() if value is not None}
+
+    def listing_key(self, query_args):
+        generation = self.backend.get(LISTING_GENERATION_KEY) or 0
+        query = "&".join(f"{k}={v}" for k, v in sorted(query_args.items()))
+        return f"products:{generation}:{query}"
+
+    def _invalidate(self, key):
+        # Bump first: a loader already running stores under the old version
+        self.backend.inc(_version_key(key))
+        self.backend.delete(key)
+
+    def invalidate_product(self, product_id=None):
+        """Drop a product's detail entry (if given) and every cached listing."""
+        if product_id is not None:
+            self._invalidate(f"product:{product_id}")
+        self.backend.inc(LISTING_GENERATION_KEY)
+        self._count("invalidations")
+
+    def invalidate_seller(self, user_id):
+        self._invalidate(f"seller:{user_id}")
+        self._count("invalidations")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["evictions"] = getattr(self.backend, "evictions", None)
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+
+def _backend_from_env():
+    redis_url = os.getenv("CATALOGUE_CACHE_REDIS_URL")
+    if not redis_url:
+        return None
+    import redis
+    from cachelib import RedisCache
+    return RedisCache(host=redis.Redis.from_url(redis_url), default_timeout=CACHE_TTL,
+                      key_prefix="unisale:")
+
+
+catalogue_cache = CatalogueCache(_backend_from_env())
+
+
+def set_backend(backend):
+    """Swap in a shared backend (any cachelib.BaseCache, e.g. RedisCache or MemcachedCache)."""
+    catalogue_cache.backend = backend
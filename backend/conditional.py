@@ -0,0 +1,94 @@
+import hashlib
+from datetime import timezone
+
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+
+# =================== CONDITIONAL GET =================== #
+#
+# Read routes that clients poll send validators so an unchanged resource
+# costs a 304 and no body:
+#
+#   /product/<id>   ETag from products.updated_at + the seller's users.updated_at
+#   /get-profile    ETag from users.updated_at
+#   /get-products   ETag from a hash of the (cached) listing body; a listing
+#                   spans many rows, so there is no single row version
+#
+# updated_at columns come from migration 10 (DATETIME(6), bumped by MySQL on
+# every change). Product detail and listings are served from the catalogue
+# cache, so a revalidation there runs no query at all.
+#
+# Flask routes call conditional_response(); asgi.py uses the same helpers
+# so both serving modes send identical headers.
+
+# How long clients may reuse a response before revalidating
+PRODUCT_CACHE_CONTROL = "public, max-age=30"
+LISTING_CACHE_CONTROL = "public, max-age=15"
+# Per-user responses: never stored by shared caches, always revalidated
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def version_etag(*versions):
+    """ETag from row ids and versions (updated_at values)."""
+    digest = hashlib.sha1("|".join(str(version) for version in versions).encode())
+    return digest.hexdigest()
+
+
+def body_etag(body):
+    """ETag from the response body itself."""
+    return hashlib.sha1(body).hexdigest()
+
+
+def last_modified(*timestamps):
+    """Latest of the given updated_at values as an aware datetime, or None.
+
+    The database stores naive timestamps; they're labelled UTC. Clients only
+    echo the value back, so the comparison stays consistent either way.
+    """
+    timestamps = [timestamp for timestamp in timestamps if timestamp]
+    if not timestamps:
+        return None
+    return max(timestamps).replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def is_not_modified(headers, etag, modified=None):
+    """True if the request's If-None-Match / If-Modified-Since match the resource.
+
+    headers is any mapping with .get(); If-None-Match wins when both are sent.
+    """
+    if_none_match = headers.get("If-None-Match") or headers.get("if-none-match")
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+
+    if_modified_since = headers.get("If-Modified-Since") or headers.get("if-modified-since")
+    if if_modified_since and modified:
+        since = parse_date(if_modified_since)
+        return since is not None and modified <= since
+    return False
+
+
+def validator_headers(etag, cache_control, modified=None):
+    """Response headers carrying the validators, as (name, value) pairs."""
+    headers = [("ETag", quote_etag(etag, weak=True)), ("Cache-Control", cache_control)]
+    if modified:
+        headers.append(("Last-Modified", http_date(modified)))
+    return headers
+
+
+def conditional_response(request, response, cache_control, etag=None, modified=None):
+    """Add validators to a Flask response and turn it into a 304 if the client is up to date.
+
+    Without an etag the body is hashed. Only GET/HEAD 200s are made conditional.
+    """
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+
+    etag = etag or body_etag(response.get_data())
+    for name, value in validator_headers(etag, cache_control, modified):
+        response.headers[name] = value
+
+    if is_not_modified(request.headers, etag, modified):
+        response.status_code = 304
+        response.set_data(b"")
+        response.headers.pop("Content-Type", None)
+        response.headers.pop("Content-Length", None)
+    return response
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+from profiling import profiled_connection
+
+# =================== MYSQL CONNECTION POOL =================== #
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "unisale"),
+}
+
+# Pool settings (override through environment variables)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))            # max open connections
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))   # seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))   # reconnect connections idle longer than this
+POOL_PING_AFTER = int(os.getenv("DB_POOL_PING_AFTER", "30"))  # ping connections idle longer than this
+
+
+class PoolExhaustedError(mysql.connector.Error):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Fixed-size, thread-safe pool of mysql.connector connections."""
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE,
+                 ping_after=POOL_PING_AFTER, **config):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.config = config or DB_CONFIG
+
+        # (conn, last_used) pairs, used LIFO so the warmest connection goes out first
+        self._idle = []
+        self._lock = threading.Lock()
+        # Signalled whenever a connection comes back or a slot frees up
+        self._available = threading.Condition(self._lock)
+        self._open = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "exhausted": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+            "wait_time_total": 0.0,
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _free_slot(self):
+        """Give up a slot whose connection is gone, waking a waiter to open a new one."""
+        with self._available:
+            self._open -= 1
+            self._available.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._free_slot()
+
+    def _checkout(self):
+        """Take an idle (conn, last_used), or reserve a slot and return (None, None).
+
+        Waits up to the pool timeout when every slot is in use; both a released
+        connection and a discarded one (freeing its slot) wake the waiter.
+        """
+        started = None
+        with self._available:
+            try:
+                while True:
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._open < self.size:
+                        self._open += 1
+                        return None, None
+
+                    if started is None:
+                        started = time.monotonic()
+                        self._stats["waits"] += 1
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["exhausted"] += 1
+                        raise PoolExhaustedError(
+                            msg=f"No database connection available after {self.timeout}s "
+                                f"(pool size {self.size})"
+                        )
+                    self._available.wait(remaining)
+            finally:
+                if started is not None:
+                    self._stats["wait_time_total"] += time.monotonic() - started
+
+    def acquire(self):
+        """Check a healthy connection out of the pool, opening one if there is room."""
+        conn, last_used = self._checkout()
+        if conn is None:
+            conn = self._reconnect()
+        else:
+            conn = self._check_health(conn, last_used)
+        with self._lock:
+            self._stats["checkouts"] += 1
+        return conn
+
+    def _check_health(self, conn, last_used):
+        """Recycle connections that sat idle too long and ping ones that may have gone stale."""
+        idle_for = time.monotonic() - last_used
+
+        if idle_for > self.recycle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._stats["recycled"] += 1
+            return self._reconnect()
+
+        if idle_for > self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._stats["failed_health_checks"] += 1
+                return self._reconnect()
+
+        return conn
+
+    def _reconnect(self):
+        """Open a connection for a slot already counted in _open (freed again on failure)."""
+        try:
+            return self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding it if it can't be reset cleanly."""
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            # Always end the transaction so the next borrower gets a fresh snapshot
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._available:
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    def stats(self):
+        """Snapshot of pool usage counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+        stats["in_use"] = stats["open"] - stats["idle"]
+        return stats
+
+
+pool = ConnectionPool()
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection; it always goes back to the pool, even on errors."""
+    conn = pool.acquire()
+    try:
+        yield profiled_connection(conn)
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def streaming_connection():
+    """Like db_connection, for unbuffered reads that may be abandoned part way.
+
+    A connection left with unread rows (client went away mid-download) is
+    closed rather than drained, which would read the rest of the result set.
+    """
+    conn = pool.acquire()
+    try:
+        yield profiled_connection(conn)
+    finally:
+        if conn.unread_result:
+            pool._discard(conn)
+        else:
+            pool.release(conn)
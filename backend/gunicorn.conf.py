@@ -0,0 +1,14 @@
+# =================== GUNICORN HOOKS =================== #
+#
+# gunicorn loads ./gunicorn.conf.py from the working directory on its own, so
+# the Dockerfile and app.yaml commands pick this up without a --config flag.
+
+
+def post_worker_init(worker):
+    """Start the background job workers (jobs.py) in each serving process.
+
+    They are not started when app.py is imported: image processing runs on
+    spawned processes, which re-import the main module.
+    """
+    import jobs
+    jobs.start_workers()
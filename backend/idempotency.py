@@ -0,0 +1,184 @@
+import functools
+import hashlib
+import json
+import os
+
+import mysql.connector
+from flask import current_app, jsonify, make_response, request
+
+from db import db_connection
+
+# =================== IDEMPOTENCY KEYS =================== #
+#
+# Clients on flaky connections retry POSTs. When a request carries an
+# `Idempotency-Key` header, the first response for that key is stored in
+# `idempotency_keys` (migration 9) and replayed for retries, without running
+# the route again, so a retried checkout or upload writes nothing.
+#
+#     @app.route('/api/checkout', methods=['POST'])
+#     @idempotent("checkout")
+#     def create_order():
+#         ...
+#
+# A key is tied to a fingerprint of the request: reusing it for a different
+# payload is rejected with 422, and a retry that arrives while the first
+# request is still running gets 409. 5xx responses are not stored (the route
+# rolled back), so the client can retry with the same key. Keys expire after
+# IDEMPOTENCY_KEY_TTL seconds; purge_expired_keys() removes them.
+
+KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 3600)))
+# A key left in progress longer than this (crashed worker) can be taken over by a retry
+LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+MAX_KEY_LENGTH = 255
+PURGE_BATCH_SIZE = 1000
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def _fingerprint():
+    """Hash of what the request asks for, independent of transport details.
+
+    Multipart bodies can't be hashed as-is: the boundary changes on every
+    retry, so form fields and file contents are hashed instead.
+    """
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    if request.is_json:
+        digest.update(json.dumps(request.get_json(silent=True), sort_keys=True).encode())
+    elif request.files or request.form:
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"form {name}={value}\n".encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            file_digest = hashlib.sha256()
+            for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+                file_digest.update(chunk)
+            file.stream.seek(0)
+            digest.update(f"file {name}={file.filename}:{file_digest.hexdigest()}\n".encode())
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _claim(scope, key, fingerprint):
+    """Record the key as in progress. Returns None if claimed, else the existing row."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                INSERT INTO idempotency_keys
+                (scope, idempotency_key, fingerprint, status, locked_at, expires_at)
+                VALUES (%s, %s, %s, 'in_progress', NOW(), NOW() + INTERVAL %s SECOND)
+            """, (scope, key, fingerprint, KEY_TTL))
+            conn.commit()
+            return None
+        except mysql.connector.IntegrityError as e:
+            if e.errno != 1062:  # ER_DUP_ENTRY
+                raise
+            conn.rollback()
+
+        # Take the key over if it expired, or if the same request was abandoned mid-flight
+        cursor.execute("""
+            UPDATE idempotency_keys
+            SET fingerprint = %s, status = 'in_progress', response_status = NULL,
+                response_body = NULL, content_type = NULL,
+                locked_at = NOW(), expires_at = NOW() + INTERVAL %s SECOND
+            WHERE scope = %s AND idempotency_key = %s
+              AND (expires_at <= NOW()
+                   OR (status = 'in_progress' AND fingerprint = %s
+                       AND locked_at < NOW() - INTERVAL %s SECOND))
+        """, (fingerprint, KEY_TTL, scope, key, fingerprint, LOCK_SECONDS))
+        if cursor.rowcount:
+            conn.commit()
+            return None
+
+        cursor.execute("""
+            SELECT fingerprint, status, response_status, response_body, content_type
+            FROM idempotency_keys
+            WHERE scope = %s AND idempotency_key = %s
+        """, (scope, key))
+        existing = cursor.fetchone()
+        cursor.close()
+    return existing
+
+
+def _store(scope, key, response):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE idempotency_keys
+            SET status = 'completed', response_status = %s, response_body = %s, content_type = %s
+            WHERE scope = %s AND idempotency_key = %s
+        """, (response.status_code, response.get_data(as_text=True), response.content_type, scope, key))
+        conn.commit()
+        cursor.close()
+
+
+def _release(scope, key):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM idempotency_keys WHERE scope = %s AND idempotency_key = %s AND status = 'in_progress'",
+            (scope, key)
+        )
+        conn.commit()
+        cursor.close()
+
+
+def idempotent(scope):
+    """Make a POST route replay its first response for a repeated Idempotency-Key."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if request.method != "POST" or not key:
+                return view(*args, **kwargs)
+
+            if len(key) > MAX_KEY_LENGTH or not key.isascii() or not key.isprintable():
+                return jsonify({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} printable ASCII characters"}), 400
+
+            fingerprint = _fingerprint()
+            existing = _claim(scope, key, fingerprint)
+            if existing:
+                if existing['fingerprint'] != fingerprint:
+                    return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+                if existing['status'] != 'completed':
+                    response = jsonify({"error": "A request with this Idempotency-Key is still being processed"})
+                    response.headers["Retry-After"] = "1"
+                    return response, 409
+
+                response = current_app.response_class(
+                    existing['response_body'],
+                    status=existing['response_status'],
+                    content_type=existing['content_type']
+                )
+                response.headers[REPLAYED_HEADER] = "true"
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                _release(scope, key)
+                raise
+
+            if response.status_code >= 500:
+                _release(scope, key)
+            else:
+                _store(scope, key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(conn):
+    """Delete all expired keys, committing every PURGE_BATCH_SIZE rows; returns how many went."""
+    cursor = conn.cursor()
+    deleted = 0
+    while True:
+        cursor.execute("DELETE FROM idempotency_keys WHERE expires_at <= NOW() LIMIT %s", (PURGE_BATCH_SIZE,))
+        batch = cursor.rowcount
+        conn.commit()
+        deleted += batch
+        if batch < PURGE_BATCH_SIZE:
+            break
+    cursor.close()
+    return deleted
@@ -0,0 +1,95 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps, features
+
+# =================== IMAGE PROCESSING =================== #
+#
+# Uploaded photos are re-encoded into a few bounded sizes before they go to
+# GCS, so product cards don't download 5-12 MB phone originals. Re-encoding
+# also drops EXIF/GPS and other metadata: only pixel data is written out.
+#
+# Decoding and resizing is CPU-bound, so it runs on a process pool instead of
+# the gunicorn request threads.
+
+# Longest edge in pixels for each rendition
+PRODUCT_RENDITIONS = {"thumbnail": 200, "card": 600, "full": 1600}
+AVATAR_RENDITIONS = {"full": 400}
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "30"))
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _output_format():
+    if features.check("webp"):
+        return "WEBP", "webp", "image/webp"
+    return "JPEG", "jpg", "image/jpeg"
+
+
+def render_image(data, renditions):
+    """Decode an image and encode one resized copy per rendition, without metadata.
+
+    Runs inside a pool process. Returns {name: (bytes, extension, content_type)}.
+    """
+    fmt, extension, content_type = _output_format()
+
+    with Image.open(io.BytesIO(data)) as source:
+        # Apply the EXIF orientation to the pixels before the EXIF is dropped
+        image = ImageOps.exif_transpose(source)
+        if fmt == "JPEG" or image.mode not in ("RGB", "RGBA"):
+            keep_alpha = fmt == "WEBP" and ("A" in image.getbands() or "transparency" in image.info)
+            image = image.convert("RGBA" if keep_alpha else "RGB")
+
+        results = {}
+        for name, max_edge in renditions.items():
+            resized = image.copy()
+            resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == "WEBP":
+                resized.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+            else:
+                resized.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            results[name] = (out.getvalue(), extension, content_type)
+        return results
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a multi-threaded gunicorn worker is not safe
+                _pool = ProcessPoolExecutor(
+                    max_workers=IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next image gets a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def process_image(data, renditions=PRODUCT_RENDITIONS):
+    """Render the given renditions of an uploaded image on the process pool."""
+    pool = _get_pool()
+    try:
+        return pool.submit(render_image, data, renditions).result(timeout=IMAGE_TIMEOUT)
+    except BrokenProcessPool:
+        # A pool process died (e.g. killed for memory); the job retries on a new pool
+        _discard_pool(pool)
+        raise
@@ -0,0 +1,155 @@
+import os
+
+# =================== INVENTORY & CART RESERVATIONS =================== #
+#
+# products.stock is the number of units still for sale (second-hand listings
+# start at 1; 0 means sold). Adding to the cart reserves units for a short
+# while: a reservation held by another user counts against what is available
+# until it expires, so two buyers can't both hold the last unit.
+#
+# Expired reservations simply stop counting; purge_expired_reservations()
+# deletes the rows in the background.
+#
+# Only row locks are taken: reserving locks the one product row, and
+# checkout locks the buyer's cart rows and their products (in product id
+# order). All functions take an open connection inside a transaction.
+#
+# Start those transactions at TRANSACTION_ISOLATION. Other users'
+# reservations are summed with a plain read once the product row is locked;
+# under REPEATABLE READ that read would reuse a snapshot taken by any earlier
+# plain read in the transaction and miss reservations committed since, letting
+# two buyers hold the last unit.
+
+TRANSACTION_ISOLATION = "READ COMMITTED"
+RESERVATION_SECONDS = int(os.getenv("CART_RESERVATION_SECONDS", "900"))
+PURGE_BATCH_SIZE = 1000
+
+
+class OutOfStockError(Exception):
+    """Raised when a conditional stock decrement finds too few units left."""
+
+    def __init__(self, product_ids):
+        super().__init__(f"Not enough stock for products {product_ids}")
+        self.product_ids = product_ids
+
+
+def held_by_others_query(user_id, product_ids):
+    """(sql, params) summing other users' unexpired reservations per product."""
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    sql = f"""
+        SELECT product_id, SUM(quantity)
+        FROM cart_reservations
+        WHERE product_id IN ({placeholders}) AND user_id <> %s AND expires_at > NOW()
+        GROUP BY product_id
+    """
+    return sql, list(product_ids) + [user_id]
+
+
+def _held_by_others(cursor, user_id, product_ids):
+    """{product_id: units} held by other users' unexpired reservations."""
+    cursor.execute(*held_by_others_query(user_id, product_ids))
+    return {product_id: int(units) for product_id, units in cursor.fetchall()}
+
+
+def available(conn, user_id, product_id):
+    """Units of a product the user could hold (stock minus other users' reservations), or None if it's gone."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT stock FROM products WHERE id = %s", (product_id,))
+    row = cursor.fetchone()
+    units = None
+    if row:
+        units = max(row[0] - _held_by_others(cursor, user_id, [product_id]).get(product_id, 0), 0)
+    cursor.close()
+    return units
+
+
+def reserve(conn, user_id, product_id, quantity):
+    """Hold `quantity` units of a product for the user; returns False if they aren't available.
+
+    Replaces (and extends) any reservation the user already has on the product.
+    """
+    cursor = conn.cursor()
+    # Serialises reservations of this one product until the transaction ends
+    cursor.execute("SELECT stock FROM products WHERE id = %s FOR UPDATE", (product_id,))
+    row = cursor.fetchone()
+    if not row:
+        cursor.close()
+        return False
+
+    available = row[0] - _held_by_others(cursor, user_id, [product_id]).get(product_id, 0)
+    if available < quantity:
+        cursor.close()
+        return False
+
+    cursor.execute("""
+        INSERT INTO cart_reservations (user_id, product_id, quantity, expires_at)
+        VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+        ON DUPLICATE KEY UPDATE quantity = VALUES(quantity), expires_at = VALUES(expires_at)
+    """, (user_id, product_id, quantity, RESERVATION_SECONDS))
+    cursor.close()
+    return True
+
+
+def release(conn, user_id, product_ids=None):
+    """Drop the user's reservations (all of them, or only for product_ids)."""
+    cursor = conn.cursor()
+    if product_ids is None:
+        cursor.execute("DELETE FROM cart_reservations WHERE user_id = %s", (user_id,))
+    elif product_ids:
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        cursor.execute(
+            f"DELETE FROM cart_reservations WHERE user_id = %s AND product_id IN ({placeholders})",
+            [user_id] + list(product_ids)
+        )
+    cursor.close()
+
+
+def take_stock(conn, user_id, items):
+    """Decrement stock for a checkout; items are dicts with product_id, quantity and stock.
+
+    The product rows must already be locked (checkout reads the cart FOR
+    UPDATE). Raises OutOfStockError, without changing anything, if any item
+    is short once other users' reservations are taken into account.
+    """
+    cursor = conn.cursor()
+    held = _held_by_others(cursor, user_id, [item['product_id'] for item in items])
+    short = [
+        item['product_id'] for item in items
+        if item['stock'] - held.get(item['product_id'], 0) < item['quantity']
+    ]
+    if short:
+        cursor.close()
+        raise OutOfStockError(short)
+
+    for item in items:
+        # Conditional decrement: never lets stock go below zero
+        cursor.execute(
+            "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s",
+            (item['quantity'], item['product_id'], item['quantity'])
+        )
+        if cursor.rowcount != 1:
+            cursor.close()
+            raise OutOfStockError([item['product_id']])
+    cursor.close()
+
+
+def purge_expired_reservations(conn):
+    """Delete all expired reservations, committing every PURGE_BATCH_SIZE rows; returns how many went.
+
+    Unlike the functions above this commits itself, so each batch's row
+    locks are held only briefly; call it outside any other transaction.
+    """
+    cursor = conn.cursor()
+    deleted = 0
+    while True:
+        cursor.execute(
+            "DELETE FROM cart_reservations WHERE expires_at <= NOW() LIMIT %s",
+            (PURGE_BATCH_SIZE,)
+        )
+        batch = cursor.rowcount
+        conn.commit()
+        deleted += batch
+        if batch < PURGE_BATCH_SIZE:
+            break
+    cursor.close()
+    return deleted
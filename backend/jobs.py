@@ -0,0 +1,373 @@
+import contextvars
+import io
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import wait
+
+from werkzeug.datastructures import FileStorage
+
+import profiling
+from db import db_connection
+from storage_service import storage_service
+
+# =================== BACKGROUND JOBS =================== #
+#
+# Durable job queue stored in MySQL (tables `jobs` and `job_files`, created by
+# migration 5). Routes enqueue work and return right away; a small pool of
+# worker threads claims jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+# number of workers (threads or processes) can share the queue.
+#
+# Failed jobs are retried with exponential backoff until max_attempts, then
+# marked failed. A running job's lease is renewed while its handler runs; a
+# job left 'running' by a crashed worker is put back in the queue once its
+# lease expires. Handlers can therefore run more than once for the same job
+# and must be idempotent.
+#
+# Uploaded files are staged in GCS under job-files/ (private objects) and
+# only their object names are stored, so large uploads never go through
+# max_allowed_packet. Pass an executor to enqueue() to stage a request's
+# files concurrently; the request then waits for the slowest file instead of
+# the sum of them. Staged objects are deleted when the job succeeds or
+# finally fails; give the bucket a lifecycle rule on job-files/ to clear any
+# left behind by a crash.
+#
+# The workers also run periodic housekeeping tasks (@periodic_task). Each
+# process runs them on its own schedule, so they must be safe to run twice.
+#
+#     @job_handler("resize")
+#     def resize(payload, files):
+#         ...
+#         return {"url": url}        # stored as the job's result
+#
+#     job_id = enqueue("resize", {"user_id": 1}, files=[request.files["image"]], executor=pool)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+LEASE_RENEW_SECONDS = JOB_LEASE_SECONDS / 3
+STAGING_PREFIX = "job-files/"
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = 2
+RETRY_MAX_SECONDS = 300
+
+HANDLERS = {}
+PERIODIC_TASKS = {}
+
+_wakeup = threading.Event()
+_periodic_lock = threading.Lock()
+_workers = []
+_worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_handler(job_type):
+    """Register fn(payload, files) as the handler for job_type."""
+    def register(fn):
+        HANDLERS[job_type] = fn
+        return fn
+    return register
+
+
+def periodic_task(name, interval):
+    """Register fn() to run every `interval` seconds on the job workers."""
+    def register(fn):
+        PERIODIC_TASKS[name] = {"fn": fn, "interval": interval, "next_run": 0}
+        return fn
+    return register
+
+
+def _stage_file(file):
+    """Upload a request file to a private staging object; returns its object name."""
+    blob_name = f"{STAGING_PREFIX}{uuid.uuid4().hex}"
+    storage_service.upload(file.stream, blob_name, content_type=file.mimetype, public=False)
+    return blob_name
+
+
+def _delete_staged(blob_names):
+    if not blob_names:
+        return
+    try:
+        storage_service.delete_many(blob_names)
+    except Exception as e:
+        print(f"Error deleting staged job files {blob_names}: {e}")
+
+
+def _stage_files(files, executor):
+    """Stage files, concurrently on executor if given; returns their object names in order.
+
+    If any upload fails, the ones that succeeded are deleted again and the
+    first error is raised.
+    """
+    if executor is None:
+        blob_names = []
+        try:
+            for file in files:
+                blob_names.append(_stage_file(file))
+        except Exception:
+            _delete_staged(blob_names)
+            raise
+        return blob_names
+
+    # Each upload thread runs in a copy of the caller's context, so its GCS calls
+    # count towards the caller's request profile (see profiling.py)
+    futures = [executor.submit(contextvars.copy_context().run, _stage_file, file) for file in files]
+    wait(futures)
+    failed = [future.exception() for future in futures if future.exception()]
+    if failed:
+        _delete_staged([future.result() for future in futures if not future.exception()])
+        raise failed[0]
+    return [future.result() for future in futures]
+
+
+def enqueue(job_type, payload, files=(), max_attempts=DEFAULT_MAX_ATTEMPTS, executor=None):
+    """Store a job (and any uploaded files it needs) and return its id."""
+    staged = []
+    try:
+        blob_names = _stage_files(files, executor)
+        staged = [(file.filename, file.mimetype, blob_name) for file, blob_name in zip(files, blob_names)]
+
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO jobs (type, payload, max_attempts)
+                VALUES (%s, %s, %s)
+            """, (job_type, json.dumps(payload), max_attempts))
+            job_id = cursor.lastrowid
+
+            if staged:
+                cursor.executemany("""
+                    INSERT INTO job_files (job_id, position, filename, mimetype, blob_name)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, [(job_id, position, *file) for position, file in enumerate(staged)])
+
+            conn.commit()
+            cursor.close()
+    except Exception:
+        _delete_staged([blob_name for _, _, blob_name in staged])
+        raise
+
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id):
+    """Public view of a job's state, or None if it doesn't exist."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, type, status, attempts, max_attempts, result, error, run_after, created_at, updated_at
+            FROM jobs WHERE id = %s
+        """, (job_id,))
+        job = cursor.fetchone()
+        cursor.close()
+
+    if not job:
+        return None
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def job_counts():
+    """Number of jobs in each status."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        counts = {status: count for status, count in cursor.fetchall()}
+        cursor.close()
+    return counts
+
+
+def _load_files(file_rows):
+    """The job's files, downloaded from staging (rows queued before staging carry the data inline)."""
+    return [
+        FileStorage(
+            stream=io.BytesIO(row['data'] if row['blob_name'] is None else storage_service.download(row['blob_name'])),
+            filename=row['filename'],
+            content_type=row['mimetype']
+        )
+        for row in file_rows
+    ]
+
+
+def _delete_job_files(cursor, job_id):
+    """Delete a job's file rows; returns the staged object names to delete after commit."""
+    cursor.execute("SELECT blob_name FROM job_files WHERE job_id = %s AND blob_name IS NOT NULL", (job_id,))
+    blob_names = [row[0] for row in cursor.fetchall()]
+    cursor.execute("DELETE FROM job_files WHERE job_id = %s", (job_id,))
+    return blob_names
+
+
+def _claim_job():
+    """Lock the next due job for this worker; returns (job, file rows) or None."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        conn.start_transaction()
+        cursor.execute("""
+            SELECT id, type, payload, attempts, max_attempts
+            FROM jobs
+            WHERE status = 'pending' AND run_after <= NOW(6)
+            ORDER BY run_after, id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        """)
+        job = cursor.fetchone()
+        if not job:
+            conn.rollback()
+            return None
+
+        cursor.execute("""
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, locked_by = %s, locked_at = NOW(6)
+            WHERE id = %s
+        """, (_worker_id, job['id']))
+        conn.commit()
+
+        job['attempts'] += 1
+        job['payload'] = json.loads(job['payload'])
+        cursor.execute("""
+            SELECT filename, mimetype, blob_name, data FROM job_files
+            WHERE job_id = %s ORDER BY position
+        """, (job['id'],))
+        file_rows = cursor.fetchall()
+        cursor.close()
+    return job, file_rows
+
+
+def _renew_lease(job_id, stop):
+    """Keep a running job's lease fresh until stop is set, so it isn't handed to another worker."""
+    while not stop.wait(LEASE_RENEW_SECONDS):
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE jobs SET locked_at = NOW(6)
+                    WHERE id = %s AND status = 'running' AND locked_by = %s
+                """, (job_id, _worker_id))
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            print(f"Job {job_id}: lease renewal failed: {e}")
+
+
+@periodic_task("requeue_expired_leases", JOB_LEASE_SECONDS / 2)
+def _requeue_expired_leases():
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE jobs SET status = 'pending', locked_by = NULL, locked_at = NULL
+            WHERE status = 'running' AND locked_at < NOW(6) - INTERVAL %s SECOND
+        """, (JOB_LEASE_SECONDS,))
+        conn.commit()
+        cursor.close()
+
+
+def _finish_job(job_id, result):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE jobs SET status = 'succeeded', result = %s, error = NULL, locked_by = NULL
+            WHERE id = %s
+        """, (json.dumps(result), job_id))
+        staged = _delete_job_files(cursor, job_id)
+        conn.commit()
+        cursor.close()
+    _delete_staged(staged)
+
+
+def _fail_job(job, error):
+    if job['attempts'] < job['max_attempts']:
+        # Exponential backoff with jitter: 2s, 4s, 8s, ... capped at 5 minutes
+        delay = min(RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1), RETRY_MAX_SECONDS)
+        delay *= random.uniform(0.8, 1.2)
+        status_sql = "status = 'pending', run_after = NOW(6) + INTERVAL %s MICROSECOND"
+        params = [int(delay * 1_000_000)]
+    else:
+        status_sql = "status = 'failed'"
+        params = []
+
+    staged = []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            UPDATE jobs SET {status_sql}, error = %s, locked_by = NULL
+            WHERE id = %s
+        """, params + [error[:2000], job['id']])
+        if job['attempts'] >= job['max_attempts']:
+            staged = _delete_job_files(cursor, job['id'])
+        conn.commit()
+        cursor.close()
+    _delete_staged(staged)
+
+
+def run_next_job():
+    """Claim and run one job. Returns False when the queue has nothing due."""
+    claimed = _claim_job()
+    if not claimed:
+        return False
+
+    job, file_rows = claimed
+    handler = HANDLERS.get(job['type'])
+    stop_renewing = threading.Event()
+    threading.Thread(target=_renew_lease, args=(job['id'], stop_renewing),
+                     name=f"job-lease-{job['id']}", daemon=True).start()
+    profile_token = profiling.start_job()
+    status = "failed"
+    try:
+        if handler is None:
+            raise RuntimeError(f"No handler registered for job type {job['type']}")
+        result = handler(job['payload'], _load_files(file_rows))
+    except Exception as e:
+        print(f"Job {job['id']} ({job['type']}) attempt {job['attempts']} failed: {e}")
+        traceback.print_exc()
+        _fail_job(job, str(e))
+    else:
+        _finish_job(job['id'], result)
+        status = "succeeded"
+    finally:
+        stop_renewing.set()
+        profiling.finish_job(profile_token, job['type'], status)
+    return True
+
+
+def _run_due_periodic_tasks():
+    now = time.monotonic()
+    with _periodic_lock:
+        # Claim due tasks so the other worker threads skip them
+        due = [(name, task) for name, task in PERIODIC_TASKS.items() if task["next_run"] <= now]
+        for name, task in due:
+            task["next_run"] = now + task["interval"]
+
+    for name, task in due:
+        try:
+            task["fn"]()
+        except Exception as e:
+            print(f"Periodic task {name} failed: {e}")
+
+
+def _worker_loop():
+    while True:
+        try:
+            _run_due_periodic_tasks()
+
+            if not run_next_job():
+                _wakeup.wait(JOB_POLL_INTERVAL)
+                _wakeup.clear()
+        except Exception as e:
+            # Database unavailable or not migrated yet; try again later
+            print(f"Job worker error: {e}")
+            time.sleep(30)
+
+
+def start_workers(count=JOB_WORKERS):
+    """Start the background worker threads (once per process)."""
+    if _workers:
+        return
+    for i in range(count):
+        worker = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+        worker.start()
+        _workers.append(worker)
@@ -0,0 +1,105 @@
+import os
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+# =================== JSON PROVIDER =================== #
+#
+# Flask's default provider runs every value through json.dumps with a Python
+# `default` hook, which is slow for the large lists the catalogue and order
+# routes return. These providers encode in C and understand the types rows
+# come back with from MySQL, so routes can jsonify rows as they are:
+#
+#   Decimal            -> JSON number with the exact digits, e.g. 1500.00
+#   datetime / date    -> ISO 8601 string
+#
+# orjson writes exact Decimals through orjson.Fragment; on orjson releases
+# without Fragment it falls back to float, which drops trailing zeros and
+# rounds past ~15 significant digits.
+#
+# JSON_PROVIDER picks one: msgspec (default), orjson, or default (Flask's
+# json.dumps-based provider with the same number/ISO 8601 output, Decimals
+# as floats). If the chosen library isn't installed the default provider is
+# used; an unknown name is a configuration error.
+
+
+class MsgspecJSONProvider(JSONProvider):
+    """JSON provider backed by msgspec."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        import msgspec
+        self._encoder = msgspec.json.Encoder(decimal_format="number")
+        self._decode = msgspec.json.decode
+
+    def dumps(self, obj, **kwargs):
+        return self._encoder.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return self._decode(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Hand the encoded bytes straight to the response, no str round trip
+        return self._app.response_class(self._encoder.encode(obj) + b"\n", mimetype="application/json")
+
+
+class OrjsonJSONProvider(JSONProvider):
+    """JSON provider backed by orjson (optional dependency)."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS
+        # Same digits as msgspec's decimal_format="number" (str of the Decimal)
+        self._encode_decimal = (lambda d: orjson.Fragment(str(d))) if hasattr(orjson, "Fragment") else float
+
+    def _default(self, obj):
+        if isinstance(obj, Decimal):
+            return self._encode_decimal(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return self._orjson.dumps(obj, default=self._default, option=self._options).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._orjson.dumps(obj, default=self._default, option=self._options) + b"\n"
+        return self._app.response_class(body, mimetype="application/json")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider, emitting Decimals as numbers and dates as ISO 8601 like the others."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+PROVIDERS = {
+    "msgspec": MsgspecJSONProvider,
+    "orjson": OrjsonJSONProvider,
+    "default": StdlibJSONProvider,
+}
+
+
+def install_json_provider(app, name=None):
+    """Switch app.json to the configured provider, falling back to the default one if it isn't installed."""
+    name = (name or os.getenv("JSON_PROVIDER", "msgspec")).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER {name!r}, expected one of {', '.join(PROVIDERS)}")
+    try:
+        app.json = PROVIDERS[name](app)
+    except ImportError as e:
+        print(f"JSON provider {name} unavailable ({e}), using the default provider")
+        app.json = StdlibJSONProvider(app)
+    return app.json
@@ -0,0 +1,586 @@
+"""Versioned schema migrations for the UniSale MySQL database.
+
+Usage (from the backend directory, DB_* env vars pick the database):
+
+    python migrations.py migrate            # apply pending migrations
+    python migrations.py seed               # fill an empty scratch database with synthetic data
+    python migrations.py explain            # fail if a hot query does a full table scan
+
+    DB_NAME=unisale_check python migrations.py migrate seed explain
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+import inventory
+import queries
+from db import db_connection
+from pagination import encode_cursor
+
+# =================== MIGRATION HELPERS =================== #
+
+
+def _column_name(column):
+    """'image_url(255)' -> 'image_url'"""
+    return column.split("(")[0].strip()
+
+
+def _existing_indexes(cursor, table):
+    """Map of index name -> ordered column list for a table."""
+    cursor.execute("""
+        SELECT index_name, column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+    """, (table,))
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name)
+    return indexes
+
+
+def add_index(table, name, columns, kind=""):
+    """Migration step adding an index unless one with that name or leading columns already exists."""
+    def step(cursor):
+        wanted = [_column_name(c) for c in columns]
+        for index_name, index_columns in _existing_indexes(cursor, table).items():
+            if index_name == name or (not kind and index_columns[:len(wanted)] == wanted):
+                print(f"  {table}: {name} already covered by {index_name}")
+                return
+        print(f"  {table}: adding {kind + ' ' if kind else ''}index {name} ({', '.join(columns)})")
+        cursor.execute(f"ALTER TABLE {table} ADD {kind + ' ' if kind else ''}INDEX {name} ({', '.join(columns)})")
+    return step
+
+
+def _has_column(cursor, table, name):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, name))
+    return bool(cursor.fetchall())
+
+
+def add_column(table, name, definition):
+    """Migration step adding a column unless it already exists."""
+    def step(cursor):
+        if _has_column(cursor, table, name):
+            print(f"  {table}: column {name} already exists")
+            return
+        print(f"  {table}: adding column {name}")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    return step
+
+
+def drop_column(table, name):
+    """Migration step dropping a column if it exists."""
+    def step(cursor):
+        if not _has_column(cursor, table, name):
+            print(f"  {table}: no column {name} to drop")
+            return
+        print(f"  {table}: dropping column {name}")
+        cursor.execute(f"ALTER TABLE {table} DROP COLUMN {name}")
+    return step
+
+
+def if_column_exists(table, name, sql):
+    """Migration step running sql only while a column exists (e.g. a backfill from a column dropped later)."""
+    def step(cursor):
+        if not _has_column(cursor, table, name):
+            print(f"  {table}: no column {name}, skipping")
+            return
+        cursor.execute(sql)
+    return step
+
+
+def add_foreign_key(table, name, definition):
+    """Migration step adding a foreign key constraint unless one with that name exists."""
+    def step(cursor):
+        cursor.execute("""
+            SELECT 1 FROM information_schema.table_constraints
+            WHERE table_schema = DATABASE() AND table_name = %s AND constraint_name = %s
+              AND constraint_type = 'FOREIGN KEY'
+        """, (table, name))
+        if cursor.fetchall():
+            print(f"  {table}: foreign key {name} already exists")
+            return
+        print(f"  {table}: adding foreign key {name}")
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY {definition}")
+    return step
+
+
+def drop_index(table, name):
+    """Migration step dropping an index if it exists."""
+    def step(cursor):
+        if name not in _existing_indexes(cursor, table):
+            print(f"  {table}: no index {name} to drop")
+            return
+        print(f"  {table}: dropping index {name}")
+        cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+    return step
+
+
+# =================== MIGRATIONS =================== #
+#
+# Append new migrations at the end with the next version number; never edit
+# one that has already shipped. Steps are SQL strings or callables taking a
+# cursor. Tables use IF NOT EXISTS so databases created before migrations
+# existed can be brought under version control.
+
+MIGRATIONS = [
+    (1, "base schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255),
+            email VARCHAR(255) NOT NULL,
+            verified TINYINT(1) NOT NULL DEFAULT 0,
+            profile_picture VARCHAR(512),
+            phone VARCHAR(20),
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            category VARCHAR(100),
+            state VARCHAR(50),
+            price DECIMAL(10, 2) NOT NULL,
+            image_url VARCHAR(512),
+            original_price DECIMAL(10, 2),
+            months_used INT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_images (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            product_id INT NOT NULL,
+            image_url VARCHAR(512) NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS wishlist (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            users_id INT NOT NULL,
+            image_url VARCHAR(512) NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cart (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL DEFAULT 1,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            total_amount DECIMAL(10, 2) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            order_id INT NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL,
+            price DECIMAL(10, 2) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS delivery_addresses (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            order_id INT NOT NULL,
+            user_id INT NOT NULL,
+            full_name VARCHAR(255),
+            phone VARCHAR(20),
+            address TEXT,
+            city VARCHAR(100),
+            state VARCHAR(100),
+            pincode VARCHAR(10),
+            hostel_room VARCHAR(50)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (2, "indexes for hot query paths", [
+        add_index("users", "idx_users_email", ["email"]),
+        add_index("cart", "idx_cart_user_product", ["user_id", "product_id"]),
+        add_index("wishlist", "idx_wishlist_user_image", ["users_id", "image_url(255)"]),
+        # Dashboard filters + each sort order; InnoDB appends the primary key,
+        # so these also serve the (sort key, id) keyset pagination seeks
+        add_index("products", "idx_products_category_state_created", ["category", "state", "created_at"]),
+        add_index("products", "idx_products_category_state_price", ["category", "state", "price"]),
+        add_index("products", "idx_products_created", ["created_at"]),
+        add_index("products", "idx_products_price", ["price"]),
+        add_index("products", "idx_products_user", ["user_id"]),
+        add_index("products", "idx_products_image_url", ["image_url(255)"]),
+        add_index("product_images", "idx_product_images_product", ["product_id"]),
+        add_index("orders", "idx_orders_user_created", ["user_id", "created_at"]),
+        add_index("order_items", "idx_order_items_order", ["order_id"]),
+        add_index("delivery_addresses", "idx_delivery_addresses_order", ["order_id"]),
+    ]),
+    (3, "full-text search indexes", [
+        add_index("products", "ft_products_name", ["name"], kind="FULLTEXT"),
+        add_index("products", "ft_products_name_description", ["name", "description"], kind="FULLTEXT"),
+    ]),
+    (4, "resized image renditions", [
+        # image_url keeps pointing at the full-size rendition
+        add_column("products", "card_url", "VARCHAR(512) NULL AFTER image_url"),
+        add_column("products", "thumbnail_url", "VARCHAR(512) NULL AFTER card_url"),
+        add_column("product_images", "card_url", "VARCHAR(512) NULL AFTER image_url"),
+        add_column("product_images", "thumbnail_url", "VARCHAR(512) NULL AFTER card_url"),
+    ]),
+    (5, "background job queue", [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            type VARCHAR(64) NOT NULL,
+            status ENUM('pending', 'running', 'succeeded', 'failed') NOT NULL DEFAULT 'pending',
+            payload JSON NOT NULL,
+            result JSON,
+            error TEXT,
+            attempts INT NOT NULL DEFAULT 0,
+            max_attempts INT NOT NULL DEFAULT 5,
+            run_after DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            locked_by VARCHAR(128),
+            locked_at DATETIME(6),
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            KEY idx_jobs_status_run_after (status, run_after),
+            KEY idx_jobs_status_locked_at (status, locked_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS job_files (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            job_id BIGINT NOT NULL,
+            position INT NOT NULL,
+            filename VARCHAR(255),
+            mimetype VARCHAR(100),
+            data LONGBLOB NOT NULL,
+            KEY idx_job_files_job (job_id, position)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (6, "wishlist keyed by product_id", [
+        add_column("wishlist", "product_id", "INT NULL AFTER users_id"),
+        # Backfill from the old image_url key; rows whose product is gone can't be matched
+        if_column_exists("wishlist", "image_url", """
+            UPDATE wishlist w
+            JOIN products p ON p.image_url = w.image_url
+            SET w.product_id = p.id
+            WHERE w.product_id IS NULL
+        """),
+        "DELETE FROM wishlist WHERE product_id IS NULL",
+        # The old SELECT-then-INSERT toggle could race into duplicates; keep the oldest row
+        """
+        DELETE w1 FROM wishlist w1
+        JOIN wishlist w2 ON w1.users_id = w2.users_id AND w1.product_id = w2.product_id AND w1.id > w2.id
+        """,
+        "ALTER TABLE wishlist MODIFY product_id INT NOT NULL",
+        add_index("wishlist", "uq_wishlist_user_product", ["users_id", "product_id"], kind="UNIQUE"),
+        add_foreign_key("wishlist", "fk_wishlist_product",
+                        "(product_id) REFERENCES products (id) ON DELETE CASCADE"),
+        drop_index("wishlist", "idx_wishlist_user_image"),
+        drop_column("wishlist", "image_url"),
+    ]),
+    (7, "unique cart rows per user and product", [
+        # Merge duplicate rows left by the old SELECT-then-INSERT add_to_cart into the oldest one
+        """
+        UPDATE cart c
+        JOIN (
+            SELECT MIN(id) AS keep_id, SUM(quantity) AS total
+            FROM cart
+            GROUP BY user_id, product_id
+            HAVING COUNT(*) > 1
+        ) d ON c.id = d.keep_id
+        SET c.quantity = d.total
+        """,
+        """
+        DELETE c FROM cart c
+        JOIN cart k ON k.user_id = c.user_id AND k.product_id = c.product_id AND k.id < c.id
+        """,
+        add_index("cart", "uq_cart_user_product", ["user_id", "product_id"], kind="UNIQUE"),
+        drop_index("cart", "idx_cart_user_product"),
+    ]),
+    (8, "inventory and cart reservations", [
+        # Second-hand listings are single items; 0 means sold
+        add_column("products", "stock", "INT NOT NULL DEFAULT 1 AFTER price"),
+        # Products that have already been ordered are sold
+        """
+        UPDATE products p
+        JOIN (
+            SELECT DISTINCT oi.product_id
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            WHERE o.status <> 'cancelled'
+        ) sold ON sold.product_id = p.id
+        SET p.stock = 0
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cart_reservations (
+            user_id INT NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL,
+            expires_at DATETIME NOT NULL,
+            PRIMARY KEY (user_id, product_id),
+            KEY idx_cart_reservations_product (product_id, expires_at),
+            KEY idx_cart_reservations_expires (expires_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (9, "idempotency keys", [
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope VARCHAR(64) CHARACTER SET ascii NOT NULL,
+            idempotency_key VARCHAR(255) CHARACTER SET ascii NOT NULL,
+            fingerprint CHAR(64) CHARACTER SET ascii NOT NULL,
+            status ENUM('in_progress', 'completed') NOT NULL DEFAULT 'in_progress',
+            response_status SMALLINT,
+            response_body MEDIUMTEXT,
+            content_type VARCHAR(100),
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_at DATETIME NOT NULL,
+            expires_at DATETIME NOT NULL,
+            PRIMARY KEY (scope, idempotency_key),
+            KEY idx_idempotency_keys_expires (expires_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (10, "row versions for conditional GET", [
+        # Microsecond precision so two writes in the same second still change the ETag
+        add_column("products", "updated_at",
+                   "DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"),
+        add_column("users", "updated_at",
+                   "DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"),
+    ]),
+    (11, "name prefix index for short searches", [
+        # Serves `p.name LIKE 'x%'` for search terms too short for the FULLTEXT index
+        add_index("products", "idx_products_name", ["name"]),
+    ]),
+    (12, "idempotent product uploads, job files staged in GCS", [
+        # Set from the upload job's payload, so a re-run job finds the product it already saved
+        add_column("products", "upload_id", "CHAR(32) CHARACTER SET ascii NULL"),
+        add_index("products", "uq_products_upload_id", ["upload_id"], kind="UNIQUE"),
+        add_column("job_files", "blob_name", "VARCHAR(255) NULL AFTER mimetype"),
+        "ALTER TABLE job_files MODIFY data LONGBLOB NULL",
+    ]),
+]
+
+
+def migrate():
+    """Apply every migration newer than the database's recorded version."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        for version, description, steps in MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"Applying migration {version}: {description}")
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            conn.commit()
+
+        cursor.close()
+    print("Database schema is up to date")
+
+
+# =================== SEED DATA =================== #
+
+SEED_USERS = 2000
+SEED_PRODUCTS = 20000
+SEED_ORDERS = 10000
+
+CATEGORIES = [
+    "Books & Study Material", "Electronics & Gadgets", "Hostel & Room Essentials",
+    "Clothing & Accessories", "Stationery & Supplies", "Bicycles & Transport",
+    "Home Appliances", "Furniture", "Event & Fest Items", "Gaming & Entertainment",
+]
+WORDS = [
+    "laptop", "textbook", "calculator", "bicycle", "kettle", "chair", "lamp", "hoodie",
+    "headphones", "guitar", "mattress", "monitor", "keyboard", "notebook", "cooler", "fan",
+]
+
+
+def _insert_batches(cursor, sql, rows, batch_size=1000):
+    for i in range(0, len(rows), batch_size):
+        cursor.executemany(sql, rows[i:i + batch_size])
+
+
+def seed():
+    """Fill an empty database with a deterministic synthetic dataset for the EXPLAIN check."""
+    rng = random.Random(42)
+    now = datetime.now()
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM products")
+        if cursor.fetchone()[0]:
+            print("Database already has products, refusing to seed")
+            return
+
+        print(f"Seeding {SEED_USERS} users, {SEED_PRODUCTS} products, {SEED_ORDERS} orders")
+        _insert_batches(cursor, "INSERT INTO users (name, email, verified) VALUES (%s, %s, 1)", [
+            (f"Student {i}", f"student{i}@stu.upes.ac.in") for i in range(1, SEED_USERS + 1)
+        ])
+
+        products = []
+        for i in range(1, SEED_PRODUCTS + 1):
+            name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}"
+            products.append((
+                rng.randint(1, SEED_USERS), name, f"Used {name} in good condition",
+                rng.choice(CATEGORIES), rng.choice(["New", "Used"]), rng.randint(50, 50000),
+                f"https://storage.googleapis.com/unisale-storage/product-image/seed-{i}.jpg",
+                now - timedelta(minutes=i),
+            ))
+        _insert_batches(cursor, """
+            INSERT INTO products (user_id, name, description, category, state, price, image_url, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, products)
+        _insert_batches(cursor, "INSERT INTO product_images (product_id, image_url) VALUES (%s, %s)", [
+            (i, products[i - 1][6]) for i in range(1, SEED_PRODUCTS + 1)
+        ])
+
+        _insert_batches(cursor, "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, 1)", sorted({
+            (rng.randint(1, SEED_USERS), rng.randint(1, SEED_PRODUCTS)) for _ in range(SEED_USERS * 2)
+        }))
+        _insert_batches(cursor, "INSERT INTO wishlist (users_id, product_id) VALUES (%s, %s)", sorted({
+            (rng.randint(1, SEED_USERS), rng.randint(1, SEED_PRODUCTS))
+            for _ in range(SEED_USERS * 2)
+        }))
+
+        _insert_batches(cursor, "INSERT INTO orders (user_id, total_amount, status, created_at) VALUES (%s, %s, 'pending', %s)", [
+            (rng.randint(1, SEED_USERS), rng.randint(50, 50000), now - timedelta(hours=i))
+            for i in range(1, SEED_ORDERS + 1)
+        ])
+        _insert_batches(cursor, """
+            INSERT INTO delivery_addresses (order_id, user_id, full_name, phone, address, city, state, pincode)
+            VALUES (%s, %s, 'Seed Buyer', '9999999999', 'Bidholi Campus', 'Dehradun', 'Uttarakhand', '248007')
+        """, [(i, rng.randint(1, SEED_USERS)) for i in range(1, SEED_ORDERS + 1)])
+        _insert_batches(cursor, "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, 1, %s)", [
+            (rng.randint(1, SEED_ORDERS), rng.randint(1, SEED_PRODUCTS), rng.randint(50, 50000))
+            for _ in range(SEED_ORDERS * 2)
+        ])
+
+        conn.commit()
+        cursor.execute("ANALYZE TABLE users, products, product_images, cart, wishlist, orders, order_items, delivery_addresses")
+        cursor.fetchall()
+        cursor.close()
+    print("Seed data inserted")
+
+
+# =================== EXPLAIN CHECK =================== #
+#
+# The hot queries with representative parameters, built from the same
+# constants and builders the routes run (queries.py, inventory.py), so the
+# check can't drift from what is served. Products are checked as a paging
+# client asks for them: a page of PAGE_SIZE rows.
+#
+# Single-row INSERTs and upserts (cart quantities, wishlist adds, orders) are
+# left out: they go through primary/unique keys and EXPLAIN reports no access
+# type for them.
+
+PAGE_SIZE = "24"
+
+
+def _products(args):
+    built = queries.build_products_query(args)
+    return built["query"], built["params"]
+
+
+def _explain_queries():
+    """[(name, sql, params)] for every hot query."""
+    order_ids = [1, 2, 3]
+    return [
+        ("get_products newest, first page", *_products({"sort": "newest", "limit": PAGE_SIZE})),
+        ("get_products category + condition, newest",
+         *_products({"category": "Furniture", "condition": "Used", "limit": PAGE_SIZE})),
+        ("get_products category, low-to-high next page",
+         *_products({"category": "Electronics & Gadgets", "sort": "low-to-high", "limit": PAGE_SIZE,
+                     "cursor": encode_cursor("low-to-high", 1000, 500)})),
+        ("get_products search", *_products({"search": "laptop", "limit": PAGE_SIZE})),
+        ("get_products short search", *_products({"search": "tv", "limit": PAGE_SIZE})),
+        ("get_profile", queries.PROFILE_QUERY, ("student1@stu.upes.ac.in",)),
+        ("get_product_detail", queries.PRODUCT_DETAIL_QUERY, (1,)),
+        ("product summaries", queries.batch_query(queries.PRODUCT_DETAIL_SELECT, "p.id", 3, "GROUP BY p.id"),
+         (1, 2, 3)),
+        ("product seller", queries.SELLER_QUERY, (1,)),
+        ("get_cart", queries.CART_QUERY, (1,)),
+        ("create_order cart lock", queries.CHECKOUT_CART_QUERY, (1,)),
+        ("reservations held by others", *inventory.held_by_others_query(1, [1, 2])),
+        ("remove_from_cart", queries.CART_REMOVE_QUERY, (1, 1)),
+        ("update_cart removals", *queries.cart_removal_query(1, [1, 2])),
+        ("get_wishlist", queries.WISHLIST_QUERY, (1,)),
+        ("wishlist status bulk", *queries.wishlist_status_query(1, [1, 2, 3])),
+        ("toggle_wishlist delete", queries.WISHLIST_REMOVE_QUERY, (1, 1)),
+        ("check_wishlist_status", queries.WISHLIST_PRODUCT_STATUS_QUERY, (1, 1)),
+        ("get_orders", queries.USER_ORDER_ROWS_QUERY, (1,)),
+        ("get_user_orders", *queries.build_user_orders_query(1, limit=25)),
+        ("get_user_orders next page",
+         *queries.build_user_orders_query(1, encode_cursor("orders", datetime(2024, 1, 1), 500), limit=25)),
+        ("load_order_details addresses",
+         queries.batch_query(queries.ORDER_ADDRESSES_SELECT, "order_id", len(order_ids)), order_ids),
+        ("load_order_details items",
+         queries.batch_query(queries.ORDER_ITEMS_SELECT, "oi.order_id", len(order_ids)), order_ids),
+    ]
+
+
+def explain():
+    """EXPLAIN every hot query; return False if any of them scans a whole table."""
+    failures = []
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        for name, sql, params in _explain_queries():
+            cursor.execute("EXPLAIN " + sql, tuple(params))
+            for row in cursor.fetchall():
+                if row["type"] == "ALL":
+                    failures.append(f"{name}: full scan of {row['table']} (~{row['rows']} rows)")
+                    break
+            else:
+                print(f"  ok  {name}")
+        cursor.close()
+
+    for failure in failures:
+        print(f"  FAIL {failure}")
+    return not failures
+
+
+if __name__ == "__main__":
+    commands = sys.argv[1:] or ["migrate"]
+    for command in commands:
+        if command == "migrate":
+            migrate()
+        elif command == "seed":
+            seed()
+        elif command == "explain":
+            if not explain():
+                sys.exit(1)
+        else:
+            print(f"Unknown command: {command}")
+            sys.exit(2)
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+
+# =================== KEYSET PAGINATION =================== #
+#
+# Pages are addressed by the sort key and id of the last row on the previous
+# page instead of an OFFSET, so MySQL can seek straight to the next page
+# through the sort index no matter how deep the client has scrolled.
+#
+# The continuation token is opaque to clients: base64 of the sort mode and the
+# last row's (sort key, id).
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a continuation token can't be decoded or belongs to another sort order."""
+
+
+def parse_limit(value):
+    """Clamp the requested page size to 1..MAX_PAGE_SIZE."""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidCursorError("limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _encode_key(value):
+    if isinstance(value, datetime):
+        return {"t": "dt", "v": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"t": "dec", "v": str(value)}
+    return {"t": "num", "v": value}
+
+
+def _decode_key(data):
+    kind, value = data["t"], data["v"]
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "dec":
+        return Decimal(value)
+    if kind == "num" and isinstance(value, (int, float)):
+        return value
+    raise InvalidCursorError("Invalid cursor")
+
+
+def encode_cursor(sort_order, sort_key, row_id):
+    """Build the continuation token pointing just past (sort_key, row_id)."""
+    payload = json.dumps({"s": sort_order, "k": _encode_key(sort_key), "id": row_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_order):
+    """Return (sort_key, row_id) from a continuation token issued for sort_order."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_order:
+            raise InvalidCursorError("Cursor was issued for a different sort order")
+        return _decode_key(payload["k"]), int(payload["id"])
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def seek_predicate(sort_sql, direction, id_sql="p.id"):
+    """SQL continuing after the cursor row for ORDER BY sort_sql <direction>, id_sql <direction>.
+
+    Spelled out as an OR rather than a row comparison so MySQL can use a
+    range scan on the sort index. Parameters: sort key, sort key, id.
+    """
+    op = "<" if direction == "DESC" else ">"
+    return f"({sort_sql} {op} %s OR ({sort_sql} = %s AND {id_sql} {op} %s))"
@@ -0,0 +1,322 @@
+import contextvars
+import os
+import threading
+import time
+
+# =================== REQUEST PROFILING =================== #
+#
+# Set PROFILING_ENABLED=1 to record, for every request:
+#
+#   wall time, SQL statements and the time spent in them, GCS and Firebase
+#   call durations, and response size
+#
+# Totals per endpoint are served in Prometheus text format on /metrics, and
+# requests slower than SLOW_REQUEST_SECONDS are logged with their breakdown.
+#
+# The current request's profile lives in a ContextVar, so it follows the
+# request through threads (Flask) and tasks (asgi.py). Work handed to a
+# thread pool must carry it along: submit contextvars.copy_context().run.
+# db_connection() wraps connections to time cursor calls; storage_service
+# and token_cache report their calls through record_call().
+#
+# Background jobs are profiled the same way and reported with method "JOB"
+# and the job type as the endpoint; they are not slow-logged.
+#
+# When disabled no hooks are installed and connections are not wrapped; the
+# remaining cost is one ContextVar lookup per GCS/Firebase call.
+#
+# Metrics are per process: with several gunicorn workers each one serves its
+# own totals.
+
+ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """What one request spent its time on."""
+
+    __slots__ = ("started", "sql_statements", "sql_seconds", "calls", "lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.calls = {}  # service -> [count, seconds]
+        # Upload threads working for the same request record concurrently
+        self.lock = threading.Lock()
+
+
+def record_sql(seconds, statements=1):
+    profile = _current.get()
+    if profile is not None:
+        with profile.lock:
+            profile.sql_statements += statements
+            profile.sql_seconds += seconds
+
+
+def record_call(service, seconds):
+    """Record an outbound call (e.g. "gcs", "firebase") against the current request."""
+    profile = _current.get()
+    if profile is not None:
+        with profile.lock:
+            call = profile.calls.setdefault(service, [0, 0.0])
+            call[0] += 1
+            call[1] += seconds
+
+
+# =================== SQL TIMING =================== #
+
+class _ProfiledCursor:
+    """Cursor proxy timing execute and fetch calls."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _timed(self, method, statements, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            record_sql(time.perf_counter() - started, statements)
+
+    def execute(self, *args, **kwargs):
+        return self._timed(self._cursor.execute, 1, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._timed(self._cursor.executemany, 1, *args, **kwargs)
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone, 0)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed(self._cursor.fetchmany, 0, *args, **kwargs)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall, 0)
+
+    def __iter__(self):
+        # Unbuffered cursors read rows from the server as they are iterated
+        iterator = iter(self._cursor)
+        seconds = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    row = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - started
+                yield row
+        finally:
+            record_sql(seconds, 0)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _ProfiledConnection:
+    """Connection proxy handing out profiled cursors."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _ProfiledCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def profiled_connection(conn):
+    """The connection, wrapped to time its queries when profiling is enabled."""
+    return _ProfiledConnection(conn) if ENABLED else conn
+
+
+# =================== METRICS =================== #
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class Metrics:
+    """Per-endpoint request totals, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, method, endpoint, status, profile, wall_seconds, response_bytes, slow):
+        with self._lock:
+            totals = self._endpoints.get((method, endpoint))
+            if totals is None:
+                totals = self._endpoints[(method, endpoint)] = {
+                    "statuses": {},
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "seconds": 0.0,
+                    "count": 0,
+                    "slow": 0,
+                    "sql_statements": 0,
+                    "sql_seconds": 0.0,
+                    "response_bytes": 0,
+                    "calls": {},
+                }
+            totals["statuses"][status] = totals["statuses"].get(status, 0) + 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if wall_seconds <= bound:
+                    totals["buckets"][i] += 1
+            totals["seconds"] += wall_seconds
+            totals["count"] += 1
+            totals["slow"] += slow
+            totals["sql_statements"] += profile.sql_statements
+            totals["sql_seconds"] += profile.sql_seconds
+            totals["response_bytes"] += response_bytes or 0
+            for service, (count, seconds) in profile.calls.items():
+                call = totals["calls"].setdefault(service, [0, 0.0])
+                call[0] += count
+                call[1] += seconds
+
+    def render(self):
+        with self._lock:
+            endpoints = {
+                key: {**totals, "statuses": dict(totals["statuses"]), "buckets": list(totals["buckets"]),
+                      "calls": {service: list(call) for service, call in totals["calls"].items()}}
+                for key, totals in self._endpoints.items()
+            }
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        metric("unisale_http_requests_total", "counter", "Requests handled, by endpoint and status (background jobs: method JOB).", [
+            f"unisale_http_requests_total{{{_labels(method=method, endpoint=endpoint, status=status)}}} {count}"
+            for (method, endpoint), totals in endpoints.items()
+            for status, count in sorted(totals["statuses"].items())
+        ])
+
+        samples = []
+        for (method, endpoint), totals in endpoints.items():
+            labels = _labels(method=method, endpoint=endpoint)
+            for bound, count in zip(DURATION_BUCKETS, totals["buckets"]):
+                samples.append(f'unisale_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            samples.append(f'unisale_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {totals["count"]}')
+            samples.append(f"unisale_http_request_duration_seconds_sum{{{labels}}} {totals['seconds']}")
+            samples.append(f"unisale_http_request_duration_seconds_count{{{labels}}} {totals['count']}")
+        metric("unisale_http_request_duration_seconds", "histogram", "Request wall time.", samples)
+
+        for name, key, help_text in (
+            ("unisale_http_slow_requests_total", "slow", f"Requests slower than {SLOW_REQUEST_SECONDS}s."),
+            ("unisale_sql_statements_total", "sql_statements", "SQL statements executed by requests."),
+            ("unisale_sql_duration_seconds_total", "sql_seconds", "Time requests spent in SQL calls."),
+            ("unisale_http_response_bytes_total", "response_bytes", "Response body bytes sent."),
+        ):
+            metric(name, "counter", help_text, [
+                f"{name}{{{_labels(method=method, endpoint=endpoint)}}} {totals[key]}"
+                for (method, endpoint), totals in endpoints.items()
+            ])
+
+        for name, index, help_text in (
+            ("unisale_external_calls_total", 0, "GCS and Firebase calls made by requests."),
+            ("unisale_external_call_duration_seconds_total", 1, "Time requests spent in GCS and Firebase calls."),
+        ):
+            metric(name, "counter", help_text, [
+                f"{name}{{{_labels(method=method, endpoint=endpoint, service=service)}}} {call[index]}"
+                for (method, endpoint), totals in endpoints.items()
+                for service, call in sorted(totals["calls"].items())
+            ])
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# =================== REQUEST HOOKS =================== #
+
+def start_request():
+    """Begin profiling a request; returns the token to pass to finish_request()."""
+    return _current.set(RequestProfile())
+
+
+def finish_request(token, method, endpoint, path, status, response_bytes):
+    """Stop profiling, add the request to the metrics and log it if slow; returns the profile and wall time."""
+    profile = _current.get()
+    _current.reset(token)
+    wall_seconds = time.perf_counter() - profile.started
+    slow = wall_seconds >= SLOW_REQUEST_SECONDS
+    metrics.observe(method, endpoint or "unmatched", status, profile, wall_seconds, response_bytes, slow)
+
+    if slow:
+        calls = "".join(
+            f", {service} {count}x {seconds:.3f}s" for service, (count, seconds) in sorted(profile.calls.items())
+        )
+        print(f"Slow request: {method} {path} -> {status} in {wall_seconds:.3f}s, "
+              f"{profile.sql_statements} SQL statements {profile.sql_seconds:.3f}s{calls}, "
+              f"{response_bytes if response_bytes is not None else 'streamed'} bytes")
+    return profile, wall_seconds
+
+
+def start_job():
+    """Begin profiling a background job; returns the token for finish_job() (None when disabled)."""
+    return _current.set(RequestProfile()) if ENABLED else None
+
+
+def finish_job(token, job_type, status):
+    """Stop profiling a job and add it to the metrics."""
+    if token is None:
+        return
+    profile = _current.get()
+    _current.reset(token)
+    metrics.observe("JOB", job_type, status, profile, time.perf_counter() - profile.started, 0, False)
+
+
+def server_timing(profile, wall_seconds):
+    """Server-Timing header value, so the breakdown shows up in browser dev tools."""
+    parts = [f"sql;desc=\"{profile.sql_statements} statements\";dur={profile.sql_seconds * 1000:.1f}"]
+    parts.extend(
+        f"{service};dur={seconds * 1000:.1f}" for service, (count, seconds) in sorted(profile.calls.items())
+    )
+    parts.append(f"total;dur={wall_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def init_app(app):
+    """Install the Flask hooks (only when profiling is enabled)."""
+    if not ENABLED:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        g.profile_token = start_request()
+
+    @app.after_request
+    def _finish_profile(response):
+        token = g.pop("profile_token", None)
+        if token is not None:
+            size = None if response.is_streamed else response.calculate_content_length()
+            profile, wall_seconds = finish_request(
+                token, request.method, request.endpoint, request.path, response.status_code, size
+            )
+            response.headers["Server-Timing"] = server_timing(profile, wall_seconds)
+        return response
+
+    @app.teardown_request
+    def _drop_profile(exc):
+        # after_request is skipped when a view raises; don't leak the profile into the next request
+        token = g.pop("profile_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,337 @@
+from cache import catalogue_cache
+from pagination import parse_limit, decode_cursor, seek_predicate
+from search import build_search_filter, build_relevance_score
+
+# =================== SHARED QUERIES =================== #
+#
+# SQL used by the routes, as constants and builders. app.py, asgi.py and the
+# EXPLAIN check in migrations.py all import it from here, so the checked
+# queries are the served ones. Importing this module has no side effects
+# (no Firebase, no job workers, no database connection).
+
+
+def in_list(count):
+    """Placeholders for an IN (...) list of `count` values."""
+    return ', '.join(['%s'] * count)
+
+
+# =================== USERS =================== #
+
+PROFILE_QUERY = "SELECT id, name, profile_picture, phone, updated_at FROM users WHERE email = %s"
+
+
+# =================== PRODUCTS =================== #
+
+def build_products_query(args):
+    """Turns /get-products query args into the SQL to run plus what's needed to shape the rows.
+
+    Shared by the Flask route and the async route in asgi.py. Raises
+    InvalidCursorError for a bad cursor.
+    """
+    search = args.get('search', '')
+    category = args.get('category', '')
+    condition = args.get('condition', '')
+    # Searches rank by relevance unless the client asks for a specific order
+    sort_order = args.get('sort', 'relevance' if search else 'newest')
+
+    # Pagination is opt-in: send `limit` and/or `cursor` to get pages
+    # back as {"products": [...], "next_cursor": ...}
+    cursor_token = args.get('cursor')
+    paginate = cursor_token is not None or 'limit' in args
+    limit = parse_limit(args.get('limit')) if paginate else None
+
+    # Pick the sort key; every order ends on p.id so pages are stable
+    relevance = build_relevance_score(search) if search and sort_order == 'relevance' else None
+    if relevance:
+        sort_sql, sort_params = relevance
+        direction = "DESC"
+    elif sort_order == 'low-to-high':
+        sort_sql, sort_params, direction = "p.price", [], "ASC"
+    elif sort_order == 'high-to-low':
+        sort_sql, sort_params, direction = "p.price", [], "DESC"
+    else:  # newest (also relevance without usable search terms)
+        sort_sql, sort_params, direction = "p.created_at", [], "DESC"
+
+    query = f"""
+        SELECT p.id, p.user_id, p.name, p.description, p.category, p.state, p.price, p.stock, p.image_url,
+               p.card_url, p.thumbnail_url, {sort_sql} AS sort_key
+        FROM products p 
+        WHERE p.stock > 0
+    """
+    params = list(sort_params)
+
+    # Add search condition (full-text index, see search.py)
+    if search:
+        search_sql, search_params = build_search_filter(search)
+        query += f" AND {search_sql}"
+        params.extend(search_params)
+
+    # Add category filter
+    if category and category != 'All':
+        query += " AND p.category = %s"
+        params.append(category)
+
+    # Add condition filter
+    if condition:
+        query += " AND p.state = %s"
+        params.append(condition)
+
+    # Continue after the last row of the previous page
+    if cursor_token:
+        last_key, last_id = decode_cursor(cursor_token, sort_order)
+        query += f" AND {seek_predicate(sort_sql, direction)}"
+        params.extend(sort_params + [last_key] + sort_params + [last_key, last_id])
+
+    # Add sorting
+    query += f" ORDER BY {sort_sql} {direction}, p.id {direction}"
+    params.extend(sort_params)
+
+    if paginate:
+        # Fetch one extra row to know whether another page exists
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    # Browsing (filter/sort/page without a search term) is served from the
+    # catalogue cache; free-text searches are too varied to be worth caching
+    cache_key = None
+    if not search:
+        cache_key = catalogue_cache.listing_key({
+            'category': category, 'condition': condition, 'sort': sort_order,
+            'limit': limit, 'cursor': cursor_token,
+        })
+
+    return {
+        "query": query,
+        "params": params,
+        "sort": sort_order,
+        "paginate": paginate,
+        "limit": limit,
+        "cache_key": cache_key,
+    }
+
+
+PRODUCT_DETAIL_SELECT = """
+    SELECT p.id, p.user_id, p.name, p.description, p.category, p.state, 
+           p.price, p.stock, p.image_url as main_image, p.thumbnail_url, p.created_at, p.updated_at,
+           GROUP_CONCAT(pi.image_url) as additional_images
+    FROM products p
+    LEFT JOIN product_images pi ON p.id = pi.product_id
+"""
+PRODUCT_DETAIL_QUERY = PRODUCT_DETAIL_SELECT + """
+    WHERE p.id = %s
+    GROUP BY p.id
+"""
+
+SELLER_SELECT = """
+    SELECT id, name, email, profile_picture as profilePic, phone as phoneNumber, updated_at
+    FROM users
+"""
+SELLER_QUERY = SELLER_SELECT + """
+    WHERE id = %s
+"""
+
+
+def batch_query(select, column, count, suffix=""):
+    """`select` restricted to `column IN (...)` with `count` placeholders (plus e.g. GROUP BY)."""
+    return f"{select} WHERE {column} IN ({in_list(count)}) {suffix}"
+
+
+def format_product_detail(product):
+    if not product:
+        return None
+
+    # Process the additional images
+    all_images = [product['main_image']]  # Start with main image
+    if product['additional_images']:
+        additional_images = product['additional_images'].split(',')
+        all_images.extend(additional_images)
+
+    # Format the product data
+    formatted_product = {
+        **product,
+        'images': all_images  # Add all images array
+    }
+    del formatted_product['additional_images']  # Remove the concatenated string
+    return formatted_product
+
+
+# =================== CART & WISHLIST =================== #
+
+CART_QUERY = """
+    SELECT c.id as cart_id, c.quantity, 
+           p.id as product_id, p.name, p.description, p.price, p.image_url, p.thumbnail_url,
+           u.name as seller_name
+    FROM cart c
+    JOIN products p ON c.product_id = p.id
+    JOIN users u ON p.user_id = u.id
+    WHERE c.user_id = %s
+"""
+
+# Checkout locks the cart rows (and their products) so the total can't change
+# underneath it; product order keeps lock order consistent with cart updates
+CHECKOUT_CART_QUERY = """
+    SELECT c.product_id, c.quantity, p.price, p.name, p.stock
+    FROM cart c
+    JOIN products p ON c.product_id = p.id
+    WHERE c.user_id = %s
+    ORDER BY c.product_id
+    FOR UPDATE
+"""
+
+# Batch cart update: one row per (user_id, product_id, quantity)
+CART_SET_QUANTITY_QUERY = """
+    INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)
+"""
+
+
+CART_REMOVE_QUERY = "DELETE FROM cart WHERE user_id = %s AND product_id = %s"
+
+
+def cart_removal_query(user_id, product_ids):
+    """(sql, params) deleting some of a user's cart rows."""
+    sql = f"DELETE FROM cart WHERE user_id = %s AND product_id IN ({in_list(len(product_ids))})"
+    return sql, [user_id] + list(product_ids)
+
+
+WISHLIST_QUERY = """
+    SELECT p.id, p.name, p.description, p.price, p.state, p.category,
+           p.image_url, p.card_url, p.thumbnail_url, p.user_id
+    FROM wishlist w
+    JOIN products p ON p.id = w.product_id
+    WHERE w.users_id = %s
+    ORDER BY w.id
+"""
+
+WISHLIST_REMOVE_QUERY = "DELETE FROM wishlist WHERE users_id = %s AND product_id = %s"
+
+# Tells both whether the product exists and whether it's wishlisted
+WISHLIST_PRODUCT_STATUS_QUERY = """
+    SELECT p.id, w.id AS wishlist_id
+    FROM products p
+    LEFT JOIN wishlist w ON w.product_id = p.id AND w.users_id = %s
+    WHERE p.id = %s
+"""
+
+
+def wishlist_status_query(user_id, product_ids):
+    """(sql, params) selecting which of product_ids are in the user's wishlist."""
+    sql = f"SELECT product_id FROM wishlist WHERE users_id = %s AND product_id IN ({in_list(len(product_ids))})"
+    return sql, [user_id] + list(product_ids)
+
+
+# =================== ORDERS =================== #
+
+# One row per order item, ordered so each order's rows are contiguous
+USER_ORDER_ROWS_QUERY = """
+    SELECT 
+        o.id, o.total_amount, o.status, o.created_at,
+        da.full_name, da.phone, da.address, da.city, da.state, da.pincode,
+        oi.product_id, oi.quantity, oi.price, p.name, p.image_url
+    FROM orders o
+    LEFT JOIN delivery_addresses da ON o.id = da.order_id
+    LEFT JOIN order_items oi ON o.id = oi.order_id
+    LEFT JOIN products p ON oi.product_id = p.id
+    WHERE o.user_id = %s
+    ORDER BY o.created_at DESC, o.id DESC, oi.id
+"""
+
+
+def iter_orders(rows):
+    """Assemble order objects from flat order/item rows, yielding each one once complete.
+
+    Rows must arrive grouped by order id (one row per item, or a single row
+    with NULL item columns for an order without items).
+    """
+    current = None
+    for row in rows:
+        if current is None or current['id'] != row['id']:
+            if current is not None:
+                yield current
+            current = {
+                'id': row['id'],
+                'total_amount': row['total_amount'],
+                'status': row['status'],
+                'created_at': row['created_at'],
+                'delivery_address': {
+                    'full_name': row['full_name'],
+                    'phone': row['phone'],
+                    'address': row['address'],
+                    'city': row['city'],
+                    'state': row['state'],
+                    'pincode': row['pincode']
+                },
+                'items': []
+            }
+
+        # Skip the NULL row of an order without items and items whose product is gone
+        if row['product_id'] is not None and row['name'] is not None:
+            current['items'].append({
+                'id': row['product_id'],
+                'quantity': row['quantity'],
+                'price': row['price'],
+                'name': row['name'],
+                'image_url': row['image_url']
+            })
+    if current is not None:
+        yield current
+
+
+def group_order_rows(rows):
+    """All orders from flat order/item rows (see iter_orders)."""
+    return list(iter_orders(rows))
+
+
+def build_user_orders_query(user_id, cursor_token=None, limit=None):
+    """(sql, params) for /api/orders/user/<id>, newest first.
+
+    With a limit, one extra row is fetched to tell whether another page
+    exists. Raises InvalidCursorError for a bad cursor.
+    """
+    query = """
+        SELECT o.id, o.total_amount, o.status, o.created_at
+        FROM orders o
+        WHERE o.user_id = %s
+    """
+    params = [user_id]
+    if cursor_token:
+        last_created_at, last_id = decode_cursor(cursor_token, 'orders')
+        query += f" AND {seek_predicate('o.created_at', 'DESC', 'o.id')}"
+        params.extend([last_created_at, last_created_at, last_id])
+    query += " ORDER BY o.created_at DESC, o.id DESC"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit + 1)
+    return query, params
+
+
+ORDER_ADDRESSES_SELECT = """
+    SELECT order_id, full_name, phone, address, city, state, pincode, hostel_room
+    FROM delivery_addresses
+"""
+
+ORDER_ITEMS_SELECT = """
+    SELECT oi.order_id, oi.product_id, oi.quantity, oi.price, p.name, p.image_url
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.id
+"""
+
+
+def load_order_details(cursor, order_ids):
+    """Fetch delivery addresses and items for many orders with one query each.
+
+    Returns (addresses, items): dicts keyed by order id.
+    """
+    addresses, items = {}, {}
+    if not order_ids:
+        return addresses, items
+
+    cursor.execute(batch_query(ORDER_ADDRESSES_SELECT, "order_id", len(order_ids)), tuple(order_ids))
+    for row in cursor.fetchall():
+        addresses.setdefault(row['order_id'], row)
+
+    cursor.execute(batch_query(ORDER_ITEMS_SELECT, "oi.order_id", len(order_ids)), tuple(order_ids))
+    for row in cursor.fetchall():
+        items.setdefault(row['order_id'], []).append(row)
+
+    return addresses, items
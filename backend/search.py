@@ -0,0 +1,70 @@
+import os
+import re
+
+# =================== PRODUCT SEARCH =================== #
+#
+# Search runs on MySQL FULLTEXT indexes over products.name and
+# products.description, so lookups go through the index instead of scanning
+# every row the way `LIKE '%term%'` does. The index is maintained by InnoDB on
+# every INSERT/UPDATE/DELETE, so uploads and edits are searchable as soon as
+# they commit.
+#
+# The indexes (ft_products_name, ft_products_name_description) are created by
+# migration 3, and the name prefix index by migration 11; run
+# `python migrations.py migrate` before serving. Nothing here issues DDL.
+
+# InnoDB skips tokens shorter than innodb_ft_min_token_size (3 by default)
+FT_MIN_TOKEN_SIZE = int(os.getenv("FT_MIN_TOKEN_SIZE", "3"))
+MAX_SEARCH_TERMS = 8
+
+# Name matches count for more than description matches when ranking
+NAME_WEIGHT = 2
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Split search text into unique lowercase word tokens (punctuation and operators are dropped)."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token not in tokens:
+            tokens.append(token)
+    return tokens[:MAX_SEARCH_TERMS]
+
+
+def _indexable_terms(search):
+    return [t for t in tokenize(search) if len(t) >= FT_MIN_TOKEN_SIZE]
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_filter(search):
+    """Return (sql, params) for a WHERE clause matching products against the search text.
+
+    Every term must match and each term is treated as a prefix, so results
+    narrow as the user types ("lapt" finds "laptop").
+    """
+    terms = _indexable_terms(search)
+
+    if not terms:
+        # Too short for the full-text index; a prefix match can use idx_products_name
+        return "p.name LIKE %s", [f"{_escape_like(search.strip())}%"]
+
+    boolean_query = " ".join(f"+{t}*" for t in terms)
+    return "MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE)", [boolean_query]
+
+
+def build_relevance_score(search):
+    """Return (sql, params) for a relevance score expression (higher is better), or None."""
+    terms = _indexable_terms(search)
+    if not terms:
+        return None
+
+    ranking_query = " ".join(f"{t}*" for t in terms)
+    sql = (
+        f"({NAME_WEIGHT} * MATCH(p.name) AGAINST (%s IN BOOLEAN MODE)"
+        " + MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE))"
+    )
+    return sql, [ranking_query, ranking_query]
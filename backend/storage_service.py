@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+
+import profiling
+
+# =================== GOOGLE CLOUD STORAGE SERVICE =================== #
+#
+# One storage.Client and bucket handle per process, created on first use.
+# Building a Client re-reads credentials and opens a new HTTP session, so
+# doing it per call paid for a cold TLS connection on every image operation.
+# The shared client's HTTP session keeps a connection pool large enough for
+# the request threads plus the upload workers.
+#
+# Set STORAGE_EMULATOR_HOST to point the client at a local fake GCS server.
+
+BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "unisale-storage")
+HTTP_POOL_SIZE = int(os.getenv("GCS_HTTP_POOL_SIZE", "16"))
+
+# The JSON API accepts at most 100 calls per batch request
+MAX_BATCH_SIZE = 100
+
+
+class StorageService:
+    """Thread-safe, lazily initialised wrapper around a GCS bucket."""
+
+    def __init__(self, bucket_name=BUCKET_NAME, pool_size=HTTP_POOL_SIZE):
+        self.bucket_name = bucket_name
+        self.pool_size = pool_size
+        self._client = None
+        self._bucket = None
+        self._init_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    client = storage.Client()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    client._http.mount("https://", adapter)
+                    client._http.mount("http://", adapter)
+                    self._bucket = client.bucket(self.bucket_name)
+                    self._client = client
+        return self._client
+
+    @property
+    def bucket(self):
+        self.client
+        return self._bucket
+
+    @contextmanager
+    def _timed(self, operation):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            profiling.record_call("gcs", elapsed)
+            with self._stats_lock:
+                op = self._stats.setdefault(operation, {
+                    "count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0
+                })
+                op["count"] += 1
+                op["errors"] += failed
+                op["total_seconds"] += elapsed
+                op["max_seconds"] = max(op["max_seconds"], elapsed)
+
+    def blob_name_from_url(self, public_url):
+        return public_url.split(f"{self.bucket_name}/", 1)[1]
+
+    def upload(self, file_obj, blob_name, content_type=None, public=True):
+        """Stream file_obj to blob_name (a public object unless public=False) and return its public URL."""
+        with self._timed("upload"):
+            blob = self.bucket.blob(blob_name)
+            blob.upload_from_file(
+                file_obj,
+                rewind=True,
+                content_type=content_type,
+                predefined_acl="publicRead" if public else None
+            )
+            return blob.public_url
+
+    def download(self, blob_name):
+        with self._timed("download"):
+            return self.bucket.blob(blob_name).download_as_bytes()
+
+    def delete(self, blob_name):
+        with self._timed("delete"):
+            self.bucket.blob(blob_name).delete()
+
+    def delete_many(self, blob_names):
+        """Delete blobs with batched requests (up to 100 deletes per HTTP call)."""
+        blob_names = list(blob_names)
+        with self._timed("batch_delete"):
+            for i in range(0, len(blob_names), MAX_BATCH_SIZE):
+                with self.client.batch():
+                    for name in blob_names[i:i + MAX_BATCH_SIZE]:
+                        self.bucket.delete_blob(name)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {}
+            for operation, op in self._stats.items():
+                stats[operation] = dict(op)
+                stats[operation]["avg_seconds"] = op["total_seconds"] / op["count"] if op["count"] else 0.0
+        return stats
+
+
+storage_service = StorageService()
@@ -0,0 +1,69 @@
+import os
+
+from flask import current_app
+
+from db import streaming_connection
+
+# =================== NDJSON EXPORTS =================== #
+#
+# Admin tooling and the analytics sync pull whole tables through the listing
+# routes. With `?format=ndjson` (or `Accept: application/x-ndjson`) those
+# routes stream one JSON object per line instead of building one big array:
+#
+#     return ndjson_response(query, params, to_records)
+#
+# Rows are read with an unbuffered cursor, EXPORT_BATCH_SIZE at a time, and
+# written out as they are shaped, so memory stays flat however large the
+# table is. The connection is held for the length of the download. If the
+# query fails part way, the stream ends with an {"error": ...} line, since the
+# 200 status has already been sent.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def wants_ndjson(args, accept=""):
+    return args.get('format') == 'ndjson' or NDJSON_MIMETYPE in accept
+
+
+def stream_rows(cursor):
+    """Yield rows from an executed cursor, fetching EXPORT_BATCH_SIZE at a time."""
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def ndjson_response(query, params, to_records=None):
+    """Streaming response with one line per record.
+
+    to_records turns the row iterator into records (defaults to the rows
+    themselves); it must consume rows lazily to keep memory flat.
+    """
+    # The generator runs after the request context is gone
+    json = current_app.json
+
+    def generate():
+        lines = []
+        try:
+            with streaming_connection() as conn:
+                cursor = conn.cursor(dictionary=True, buffered=False)
+                cursor.execute(query, params)
+                rows = stream_rows(cursor)
+                for record in (to_records(rows) if to_records else rows):
+                    lines.append(json.dumps(record))
+                    if len(lines) >= EXPORT_BATCH_SIZE:
+                        yield "\n".join(lines) + "\n"
+                        lines = []
+                cursor.close()
+        except Exception as e:
+            print(f"Error streaming export: {e}")
+            lines.append(json.dumps({"error": str(e)}))
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    response = current_app.response_class(generate(), mimetype=NDJSON_MIMETYPE)
+    # Tell buffering proxies (nginx) to pass chunks through as they come
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The backend is a flat set of modules run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests that need MySQL run only when DB_NAME points at a scratch database
+# with migrations applied (python migrations.py migrate), e.g.
+#
+#     DB_NAME=unisale_check python -m pytest tests
+requires_db = pytest.mark.skipif(
+    not os.getenv("DB_NAME"), reason="set DB_* env vars to a scratch MySQL database"
+)
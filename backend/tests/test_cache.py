@@ -0,0 +1,35 @@
+from cache import CatalogueCache, LocalCache
+
+
+def test_hit_after_load():
+    cache = CatalogueCache(LocalCache())
+    calls = []
+    assert cache.get_or_load("product:1", lambda: calls.append(1) or {"id": 1}) == {"id": 1}
+    assert cache.get_or_load("product:1", lambda: calls.append(1) or {"id": 1}) == {"id": 1}
+    assert calls == [1]
+
+
+def test_loader_finishing_after_invalidate_does_not_store_stale_row():
+    cache = CatalogueCache(LocalCache())
+
+    def stale_loader():
+        # The row was read, then the product was updated before we store it
+        cache.invalidate_product(1)
+        return {"id": 1, "price": 100}
+
+    assert cache.get_or_load("product:1", stale_loader) == {"id": 1, "price": 100}
+    assert cache.get_or_load("product:1", lambda: {"id": 1, "price": 80}) == {"id": 1, "price": 80}
+    assert cache.get_or_load("product:1", lambda: None) == {"id": 1, "price": 80}
+
+
+def test_get_many_skips_stale_rows_only():
+    cache = CatalogueCache(LocalCache())
+
+    def loader(keys):
+        cache.invalidate_seller(2)
+        return {key: {"key": key, "fresh": False} for key in keys}
+
+    cache.get_many_or_load(["seller:1", "seller:2"], loader)
+    reloaded = cache.get_many_or_load(["seller:1", "seller:2"], lambda keys: {key: {"fresh": True} for key in keys})
+    assert reloaded["seller:1"] == {"key": "seller:1", "fresh": False}
+    assert reloaded["seller:2"] == {"fresh": True}
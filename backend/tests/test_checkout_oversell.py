@@ -0,0 +1,136 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import requires_db
+
+BUYERS = 40
+STOCK = 5
+ADDRESS = {"fullName": "Buyer", "phone": "9999999999", "address": "Bidholi Campus",
+           "city": "Dehradun", "state": "Uttarakhand", "pincode": "248007"}
+
+
+@pytest.fixture
+def market():
+    """A product with STOCK units and BUYERS buyers; everything is deleted afterwards."""
+    from db import db_connection
+
+    tag = uuid.uuid4().hex[:10]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO users (name, email, verified) VALUES (%s, %s, 1)", [
+            (f"Oversell {i}", f"oversell-{tag}-{i}@stu.upes.ac.in") for i in range(BUYERS + 1)
+        ])
+        cursor.execute("SELECT id FROM users WHERE email LIKE %s ORDER BY id", (f"oversell-{tag}-%",))
+        user_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            INSERT INTO products (user_id, name, description, category, state, price, image_url, stock)
+            VALUES (%s, %s, 'Oversell check', 'Books', 'Used', 500, %s, %s)
+        """, (user_ids[0], f"oversell-{tag}", f"https://example.com/oversell-{tag}.jpg", STOCK))
+        product_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+
+    yield {"product_id": product_id, "buyers": user_ids[1:]}
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        users = ", ".join(["%s"] * len(user_ids))
+        cursor.execute("DELETE FROM order_items WHERE product_id = %s", (product_id,))
+        for table, column in (("delivery_addresses", "user_id"), ("orders", "user_id"), ("cart", "user_id"),
+                              ("cart_reservations", "user_id"), ("products", "user_id"), ("users", "id")):
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({users})", user_ids)
+        conn.commit()
+        cursor.close()
+
+
+def sold_and_stock(product_id):
+    from db import db_connection
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id = %s", (product_id,))
+        sold = int(cursor.fetchone()[0])
+        cursor.execute("SELECT stock FROM products WHERE id = %s", (product_id,))
+        stock = cursor.fetchone()[0]
+        cursor.close()
+    return sold, stock
+
+
+def in_parallel(fn, args):
+    with ThreadPoolExecutor(max_workers=len(args)) as executor:
+        return list(executor.map(fn, args))
+
+
+@requires_db
+def test_concurrent_checkouts_never_oversell(market):
+    """Every buyer already has the product in the cart (no reservations) and all check out at once."""
+    from app import app
+    from db import db_connection
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, 1)",
+                           [(buyer, market["product_id"]) for buyer in market["buyers"]])
+        conn.commit()
+        cursor.close()
+
+    statuses = in_parallel(
+        lambda buyer: app.test_client().post("/api/checkout", json={"userId": buyer, **ADDRESS}).status_code,
+        market["buyers"]
+    )
+
+    assert statuses.count(200) == STOCK
+    assert statuses.count(409) == BUYERS - STOCK
+    assert sold_and_stock(market["product_id"]) == (STOCK, 0)
+
+
+@requires_db
+def test_concurrent_add_and_checkout_never_oversell(market):
+    """Buyers race to add the product and check out; reservations admit at most STOCK of them."""
+    from app import app
+
+    def buy(buyer):
+        client = app.test_client()
+        added = client.post("/api/cart/add", json={"userId": buyer, "productId": market["product_id"]})
+        if added.status_code != 200:
+            return "not added", added.status_code
+        return "checkout", client.post("/api/checkout", json={"userId": buyer, **ADDRESS}).status_code
+
+    results = in_parallel(buy, market["buyers"])
+
+    assert results.count(("checkout", 200)) == STOCK
+    assert results.count(("not added", 409)) == BUYERS - STOCK
+    assert sold_and_stock(market["product_id"]) == (STOCK, 0)
+
+
+@requires_db
+def test_adding_more_than_stock_keeps_the_cart_and_says_why(market):
+    from app import app
+    from db import db_connection
+
+    client = app.test_client()
+    buyer = market["buyers"][0]
+    add = {"userId": buyer, "productId": market["product_id"], "quantity": STOCK}
+    assert client.post("/api/cart/add", json=add).status_code == 200
+
+    response = client.post("/api/cart/add", json={**add, "quantity": 1})
+    assert response.status_code == 409
+    assert response.get_json()["available"] == STOCK
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT quantity FROM cart WHERE user_id = %s AND product_id = %s",
+                       (buyer, market["product_id"]))
+        assert cursor.fetchone()[0] == STOCK
+        cursor.close()
+
+
+@pytest.mark.parametrize("quantity", [0, -3, "two"])
+def test_add_to_cart_rejects_bad_quantities(quantity):
+    """Checked before any database work: a negative quantity would become a negative reservation."""
+    from app import app
+
+    response = app.test_client().post("/api/cart/add", json={"userId": 1, "productId": 1, "quantity": quantity})
+    assert response.status_code == 400
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, jsonify, request
+from werkzeug.http import http_date
+
+from conditional import (PRODUCT_CACHE_CONTROL, body_etag, conditional_response, is_not_modified,
+                         last_modified, version_etag)
+
+UPDATED_AT = datetime(2024, 1, 2, 3, 4, 5, 678901)
+ETAG = version_etag(7, UPDATED_AT)
+
+app = Flask(__name__)
+
+
+def respond(headers=None, method="GET", status=200, etag=ETAG, modified=None):
+    with app.test_request_context("/product/7", method=method, headers=headers or {}):
+        response = jsonify({"id": 7, "name": "Desk lamp"})
+        response.status_code = status
+        return conditional_response(request, response, PRODUCT_CACHE_CONTROL, etag=etag, modified=modified)
+
+
+def test_if_none_match_matches_strong_and_weak_etags():
+    assert is_not_modified({"If-None-Match": f'"{ETAG}"'}, ETAG)
+    assert is_not_modified({"If-None-Match": f'W/"{ETAG}"'}, ETAG)
+    assert is_not_modified({"If-None-Match": f'"stale", W/"{ETAG}"'}, ETAG)
+    assert is_not_modified({"If-None-Match": "*"}, ETAG)
+    assert not is_not_modified({"If-None-Match": '"stale"'}, ETAG)
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    modified = last_modified(UPDATED_AT)
+    headers = {"If-None-Match": '"stale"', "If-Modified-Since": http_date(modified)}
+    assert not is_not_modified(headers, ETAG, modified)
+
+
+def test_last_modified_drops_microseconds_and_labels_utc():
+    modified = last_modified(UPDATED_AT, None, UPDATED_AT - timedelta(days=1))
+    assert modified == datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert last_modified(None) is None
+
+
+def test_if_modified_since_compares_at_second_precision():
+    modified = last_modified(UPDATED_AT)
+    # HTTP dates carry whole seconds; the truncated value round-trips
+    assert is_not_modified({"If-Modified-Since": http_date(modified)}, ETAG, modified)
+    assert not is_not_modified({"If-Modified-Since": http_date(modified - timedelta(seconds=1))}, ETAG, modified)
+    assert not is_not_modified({"If-Modified-Since": "not a date"}, ETAG, modified)
+    assert not is_not_modified({"If-Modified-Since": http_date(modified)}, ETAG, None)
+
+
+def test_fresh_request_gets_body_and_validators():
+    modified = last_modified(UPDATED_AT)
+    response = respond(modified=modified)
+    assert response.status_code == 200
+    assert response.get_json() == {"id": 7, "name": "Desk lamp"}
+    assert response.headers["ETag"] == f'W/"{ETAG}"'
+    assert response.headers["Cache-Control"] == PRODUCT_CACHE_CONTROL
+    assert response.headers["Last-Modified"] == "Tue, 02 Jan 2024 03:04:05 GMT"
+
+
+def test_revalidation_gets_empty_304_with_validators():
+    modified = last_modified(UPDATED_AT)
+    response = respond({"If-None-Match": f'W/"{ETAG}"'}, modified=modified)
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert "Content-Type" not in response.headers
+    assert "Content-Length" not in response.headers
+    assert response.headers["ETag"] == f'W/"{ETAG}"'
+    assert response.headers["Cache-Control"] == PRODUCT_CACHE_CONTROL
+    assert response.headers["Last-Modified"] == http_date(modified)
+
+
+def test_body_is_hashed_without_an_etag():
+    response = respond(etag=None)
+    etag = response.headers["ETag"]
+    assert etag == f'W/"{body_etag(respond(etag=None).get_data())}"'
+    assert respond({"If-None-Match": etag}, etag=None).status_code == 304
+
+
+def test_only_successful_reads_are_conditional():
+    headers = {"If-None-Match": f'"{ETAG}"'}
+    for response in (respond(headers, method="POST"), respond(headers, status=404)):
+        assert response.status_code != 304
+        assert "ETag" not in response.headers
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from db import ConnectionPool, PoolExhaustedError
+
+
+class FakeConnection:
+    def __init__(self, fail_rollback=False):
+        self.fail_rollback = fail_rollback
+        self.closed = False
+        self.unread_result = False
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise RuntimeError("connection lost")
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    created = 0
+
+    def _connect(self):
+        self.created += 1
+        return FakeConnection()
+
+
+def test_released_connection_is_reused():
+    pool = FakePool(size=1, timeout=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert pool.created == 1
+
+
+def test_exhausted_pool_times_out():
+    pool = FakePool(size=1, timeout=0.2)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.2
+    assert pool.stats()["exhausted"] == 1
+
+
+def test_release_wakes_waiter():
+    pool = FakePool(size=1, timeout=5)
+    conn = pool.acquire()
+    threading.Timer(0.1, pool.release, (conn,)).start()
+    assert pool.acquire() is conn
+
+
+def test_discard_wakes_waiter_to_open_a_new_connection():
+    pool = FakePool(size=1, timeout=5)
+    conn = pool.acquire()
+    conn.fail_rollback = True  # release() will have to discard it
+    result = {}
+
+    def waiter():
+        started = time.monotonic()
+        result["conn"] = pool.acquire()
+        result["waited"] = time.monotonic() - started
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    pool.release(conn)
+    thread.join(timeout=5)
+
+    assert conn.closed
+    assert result["conn"] is not conn
+    assert result["waited"] < 1
+    assert pool.stats()["open"] == 1
+    assert pool.created == 2
+
+
+def test_failed_connect_frees_the_slot():
+    class FlakyPool(ConnectionPool):
+        attempts = 0
+
+        def _connect(self):
+            self.attempts += 1
+            if self.attempts == 1:
+                raise RuntimeError("database down")
+            return FakeConnection()
+
+    pool = FlakyPool(size=1, timeout=1)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert pool.stats()["open"] == 0
+    assert pool.acquire() is not None
@@ -0,0 +1,34 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import images
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args):
+        raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    broken = BrokenPool()
+    monkeypatch.setattr(images, "_pool", broken)
+
+    with pytest.raises(BrokenProcessPool):
+        images.process_image(b"not an image")
+
+    assert broken.shut_down
+    assert images._pool is None
+
+
+def test_importing_app_starts_no_job_workers():
+    # Spawned image processes re-import the main module; they must not start workers
+    import app  # noqa: F401
+    import jobs
+    assert not jobs._workers
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import jobs
+
+
+def test_staged_files_are_downloaded_and_inline_files_kept(monkeypatch):
+    monkeypatch.setattr(jobs.storage_service, "download", lambda blob_name: f"bytes of {blob_name}".encode())
+
+    files = jobs._load_files([
+        {'filename': "a.jpg", 'mimetype': "image/jpeg", 'blob_name': "job-files/abc", 'data': None},
+        {'filename': "b.png", 'mimetype': "image/png", 'blob_name': None, 'data': b"inline"},
+    ])
+
+    assert [(f.filename, f.mimetype, f.read()) for f in files] == [
+        ("a.jpg", "image/jpeg", b"bytes of job-files/abc"),
+        ("b.png", "image/png", b"inline"),
+    ]
+
+
+def test_failed_enqueue_deletes_staged_files(monkeypatch):
+    staged, deleted = [], []
+    monkeypatch.setattr(jobs, "_stage_file", lambda file: staged.append(file) or f"job-files/{len(staged)}")
+    monkeypatch.setattr(jobs.storage_service, "delete_many", deleted.extend)
+
+    def no_database():
+        raise ConnectionError("database unavailable")
+    monkeypatch.setattr(jobs, "db_connection", no_database)
+
+    class Upload:
+        filename, mimetype = "a.jpg", "image/jpeg"
+
+    with pytest.raises(ConnectionError):
+        jobs.enqueue("upload_product", {}, files=[Upload(), Upload()])
+    assert deleted == ["job-files/1", "job-files/2"]
+
+
+def test_concurrent_staging_keeps_order_and_cleans_up_on_failure(monkeypatch):
+    deleted = []
+    monkeypatch.setattr(jobs.storage_service, "delete_many", deleted.extend)
+
+    def stage(file):
+        if file == "bad.jpg":
+            raise OSError("upload failed")
+        return f"job-files/{file}"
+    monkeypatch.setattr(jobs, "_stage_file", stage)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        assert jobs._stage_files(["a.jpg", "b.jpg"], executor) == ["job-files/a.jpg", "job-files/b.jpg"]
+        with pytest.raises(OSError):
+            jobs._stage_files(["a.jpg", "bad.jpg", "c.jpg"], executor)
+    assert sorted(deleted) == ["job-files/a.jpg", "job-files/c.jpg"]
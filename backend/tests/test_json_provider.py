@@ -0,0 +1,46 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from json_provider import (PROVIDERS, MsgspecJSONProvider, OrjsonJSONProvider, StdlibJSONProvider,
+                           install_json_provider)
+
+ROW = {"id": 7, "price": Decimal("1500.00"), "total": Decimal("12345678901234567.89"),
+       "created_at": datetime(2024, 1, 2, 3, 4, 5)}
+
+
+def test_msgspec_keeps_decimal_digits():
+    encoded = MsgspecJSONProvider(Flask(__name__)).dumps(ROW)
+    assert '"price":1500.00' in encoded
+    assert '"total":12345678901234567.89' in encoded
+    assert '"created_at":"2024-01-02T03:04:05"' in encoded
+
+
+def test_orjson_encodes_decimals_like_msgspec():
+    orjson = pytest.importorskip("orjson")
+    if not hasattr(orjson, "Fragment"):
+        pytest.skip("orjson without Fragment falls back to float")
+    app = Flask(__name__)
+    assert OrjsonJSONProvider(app).dumps(ROW) == MsgspecJSONProvider(app).dumps(ROW)
+
+
+def test_default_provider_keeps_the_api_types():
+    app = Flask(__name__)
+    assert json.loads(StdlibJSONProvider(app).dumps(ROW)) == json.loads(MsgspecJSONProvider(app).dumps(ROW))
+    assert StdlibJSONProvider(app).dumps({"day": date(2024, 1, 2)}) == '{"day": "2024-01-02"}'
+
+
+def test_missing_library_falls_back_to_the_default_provider(monkeypatch):
+    class Unavailable:
+        def __init__(self, app):
+            raise ImportError("No module named 'orjson'")
+    monkeypatch.setitem(PROVIDERS, "orjson", Unavailable)
+    assert isinstance(install_json_provider(Flask(__name__), "orjson"), StdlibJSONProvider)
+
+
+def test_unknown_provider_is_an_error():
+    with pytest.raises(ValueError, match="ujson"):
+        install_json_provider(Flask(__name__), "ujson")
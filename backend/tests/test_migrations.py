@@ -0,0 +1,67 @@
+from migrations import add_foreign_key, add_index, drop_column, if_column_exists
+
+
+class FakeCursor:
+    """Answers the information_schema lookups from a fixed schema and records DDL."""
+
+    def __init__(self, columns=(), indexes=(), foreign_keys=()):
+        self.columns = set(columns)
+        self.indexes = dict(indexes)
+        self.foreign_keys = set(foreign_keys)
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        if "information_schema.columns" in sql:
+            self._rows = [(1,)] if params in self.columns else []
+        elif "information_schema.statistics" in sql:
+            self._rows = [(name, column) for name, columns in self.indexes.items() for column in columns]
+        elif "information_schema.table_constraints" in sql:
+            self._rows = [(1,)] if params in self.foreign_keys else []
+        else:
+            self.executed.append(" ".join(sql.split()))
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_drop_column_only_when_present():
+    cursor = FakeCursor(columns=[("wishlist", "image_url")])
+    drop_column("wishlist", "image_url")(cursor)
+    assert cursor.executed == ["ALTER TABLE wishlist DROP COLUMN image_url"]
+
+    cursor = FakeCursor()
+    drop_column("wishlist", "image_url")(cursor)
+    assert cursor.executed == []
+
+
+def test_add_foreign_key_only_when_missing():
+    definition = "(product_id) REFERENCES products (id) ON DELETE CASCADE"
+    cursor = FakeCursor()
+    add_foreign_key("wishlist", "fk_wishlist_product", definition)(cursor)
+    assert cursor.executed == [
+        "ALTER TABLE wishlist ADD CONSTRAINT fk_wishlist_product FOREIGN KEY " + definition
+    ]
+
+    cursor = FakeCursor(foreign_keys=[("wishlist", "fk_wishlist_product")])
+    add_foreign_key("wishlist", "fk_wishlist_product", definition)(cursor)
+    assert cursor.executed == []
+
+
+def test_unique_key_is_added_once():
+    step = add_index("cart", "uq_cart_user_product", ["user_id", "product_id"], kind="UNIQUE")
+    cursor = FakeCursor(indexes={"idx_cart_user_product": ["user_id", "product_id"]})
+    step(cursor)
+    # A plain index on the same columns doesn't enforce uniqueness
+    assert cursor.executed == ["ALTER TABLE cart ADD UNIQUE INDEX uq_cart_user_product (user_id, product_id)"]
+
+    cursor = FakeCursor(indexes={"uq_cart_user_product": ["user_id", "product_id"]})
+    step(cursor)
+    assert cursor.executed == []
+
+
+def test_backfill_skipped_once_its_source_column_is_gone():
+    step = if_column_exists("wishlist", "image_url", "UPDATE wishlist SET product_id = 1")
+    cursor = FakeCursor()
+    step(cursor)
+    assert cursor.executed == []
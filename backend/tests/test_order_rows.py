@@ -0,0 +1,39 @@
+from datetime import datetime
+from decimal import Decimal
+
+from queries import group_order_rows
+
+
+def order_row(order_id, product_id=None, name=None, **item):
+    return {
+        'id': order_id, 'total_amount': Decimal("100.00"), 'status': 'pending',
+        'created_at': datetime(2024, 1, order_id), 'full_name': "Student", 'phone': "9999999999",
+        'address': "Block A", 'city': "Dehradun", 'state': "Uttarakhand", 'pincode': "248007",
+        'product_id': product_id, 'quantity': item.get('quantity'), 'price': item.get('price'),
+        'name': name, 'image_url': item.get('image_url'),
+    }
+
+
+def test_order_without_items_has_empty_item_list():
+    orders = group_order_rows([order_row(2), order_row(1, 7, "Desk lamp", quantity=1, price=Decimal("250.00"))])
+    assert [order['id'] for order in orders] == [2, 1]
+    assert orders[0]['items'] == []
+    assert orders[0]['delivery_address']['full_name'] == "Student"
+    assert [item['id'] for item in orders[1]['items']] == [7]
+
+
+def test_product_names_with_commas_stay_whole():
+    orders = group_order_rows([
+        order_row(1, 7, "Chair, wooden, with cushion", quantity=2, price=Decimal("800.00")),
+        order_row(1, 8, "Books: Maths, Physics", quantity=1, price=Decimal("300.00")),
+    ])
+    assert len(orders) == 1
+    assert [(item['id'], item['name'], item['quantity']) for item in orders[0]['items']] == [
+        (7, "Chair, wooden, with cushion", 2),
+        (8, "Books: Maths, Physics", 1),
+    ]
+
+
+def test_items_of_deleted_products_are_skipped():
+    orders = group_order_rows([order_row(1, 7, None, quantity=1, price=Decimal("250.00"))])
+    assert orders[0]['items'] == []
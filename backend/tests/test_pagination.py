@@ -0,0 +1,93 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, parse_limit, seek_predicate
+from queries import build_products_query
+
+
+@pytest.mark.parametrize("sort_key", [
+    datetime(2025, 3, 1, 12, 30, 45, 123456),
+    Decimal("1499.90"),
+    12.5,
+])
+def test_cursor_round_trips_sort_key_and_id(sort_key):
+    token = encode_cursor("newest", sort_key, 42)
+    key, row_id = decode_cursor(token, "newest")
+    assert key == sort_key
+    assert type(key) is type(sort_key)
+    assert row_id == 42
+
+
+def test_cursor_is_url_safe_without_padding():
+    token = encode_cursor("low-to-high", Decimal("10.00"), 7)
+    assert "=" not in token and "+" not in token and "/" not in token
+
+
+def test_cursor_for_another_sort_order_is_rejected():
+    token = encode_cursor("low-to-high", Decimal("10.00"), 7)
+    with pytest.raises(InvalidCursorError, match="different sort order"):
+        decode_cursor(token, "high-to-low")
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "", encode_cursor("newest", "text", 1)])
+def test_garbage_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token, "newest")
+
+
+def test_limit_is_clamped():
+    assert parse_limit(None) == 24
+    assert parse_limit("0") == 1
+    assert parse_limit("500") == 100
+    with pytest.raises(InvalidCursorError):
+        parse_limit("ten")
+
+
+def test_seek_predicate_direction():
+    assert seek_predicate("p.price", "ASC") == "(p.price > %s OR (p.price = %s AND p.id > %s))"
+    assert "p.created_at < %s" in seek_predicate("p.created_at", "DESC")
+
+
+def test_first_page_fetches_one_extra_row():
+    built = build_products_query({"sort": "low-to-high", "limit": "10"})
+    assert built["paginate"] and built["limit"] == 10
+    assert built["query"].rstrip().endswith("LIMIT %s")
+    assert built["params"] == [11]
+
+
+def test_unpaginated_listing_has_no_limit():
+    built = build_products_query({"sort": "newest"})
+    assert not built["paginate"]
+    assert "LIMIT" not in built["query"]
+    assert built["params"] == []
+
+
+def test_next_page_params_follow_placeholders():
+    token = encode_cursor("low-to-high", Decimal("250.00"), 9)
+    built = build_products_query({"category": "Furniture", "sort": "low-to-high", "limit": "5", "cursor": token})
+    assert built["params"] == ["Furniture", Decimal("250.00"), Decimal("250.00"), 9, 6]
+    assert built["query"].count("%s") == len(built["params"])
+
+
+def test_relevance_seek_params_repeat_the_match_terms():
+    match = "desk* lamp*"
+    token = encode_cursor("relevance", 3.75, 12)
+    built = build_products_query({"search": "desk lamp", "limit": "5", "cursor": token})
+    assert built["sort"] == "relevance"
+    assert built["params"] == [
+        match, match,                # SELECT ... AS sort_key
+        "+desk* +lamp*",             # search filter
+        match, match, 3.75,          # seek: score < last key
+        match, match, 3.75, 12,      # seek: score = last key AND id < last id
+        match, match,                # ORDER BY score
+        6,                           # LIMIT page + 1
+    ]
+    assert built["query"].count("%s") == len(built["params"])
+
+
+def test_relevance_cursor_is_rejected_for_price_sort():
+    token = encode_cursor("relevance", 3.75, 12)
+    with pytest.raises(InvalidCursorError):
+        build_products_query({"search": "desk lamp", "sort": "low-to-high", "cursor": token})
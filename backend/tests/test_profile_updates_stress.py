@@ -0,0 +1,56 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import requires_db
+
+PARALLEL_UPDATES = 100
+
+
+@requires_db
+def test_parallel_profile_updates():
+    """100 concurrent name/phone updates and profile reads through the connection pool."""
+    from app import app
+    from db import db_connection, pool
+
+    email = f"stress-{uuid.uuid4().hex[:12]}@stu.upes.ac.in"
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO users (name, email, verified) VALUES (%s, %s, 1)", ("Stress", email))
+        user_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+
+    def update(i):
+        client = app.test_client()
+        if i % 3 == 0:
+            return client.post("/update-name", json={"user_id": user_id, "name": f"Stress {i}"}).status_code
+        if i % 3 == 1:
+            return client.post("/update-phone-number", json={"user_id": user_id,
+                                                              "phone_number": f"9{i:09d}"}).status_code
+        return client.get(f"/get-profile?email={email}").status_code
+
+    exhausted_before = pool.stats()["exhausted"]
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=PARALLEL_UPDATES) as executor:
+            statuses = list(executor.map(update, range(PARALLEL_UPDATES)))
+        elapsed = time.perf_counter() - started
+        print(f"{PARALLEL_UPDATES} parallel profile requests in {elapsed:.3f}s, pool {pool.stats()}")
+
+        assert statuses.count(200) == PARALLEL_UPDATES
+        assert pool.stats()["exhausted"] == exhausted_before
+
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT name, phone FROM users WHERE id = %s", (user_id,))
+            user = cursor.fetchone()
+            cursor.close()
+        assert user["name"] in {f"Stress {i}" for i in range(0, PARALLEL_UPDATES, 3)}
+        assert user["phone"] in {f"9{i:09d}" for i in range(1, PARALLEL_UPDATES, 3)}
+    finally:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+            conn.commit()
+            cursor.close()
@@ -0,0 +1,57 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+
+class SlowRowsCursor:
+    """Unbuffered-cursor stand-in: each row takes a while to arrive."""
+
+    def __iter__(self):
+        for row in range(3):
+            time.sleep(0.01)
+            yield row
+
+
+def test_cursor_iteration_is_timed():
+    token = profiling.start_request()
+    try:
+        rows = list(profiling._ProfiledCursor(SlowRowsCursor()))
+        profile = profiling._current.get()
+    finally:
+        profiling._current.reset(token)
+
+    assert rows == [0, 1, 2]
+    assert profile.sql_seconds >= 0.03
+    assert profile.sql_statements == 0
+
+
+def test_calls_from_pool_threads_count_with_a_copied_context():
+    token = profiling.start_request()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, profiling.record_call, "gcs", 0.5)
+                       for _ in range(8)]
+            for future in futures:
+                future.result()
+        profile = profiling._current.get()
+    finally:
+        profiling._current.reset(token)
+
+    assert profile.calls["gcs"] == [8, 4.0]
+
+
+def test_jobs_are_reported_with_method_job(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "metrics", profiling.Metrics())
+
+    token = profiling.start_job()
+    profiling.record_call("gcs", 0.25)
+    profiling.finish_job(token, "upload_product", "succeeded")
+
+    rendered = profiling.metrics.render()
+    assert 'unisale_http_requests_total{method="JOB",endpoint="upload_product",status="succeeded"} 1' in rendered
+    assert ('unisale_external_calls_total{method="JOB",endpoint="upload_product",service="gcs"} 1'
+            in rendered)
+    assert profiling._current.get() is None
@@ -0,0 +1,43 @@
+import pytest
+
+import idempotency
+import inventory
+
+
+class FakeConnection:
+    """Answers each DELETE with the next batch size and records commits."""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.log = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        self.rowcount = self.batches.pop(0)
+        self.log.append(("delete", params[0]))
+
+    def commit(self):
+        self.log.append(("commit",))
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("purge", [idempotency.purge_expired_keys, inventory.purge_expired_reservations])
+def test_purge_loops_until_a_short_batch(monkeypatch, purge):
+    monkeypatch.setattr(idempotency, "PURGE_BATCH_SIZE", 3)
+    monkeypatch.setattr(inventory, "PURGE_BATCH_SIZE", 3)
+    conn = FakeConnection([3, 3, 1])
+
+    assert purge(conn) == 7
+    assert conn.log == [("delete", 3), ("commit",)] * 3
+    assert conn.batches == []
+
+
+@pytest.mark.parametrize("purge", [idempotency.purge_expired_keys, inventory.purge_expired_reservations])
+def test_purge_with_nothing_expired_runs_once(purge):
+    conn = FakeConnection([0])
+    assert purge(conn) == 0
+    assert len(conn.log) == 2
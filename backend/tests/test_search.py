@@ -0,0 +1,27 @@
+from search import build_relevance_score, build_search_filter, tokenize
+
+
+def test_tokenize_drops_operators_and_duplicates():
+    assert tokenize('Laptop +laptop "charger"*') == ["laptop", "charger"]
+
+
+def test_terms_become_required_prefix_matches():
+    sql, params = build_search_filter("gaming lapt")
+    assert "MATCH(p.name, p.description)" in sql
+    assert params == ["+gaming* +lapt*"]
+
+
+def test_short_search_uses_name_prefix():
+    sql, params = build_search_filter("tv")
+    assert sql == "p.name LIKE %s"
+    assert params == ["tv%"]
+
+
+def test_short_search_escapes_like_wildcards():
+    assert build_search_filter("5%")[1] == ["5\\%%"]
+
+
+def test_no_relevance_score_without_indexable_terms():
+    assert build_relevance_score("tv") is None
+    sql, params = build_relevance_score("desk lamp")
+    assert params == ["desk* lamp*", "desk* lamp*"]
@@ -0,0 +1,52 @@
+import pytest
+from cachetools import TLRUCache
+
+import token_cache
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(token_cache, "_cache", TLRUCache(maxsize=10, ttu=token_cache._expires_at, timer=clock))
+    monkeypatch.setattr(token_cache, "CHECK_REVOKED", "never")
+    return clock
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    calls = []
+
+    def verify(token, check_revoked):
+        calls.append(token)
+        return {"uid": "user1", "exp": 1060}
+
+    monkeypatch.setattr(token_cache, "_verify_id_token", verify)
+    return calls
+
+
+def test_claims_are_cached_until_exp(clock, verifications):
+    assert token_cache.verify_token("token")["uid"] == "user1"
+    clock.now = 1059.9
+    token_cache.verify_token("token")
+    assert verifications == ["token"]
+
+
+def test_entry_expires_at_exp(clock, verifications):
+    token_cache.verify_token("token")
+    clock.now = 1060
+    token_cache.verify_token("token")
+    assert verifications == ["token", "token"]
+
+
+def test_tokens_are_cached_separately(clock, verifications):
+    token_cache.verify_token("token")
+    token_cache.verify_token("other")
+    assert verifications == ["token", "other"]
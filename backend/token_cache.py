@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+from cachetools import TLRUCache
+from firebase_admin import auth
+
+import profiling
+
+# =================== VERIFIED TOKEN CACHE =================== #
+#
+# Verifying a Firebase ID token means checking its signature (and now and
+# then fetching Google's public keys). A client sends the same token on every
+# request until it expires, so the decoded claims are cached, keyed by a hash
+# of the token, until the token's own `exp` claim.
+#
+# FIREBASE_CHECK_REVOKED controls revocation checks:
+#   never   (default) signature/expiry only; revoked sessions stay valid until exp
+#   cached  check revocation on verification and re-check at most every
+#           FIREBASE_REVOCATION_RECHECK seconds per token
+#   always  check revocation on every request (no caching)
+
+TOKEN_CACHE_SIZE = int(os.getenv("FIREBASE_TOKEN_CACHE_SIZE", "10000"))
+CHECK_REVOKED = os.getenv("FIREBASE_CHECK_REVOKED", "never").lower()
+REVOCATION_RECHECK = int(os.getenv("FIREBASE_REVOCATION_RECHECK", "300"))
+
+
+def _expires_at(key, entry, now):
+    return entry[0]
+
+
+_cache = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=_expires_at, timer=time.time)
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _token_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _cached_claims(key):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _stats["hits"] += 1
+            return entry[1]
+    return None
+
+
+def _verify_id_token(token, check_revoked):
+    started = time.perf_counter()
+    try:
+        return auth.verify_id_token(token, check_revoked=check_revoked)
+    finally:
+        profiling.record_call("firebase", time.perf_counter() - started)
+
+
+def verify_token(token):
+    """Return the decoded claims of a Firebase ID token, raising like auth.verify_id_token."""
+    if CHECK_REVOKED == "always":
+        return _verify_id_token(token, check_revoked=True)
+
+    key = _token_key(token)
+    decoded = _cached_claims(key)
+    if decoded is not None:
+        return decoded
+    with _lock:
+        _stats["misses"] += 1
+
+    check_revoked = CHECK_REVOKED == "cached"
+    decoded = _verify_id_token(token, check_revoked=check_revoked)
+
+    expires_at = decoded["exp"]
+    if check_revoked:
+        expires_at = min(expires_at, time.time() + REVOCATION_RECHECK)
+
+    with _lock:
+        _cache[key] = (expires_at, decoded)
+    return decoded
+
+
+async def verify_token_async(token):
+    """verify_token for async code: cache hits return inline, misses verify on a worker thread.
+
+    firebase_admin has no async API; verification may fetch Google's public
+    keys over HTTP, which must not block the event loop.
+    """
+    if CHECK_REVOKED != "always":
+        decoded = _cached_claims(_token_key(token))
+        if decoded is not None:
+            return decoded
+    return await asyncio.to_thread(verify_token, token)
+
+
+def stats():
+    with _lock:
+        return dict(_stats, size=len(_cache), mode=CHECK_REVOKED)
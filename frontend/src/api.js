@@ -39,4 +39,21 @@ export const profileAPI = {
   }
 };
 
+// Background job endpoints (uploads are processed asynchronously)
+export const jobAPI = {
+  getJob: (jobId) => api.get(`/api/jobs/${jobId}`),
+};
+
+// Poll a background job until it finishes; resolves with its result or throws its error
+export const waitForJob = async (jobId, { interval = 1000, timeout = 120000 } = {}) => {
+  const deadline = Date.now() + timeout;
+  while (Date.now() < deadline) {
+    const { data: job } = await jobAPI.getJob(jobId);
+    if (job.status === 'succeeded') return job.result;
+    if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+  throw new Error('Timed out waiting for upload to finish');
+};
+
 export default api;
\ No newline at end of file
@@ -106,7 +106,7 @@ const Cart = () => {
             {cartItems.map((item) => (
               <div key={item.product_id} className="flex items-center border rounded-lg p-4 hover:shadow-lg">
                 <img 
-                  src={item.image_url} 
+                  src={item.thumbnail_url || item.image_url} 
                   alt={item.name}
                   className="w-24 h-24 object-cover rounded"
                 />
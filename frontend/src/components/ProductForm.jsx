@@ -1,8 +1,9 @@
-import { useState } from "react";
+import { useState, useRef } from "react";
 import PropTypes from "prop-types";
 import axios from "axios";
 import DragDropUploader from "./DragDropUploader";
 import Toast from './Toast';
+import { waitForJob } from "../api";
 
 
 const DEPRECIATION_RATES = {
@@ -34,6 +35,8 @@ export default function ProductForm({ setShowForm, userId }) {
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [uploadProgress, setUploadProgress] = useState(0);
   const [toast, setToast] = useState({ show: false, message: '', type: 'success' });
+  // Reused if the upload fails in transit, so a retry can't create the product twice
+  const idempotencyKey = useRef(crypto.randomUUID());
 
   const handleChange = (e) => {
     const { name, value } = e.target;
@@ -124,7 +127,10 @@ export default function ProductForm({ setShowForm, userId }) {
           `http://127.0.0.1:5000/api/upload`, 
           formData, 
           {
-            headers: { "Content-Type": "multipart/form-data" },
+            headers: {
+              "Content-Type": "multipart/form-data",
+              "Idempotency-Key": idempotencyKey.current
+            },
             onUploadProgress: (progressEvent) => {
               const percentCompleted = Math.round(
                 (progressEvent.loaded * 100) / progressEvent.total
@@ -143,7 +149,10 @@ export default function ProductForm({ setShowForm, userId }) {
           `http://127.0.0.1:5000/api/upload-multiple`, 
           formData, 
           {
-            headers: { "Content-Type": "multipart/form-data" },
+            headers: {
+              "Content-Type": "multipart/form-data",
+              "Idempotency-Key": idempotencyKey.current
+            },
             onUploadProgress: (progressEvent) => {
               const percentCompleted = Math.round(
                 (progressEvent.loaded * 100) / progressEvent.total
@@ -155,6 +164,11 @@ export default function ProductForm({ setShowForm, userId }) {
       }
       
       console.log("Server response:", response.data);
+      idempotencyKey.current = crypto.randomUUID();
+
+      // The server processes images in the background; wait for the job to finish
+      const result = await waitForJob(response.data.job_id);
+      console.log("Upload job result:", result);
       
       setToast({
         show: true,
@@ -165,6 +179,8 @@ export default function ProductForm({ setShowForm, userId }) {
       setTimeout(() => setShowForm(false), 2000); // Close form after 2 seconds
     } catch (error) {
       console.error("Upload failed", error.response?.data || error);
+      // Keep the key only when the request never got an answer
+      if (error.response) idempotencyKey.current = crypto.randomUUID();
       setToast({
         show: true,
         message: `Failed to upload product: ${error.response?.data?.error || error.message}`,
@@ -1,18 +1,16 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import PropTypes from "prop-types";
 import { useNavigate } from "react-router-dom";
 import { toast } from "react-toastify";
 import InfiniteScroll from "react-infinite-scroll-component";
 import ZoomableImage from "./ZoomableImage";
 
-const ProductList = ({ products, userId, fetchProducts }) => {
+const ProductList = ({ products, userId, fetchProducts, hasMore, fetchMoreProducts }) => {
   const navigate = useNavigate();
   const [wishlistItems, setWishlistItems] = useState([]);
+  const checkedWishlistIds = useRef(new Set());
   const [editProduct, setEditProduct] = useState(null);
-  const [displayedProducts, setDisplayedProducts] = useState([]);
-  const [hasMore, setHasMore] = useState(true);
   const [editSuggestedPrice, setEditSuggestedPrice] = useState(null);
-  const ITEMS_PER_LOAD = 12;
 
   // Calculate Suggested Price
   const calculateSuggestedPrice = (originalPrice, months, category) => {
@@ -37,45 +35,41 @@ const ProductList = ({ products, userId, fetchProducts }) => {
     return Math.round(suggestedPrice);
   };
 
-  // Fetch user's wishlist
+  // Start over when the user changes
   useEffect(() => {
-    const fetchWishlist = async () => {
+    checkedWishlistIds.current = new Set();
+    setWishlistItems([]);
+  }, [userId]);
+
+  // Fetch wishlist state for the cards on screen, one request per batch of cards
+  useEffect(() => {
+    const productIds = products
+      .map((product) => product.id)
+      .filter((id) => !checkedWishlistIds.current.has(id));
+    if (!userId || productIds.length === 0) return;
+    productIds.forEach((id) => checkedWishlistIds.current.add(id));
+
+    const fetchWishlistStatus = async () => {
       try {
-        const res = await fetch(`http://127.0.0.1:5000/get-wishlist?user_id=${userId}`);
+        const res = await fetch(`http://127.0.0.1:5000/api/wishlist/check`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ userId, productIds }),
+        });
         const data = await res.json();
-        const wishlistImageUrls = data.map((item) => item.image_url);
-        setWishlistItems(wishlistImageUrls);
+        if (!res.ok) throw new Error(data.error || "Failed to fetch wishlist status");
+        setWishlistItems((prev) => [...new Set([...prev, ...data.wishlisted])]);
       } catch (err) {
         console.error("❌ Error fetching wishlist:", err);
       }
     };
-    if (userId) fetchWishlist();
-  }, [userId]);
-
-  // Update the useEffect to show new products when they change
-  useEffect(() => {
-    // Reset displayed products when the products array changes
-    setDisplayedProducts(products.slice(0, ITEMS_PER_LOAD));
-    setHasMore(products.length > ITEMS_PER_LOAD);
-  }, [products]);
-
-  // Update the fetchMoreData function to handle filtered data properly
-  const fetchMoreData = () => {
-    if (displayedProducts.length >= products.length) {
-      setHasMore(false);
-      return;
-    }
-    
-    // Display next batch of products
-    setTimeout(() => {
-      setDisplayedProducts(products.slice(0, displayedProducts.length + ITEMS_PER_LOAD));
-    }, 500);
-  };
+    fetchWishlistStatus();
+  }, [products, userId]);
 
   // Wishlist Toggle
-  const toggleWishlist = async (image_url) => {
-    if (!userId || !image_url) {
-      console.error("❌ Missing userId or image_url", { userId, image_url });
+  const toggleWishlist = async (product_id) => {
+    if (!userId || !product_id) {
+      console.error("❌ Missing userId or product_id", { userId, product_id });
       toast.error("Missing required data to update wishlist.");
       return;
     }
@@ -83,14 +77,14 @@ const ProductList = ({ products, userId, fetchProducts }) => {
       const response = await fetch(`http://127.0.0.1:5000/toggle-wishlist`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ users_id: userId, image_url }),
+        body: JSON.stringify({ users_id: userId, product_id }),
       });
       const data = await response.json();
       if (!response.ok) throw new Error(data.error || "Failed to toggle wishlist");
       setWishlistItems((prev) =>
-        prev.includes(image_url)
-          ? prev.filter((item) => item !== image_url)
-          : [...prev, image_url]
+        prev.includes(product_id)
+          ? prev.filter((item) => item !== product_id)
+          : [...prev, product_id]
       );
     } catch (error) {
       console.error("❌ Wishlist Toggle Error:", error);
@@ -144,9 +138,10 @@ const ProductList = ({ products, userId, fetchProducts }) => {
 
   return (
     <div className="max-w-7xl mx-auto">
+      {/* The server pages the list; scrolling to the end asks the parent for the next page */}
       <InfiniteScroll
-        dataLength={displayedProducts.length}
-        next={fetchMoreData}
+        dataLength={products.length}
+        next={fetchMoreProducts}
         hasMore={hasMore}
         loader={
           <div className="flex justify-center py-6">
@@ -158,13 +153,13 @@ const ProductList = ({ products, userId, fetchProducts }) => {
         }
       >
         <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
-          {displayedProducts.length === 0 ? (
+          {products.length === 0 ? (
             <div className="col-span-full text-center py-12">
               <p className="text-white/80 text-lg">No products available matching your criteria.</p>
             </div>
           ) : (
-            displayedProducts.map((product) => {
-              const inWishlist = wishlistItems.includes(product.image_url);
+            products.map((product) => {
+              const inWishlist = wishlistItems.includes(product.id);
               return (
                 <div
                   key={product.id}
@@ -177,7 +172,7 @@ const ProductList = ({ products, userId, fetchProducts }) => {
                     {/* Product Image with Hover Effect */}
                     <div className="relative overflow-hidden aspect-[4/3]">
                       <ZoomableImage 
-                        src={product.image_url}
+                        src={product.card_url || product.image_url}
                         alt={product.name}
                         aspectRatio="4/3"
                       />
@@ -204,7 +199,7 @@ const ProductList = ({ products, userId, fetchProducts }) => {
                   {/* Action Buttons */}
                   <div className="p-4 pt-0">
                     <button
-                      onClick={() => toggleWishlist(product.image_url)}
+                      onClick={() => toggleWishlist(product.id)}
                       className={`w-full py-2.5 px-4 rounded-lg mb-2 transition-all duration-300 flex items-center justify-center gap-2 ${
                         inWishlist 
                           ? "bg-red-500/20 text-red-300 hover:bg-red-500/30 border border-red-500/30" 
@@ -415,6 +410,8 @@ ProductList.propTypes = {
   products: PropTypes.array.isRequired,
   userId: PropTypes.string.isRequired,
   fetchProducts: PropTypes.func.isRequired,
+  hasMore: PropTypes.bool.isRequired,
+  fetchMoreProducts: PropTypes.func.isRequired,
 };
 
 export default ProductList;
\ No newline at end of file
@@ -138,7 +138,7 @@ const Cart = () => {
                   className="flex items-center bg-white/5 rounded-xl p-6 hover:bg-white/10 transition duration-300 border border-white/10"
                 >
                   <img 
-                    src={item.image_url} 
+                    src={item.thumbnail_url || item.image_url} 
                     alt={item.name}
                     className="w-32 h-32 object-cover rounded-lg shadow-lg"
                   />
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { getAuth } from 'firebase/auth';
 import { toast } from 'react-toastify';
@@ -8,6 +8,8 @@ import '../styles/SharedBackground.css';
 const Checkout = () => {
   const navigate = useNavigate();
   const auth = getAuth();
+  // Reused if the request fails in transit, so a retry can't place the order twice
+  const idempotencyKey = useRef(crypto.randomUUID());
   const [formData, setFormData] = useState({
     fullName: '',
     email: '',
@@ -123,10 +125,13 @@ const Checkout = () => {
         method: 'POST',
         headers: { 
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${idToken}`
+          'Authorization': `Bearer ${idToken}`,
+          'Idempotency-Key': idempotencyKey.current
         },
         body: JSON.stringify(orderData)
       });
+      // The server answered, so the next submit is a new attempt
+      idempotencyKey.current = crypto.randomUUID();
 
       // Add detailed error logging
       if (!response.ok) {
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from "react"; // Add useCallback
+import { useState, useEffect, useCallback, useRef } from "react"; // Add useCallback
 import { Link, useNavigate } from "react-router-dom";
 import { getAuth, signOut } from "firebase/auth";
 import defaultProfilePic from "../assets/person-circle.svg";
@@ -9,6 +9,9 @@ import WishlistCount from "../components/wishlistcount";
 import CartCount from "../components/CartCount";
 import "../styles/SharedBackground.css";
 
+// Products per page; further pages load with the cursor from the last response
+const PAGE_SIZE = 24;
+
 const Dashboard = () => {
   const auth = getAuth();
   const navigate = useNavigate();
@@ -16,10 +19,14 @@ const Dashboard = () => {
   const [menuOpen, setMenuOpen] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Bumped on every fresh fetch so a late "next page" for old filters is dropped
+  const listVersion = useRef(0);
   const [searchTerm, setSearchTerm] = useState("");
   const [selectedCategory, setSelectedCategory] = useState("All");
   const [selectedCondition, setSelectedCondition] = useState("");
-  const [sortOrder, setSortOrder] = useState("newest"); // "newest", "low-to-high", "high-to-low"
+  const [sortOrder, setSortOrder] = useState("newest"); // "relevance", "newest", "low-to-high", "high-to-low"
   const [searchTimeout, setSearchTimeout] = useState(null);
 
   // Function to fetch user profile from your backend
@@ -35,31 +42,52 @@ const Dashboard = () => {
     }
   };
 
+  // One page of products for the current filters, starting after `cursor` if given
+  const fetchProductPage = useCallback(async (cursor) => {
+    // Add query parameters for filtering
+    const params = new URLSearchParams();
+    if (searchTerm) params.append("search", searchTerm);
+    if (selectedCategory !== "All") params.append("category", selectedCategory);
+    if (selectedCondition) params.append("condition", selectedCondition);
+    params.append("sort", sortOrder);
+    params.append("limit", PAGE_SIZE);
+    if (cursor) params.append("cursor", cursor);
+
+    const response = await fetch(`http://127.0.0.1:5000/get-products?${params.toString()}`);
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || "Failed to fetch products");
+    return data;
+  }, [searchTerm, selectedCategory, selectedCondition, sortOrder]);
+
   // Memoize fetchProducts with useCallback to avoid recreation on each render
   const fetchProducts = useCallback(async () => {
+    const version = ++listVersion.current;
     try {
-      let url = `http://127.0.0.1:5000/get-products`;
-
-      // Add query parameters for filtering
-      const params = new URLSearchParams();
-      if (searchTerm) params.append("search", searchTerm);
-      if (selectedCategory !== "All") params.append("category", selectedCategory);
-      if (selectedCondition) params.append("condition", selectedCondition);
-      params.append("sort", sortOrder);
-
-      // Append parameters to URL if any exist
-      if (params.toString()) {
-        url += `?${params.toString()}`;
-      }
-
-      const response = await fetch(url);
-      const data = await response.json();
-      console.log("📦 Products from API:", data);
-      setProducts(data);
+      const data = await fetchProductPage(null);
+      if (version !== listVersion.current) return;
+      setProducts(data.products);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error("Error fetching products:", error);
     }
-  }, [searchTerm, selectedCategory, selectedCondition, sortOrder]);
+  }, [fetchProductPage]);
+
+  // Append the next server page; ProductList calls this as the user scrolls
+  const fetchMoreProducts = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    const version = listVersion.current;
+    setLoadingMore(true);
+    try {
+      const data = await fetchProductPage(nextCursor);
+      if (version !== listVersion.current) return;
+      setProducts((current) => [...current, ...data.products]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error("Error fetching more products:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [fetchProductPage, nextCursor, loadingMore]);
 
   useEffect(() => {
     const fetchUserData = async () => {
@@ -409,6 +437,9 @@ const Dashboard = () => {
                 onChange={(e) => setSortOrder(e.target.value)}
                 className="w-full pl-4 pr-8 py-3 rounded-xl bg-white/10 border border-white/10 text-white focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-300 hover:bg-white/20"
               >
+                <option value="relevance" className="bg-gray-800">
+                  Best Match
+                </option>
                 <option value="newest" className="bg-gray-800">
                   Newest First
                 </option>
@@ -465,6 +496,8 @@ const Dashboard = () => {
           products={filteredProducts}
           userId={user.id}
           fetchProducts={fetchProducts}
+          hasMore={nextCursor !== null}
+          fetchMoreProducts={fetchMoreProducts}
         />
       </div>
 
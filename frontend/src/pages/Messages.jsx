@@ -5,6 +5,8 @@ import { useNavigate } from 'react-router-dom';
 import Chat from '../components/Chat';
 import { getAuth } from 'firebase/auth';
 
+// Server limit on ids per /api/products/summaries request
+const SUMMARY_BATCH_SIZE = 100;
 
 const Messages = () => {
   const [conversations, setConversations] = useState([]);
@@ -62,14 +64,22 @@ const Messages = () => {
         productIds.add(chatData.productId);
       });
 
+      // Product cards for all chats in one request (per 100 products)
       const productsData = {};
-      for (const productId of productIds) {
+      const ids = [...productIds].filter(Boolean);
+      for (let i = 0; i < ids.length; i += SUMMARY_BATCH_SIZE) {
+        const batch = ids.slice(i, i + SUMMARY_BATCH_SIZE);
         try {
-          const response = await fetch(`http://127.0.0.1:5000/product/${productId}`);
+          const response = await fetch(
+            `http://127.0.0.1:5000/api/products/summaries?ids=${batch.join(',')}`
+          );
+          if (!response.ok) throw new Error('Failed to fetch products');
           const data = await response.json();
-          productsData[productId] = data.product;
+          data.products.forEach(product => {
+            productsData[product.id] = product;
+          });
         } catch (error) {
-          console.error(`Error fetching product ${productId}:`, error);
+          console.error('Error fetching products:', error);
         }
       }
       setProducts(productsData);
@@ -141,7 +151,7 @@ const Messages = () => {
                         <div className="flex items-start">
                           {product?.image_url && (
                             <img
-                              src={product.image_url}
+                              src={product.thumbnail_url || product.image_url}
                               alt={product.name}
                               className="w-12 h-12 rounded-lg object-cover mr-3"
                             />
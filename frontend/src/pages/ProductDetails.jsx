@@ -315,9 +315,10 @@ const ProductDetail = () => {
                   <>
                     <button
                       onClick={handleAddToCart}
-                      className="w-full bg-blue-600 text-white py-3.5 px-4 rounded-xl font-medium hover:bg-blue-700 transition duration-300 hover:scale-105 shadow-lg shadow-blue-500/25"
+                      disabled={product.stock === 0}
+                      className="w-full bg-blue-600 text-white py-3.5 px-4 rounded-xl font-medium hover:bg-blue-700 transition duration-300 hover:scale-105 shadow-lg shadow-blue-500/25 disabled:opacity-50 disabled:cursor-not-allowed disabled:hover:scale-100"
                     >
-                      Add to Cart
+                      {product.stock === 0 ? "Sold Out" : "Add to Cart"}
                     </button>
                     <button
                       onClick={handleContactSeller}
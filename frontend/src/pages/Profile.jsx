@@ -3,6 +3,7 @@ import { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import axios from "axios";
 import { toast } from "react-toastify";
+import { waitForJob } from "../api";
 
 
 const Profile = () => {
@@ -83,7 +84,8 @@ const Profile = () => {
       const response = await axios.post(`http://localhost:5000/update-profile-picture`, formData, {
         headers: { "Content-Type": "multipart/form-data" },
       });
-      setImageUrl(response.data.image_url);
+      const result = await waitForJob(response.data.job_id);
+      setImageUrl(result.image_url);
       toast.success("Profile picture updated successfully!");
     } catch (error) {
       console.error("Error uploading profile picture:", error);
@@ -50,12 +50,12 @@ const Wishlist = ({ userId }) => {
     fetchWishlist();
   }, [userId]);
 
-  const removeFromWishlist = async (image_url) => {
+  const removeFromWishlist = async (product_id) => {
     try {
       const res = await fetch(`http://127.0.0.1:5000/toggle-wishlist`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ users_id: userId, image_url }),
+        body: JSON.stringify({ users_id: userId, product_id }),
       });
       
       if (!res.ok) {
@@ -63,8 +63,8 @@ const Wishlist = ({ userId }) => {
         throw new Error(data.error || "Failed to remove");
       }
       
-      // Update wishlist state by removing the item with matching image_url
-      setWishlist(wishlist.filter((item) => item.image_url !== image_url));
+      // Update wishlist state by removing the item with matching product id
+      setWishlist(wishlist.filter((item) => item.id !== product_id));
       showToast("Removed from wishlist ✅");
     } catch (error) {
       console.error("❌ Remove error:", error);
@@ -196,7 +196,7 @@ const Wishlist = ({ userId }) => {
                 <div onClick={() => handleProductClick(item.id)} className="cursor-pointer">
                   <div className="relative">
                     <ZoomableImage 
-                      src={item.image_url}
+                      src={item.card_url || item.image_url}
                       alt={item.name || "Product"}
                       aspectRatio="4/3"
                       className="group-hover:opacity-90 transition-opacity"
@@ -222,7 +222,7 @@ const Wishlist = ({ userId }) => {
                   <button
                     onClick={(e) => {
                       e.stopPropagation();
-                      removeFromWishlist(item.image_url);
+                      removeFromWishlist(item.id);
                     }}
                     className="w-full bg-red-500/20 hover:bg-red-500/30 text-red-300 py-2 px-4 rounded-lg transition duration-300 border border-red-500/30"
                   >